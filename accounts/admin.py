@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, StudentProfile, InstructorProfile, EmployeeProfile
+from .models import User, StudentProfile, InstructorProfile, EmployeeProfile, DailyStats
 
 
 class CustomUserAdmin(UserAdmin):
@@ -18,8 +18,23 @@ class CustomUserAdmin(UserAdmin):
     )
 
 
+class DailyStatsAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the daily activity rollups.
+    """
+    list_display = ('date',) + DailyStats.METRICS
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # Register our models
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(StudentProfile)
 admin.site.register(InstructorProfile)
-admin.site.register(EmployeeProfile)
\ No newline at end of file
+admin.site.register(EmployeeProfile)
+admin.site.register(DailyStats, DailyStatsAdmin)
@@ -0,0 +1,110 @@
+"""
+Daily activity rollups for the employee dashboard.
+
+Signals add to today's DailyStats row as records are created or removed;
+rollup_daily_stats() recomputes a date range from the source tables with
+portable TruncDate grouping, for backfills and drift repair.
+"""
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import DailyStats, User
+
+
+ROLE_METRICS = {
+    'student': 'new_students',
+    'instructor': 'new_instructors',
+    'employee': 'new_employees',
+}
+
+
+def local_day(value):
+    """Return the local calendar day of a datetime (or today for None)."""
+    return timezone.localdate(value) if value else timezone.localdate()
+
+
+def bump_daily_stats(day, **deltas):
+    """
+    Atomically add deltas to the counters of one day, e.g.
+    bump_daily_stats(day, enrollments=1).
+    """
+    deltas = {metric: F(metric) + delta for metric, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    DailyStats.objects.bulk_create([DailyStats(date=day)], ignore_conflicts=True)
+    DailyStats.objects.filter(date=day).update(**deltas)
+
+
+def _rollup_sources():
+    """Yield (metric, queryset, date field) for every rolled-up metric."""
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Course = apps.get_model('courses', 'Course')
+    Review = apps.get_model('courses', 'Review')
+    Submission = apps.get_model('assignments', 'Submission')
+
+    yield 'enrollments', Enrollment.objects.all(), 'enrolled_at'
+    yield 'completions', Enrollment.objects.filter(completed=True), 'completion_date'
+    for role, metric in ROLE_METRICS.items():
+        yield metric, User.objects.filter(role=role), 'date_joined'
+    yield 'new_courses', Course.objects.all(), 'created_at'
+    yield 'submissions', Submission.objects.all(), 'submitted_at'
+    yield 'reviews', Review.objects.all(), 'created_at'
+
+
+def rollup_daily_stats(start=None, end=None):
+    """
+    Recompute DailyStats rows for start..end (inclusive dates, either
+    open-ended) from the source tables. Returns the number of days written.
+    """
+    days = {}
+    for metric, queryset, field in _rollup_sources():
+        queryset = queryset.exclude(**{f'{field}__isnull': True})
+        counts = (
+            queryset.annotate(day=TruncDate(field))
+            .values('day').annotate(total=Count('pk')).order_by()
+        )
+        if start:
+            counts = counts.filter(day__gte=start)
+        if end:
+            counts = counts.filter(day__lte=end)
+        for row in counts:
+            stats = days.setdefault(row['day'], DailyStats(date=row['day']))
+            setattr(stats, metric, row['total'])
+
+    existing = DailyStats.objects.all()
+    if start:
+        existing = existing.filter(date__gte=start)
+    if end:
+        existing = existing.filter(date__lte=end)
+    with transaction.atomic():
+        existing.delete()
+        DailyStats.objects.bulk_create(days.values(), batch_size=500)
+    return len(days)
+
+
+def get_totals():
+    """Return all-time totals for every metric in one aggregate query."""
+    totals = DailyStats.objects.aggregate(**{metric: Sum(metric) for metric in DailyStats.METRICS})
+    return {metric: value or 0 for metric, value in totals.items()}
+
+
+def get_trend(start, end, metrics=DailyStats.METRICS):
+    """
+    Return one dict per day from start to end (inclusive) with the
+    requested metrics, filling days without activity with zeros.
+    """
+    rows = {
+        row['date']: row for row in
+        DailyStats.objects.filter(date__gte=start, date__lte=end).values('date', *metrics).order_by()
+    }
+    trend = []
+    day = start
+    while day <= end:
+        row = rows.get(day, {})
+        trend.append({'date': day, **{metric: row.get(metric, 0) for metric in metrics}})
+        day += timedelta(days=1)
+    return trend
@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.analytics import rollup_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily activity rollups from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            help='First day to recompute, as YYYY-MM-DD (default: the beginning)'
+        )
+        parser.add_argument(
+            '--end',
+            help='Last day to recompute, as YYYY-MM-DD (default: today)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError as exc:
+            raise CommandError(f'Invalid date: {exc}')
+
+        days = rollup_daily_stats(start=start, end=end)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rolled up activity for {days} days')
+        )
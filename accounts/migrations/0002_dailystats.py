@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:08
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_stats(apps, schema_editor):
+    DailyStats = apps.get_model('accounts', 'DailyStats')
+    User = apps.get_model('accounts', 'User')
+    Course = apps.get_model('courses', 'Course')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Review = apps.get_model('courses', 'Review')
+    Submission = apps.get_model('assignments', 'Submission')
+
+    sources = [
+        ('enrollments', Enrollment.objects.all(), 'enrolled_at'),
+        ('completions', Enrollment.objects.filter(completed=True, completion_date__isnull=False), 'completion_date'),
+        ('new_students', User.objects.filter(role='student'), 'date_joined'),
+        ('new_instructors', User.objects.filter(role='instructor'), 'date_joined'),
+        ('new_employees', User.objects.filter(role='employee'), 'date_joined'),
+        ('new_courses', Course.objects.all(), 'created_at'),
+        ('submissions', Submission.objects.all(), 'submitted_at'),
+        ('reviews', Review.objects.all(), 'created_at'),
+    ]
+    days = {}
+    for metric, queryset, field in sources:
+        counts = queryset.annotate(day=TruncDate(field)).values('day').annotate(total=Count('pk')).order_by()
+        for row in counts:
+            setattr(days.setdefault(row['day'], DailyStats(date=row['day'])), metric, row['total'])
+    DailyStats.objects.bulk_create(days.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('assignments', '0001_initial'),
+        ('courses', '0007_enrollment_completed_lessons_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('enrollments', models.IntegerField(default=0)),
+                ('completions', models.IntegerField(default=0)),
+                ('new_students', models.IntegerField(default=0)),
+                ('new_instructors', models.IntegerField(default=0)),
+                ('new_employees', models.IntegerField(default=0)),
+                ('new_courses', models.IntegerField(default=0)),
+                ('submissions', models.IntegerField(default=0)),
+                ('reviews', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
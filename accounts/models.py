@@ -15,6 +15,12 @@ class User(AbstractUser):
     
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='student')
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Role filters on dashboards, user management and stats
+            models.Index(fields=['role'], name='accounts_user_role_idx'),
+        ]
+    
     def get_absolute_url(self):
         if self.role == 'student':
             return reverse('student_dashboard')
@@ -66,4 +72,34 @@ class EmployeeProfile(models.Model):
     hire_date = models.DateField(null=True, blank=True)
     
     def __str__(self):
-        return f"{self.user.username}'s Employee Profile"
\ No newline at end of file
+        return f"{self.user.username}'s Employee Profile"
+
+
+class DailyStats(models.Model):
+    """
+    Per-day activity rollup read by the employee dashboard.
+    Kept current by signals (see accounts/signals.py) and rebuilt by the
+    rollup_daily_stats command. Rows are keyed by the day each record was
+    created, so deletions are subtracted from that original day.
+    """
+    date = models.DateField(unique=True)
+    enrollments = models.IntegerField(default=0)
+    completions = models.IntegerField(default=0)
+    new_students = models.IntegerField(default=0)
+    new_instructors = models.IntegerField(default=0)
+    new_employees = models.IntegerField(default=0)
+    new_courses = models.IntegerField(default=0)
+    submissions = models.IntegerField(default=0)
+    reviews = models.IntegerField(default=0)
+
+    METRICS = (
+        'enrollments', 'completions', 'new_students', 'new_instructors',
+        'new_employees', 'new_courses', 'submissions', 'reviews',
+    )
+
+    class Meta:
+        verbose_name_plural = "Daily stats"
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Stats for {self.date}"
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from .analytics import ROLE_METRICS, bump_daily_stats, local_day
+from .models import User
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_role(sender, instance, update_fields, **kwargs):
+    if instance.pk and (update_fields is None or 'role' in update_fields):
+        instance._daily_stats_role = (
+            User.objects.filter(pk=instance.pk).values_list('role', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=User)
+def count_new_user(sender, instance, created, **kwargs):
+    """Count sign-ups by role, moving the count if the role changes later."""
+    day = local_day(instance.date_joined)
+    if created:
+        bump_daily_stats(day, **{ROLE_METRICS[instance.role]: 1})
+        return
+    previous = getattr(instance, '_daily_stats_role', instance.role)
+    if previous != instance.role:
+        bump_daily_stats(day, **{ROLE_METRICS[previous]: -1})
+        bump_daily_stats(day, **{ROLE_METRICS[instance.role]: 1})
+    instance._daily_stats_role = instance.role
+
+
+@receiver(post_delete, sender=User)
+def uncount_deleted_user(sender, instance, **kwargs):
+    bump_daily_stats(local_day(instance.date_joined), **{ROLE_METRICS[instance.role]: -1})
+
+
+@receiver(pre_save, sender='courses.Enrollment')
+def remember_previous_completion(sender, instance, **kwargs):
+    if instance.pk:
+        instance._daily_stats_completion = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list('completed', 'completion_date').first()
+        )
+
+
+@receiver(post_save, sender='courses.Enrollment')
+def count_enrollment(sender, instance, created, **kwargs):
+    """Count new enrollments and enrollments that become completed."""
+    if created:
+        bump_daily_stats(local_day(instance.enrolled_at), enrollments=1)
+    was_completed, previous_date = getattr(instance, '_daily_stats_completion', None) or (False, None)
+    if instance.completed and not was_completed and instance.completion_date:
+        bump_daily_stats(local_day(instance.completion_date), completions=1)
+    elif was_completed and not instance.completed and previous_date:
+        bump_daily_stats(local_day(previous_date), completions=-1)
+    instance._daily_stats_completion = (instance.completed, instance.completion_date)
+
+
+@receiver(post_delete, sender='courses.Enrollment')
+def uncount_enrollment(sender, instance, **kwargs):
+    bump_daily_stats(local_day(instance.enrolled_at), enrollments=-1)
+    if instance.completed and instance.completion_date:
+        bump_daily_stats(local_day(instance.completion_date), completions=-1)
+
+
+@receiver(post_save, sender='courses.Course')
+def count_new_course(sender, instance, created, **kwargs):
+    if created:
+        bump_daily_stats(local_day(instance.created_at), new_courses=1)
+
+
+@receiver(post_delete, sender='courses.Course')
+def uncount_course(sender, instance, **kwargs):
+    bump_daily_stats(local_day(instance.created_at), new_courses=-1)
+
+
+@receiver(post_save, sender='assignments.Submission')
+def count_new_submission(sender, instance, created, **kwargs):
+    if created:
+        bump_daily_stats(local_day(instance.submitted_at), submissions=1)
+
+
+@receiver(post_delete, sender='assignments.Submission')
+def uncount_submission(sender, instance, **kwargs):
+    bump_daily_stats(local_day(instance.submitted_at), submissions=-1)
+
+
+@receiver(post_save, sender='courses.Review')
+def count_new_review(sender, instance, created, **kwargs):
+    if created:
+        bump_daily_stats(local_day(instance.created_at), reviews=1)
+
+
+@receiver(post_delete, sender='courses.Review')
+def uncount_review(sender, instance, **kwargs):
+    bump_daily_stats(local_day(instance.created_at), reviews=-1)
@@ -2,6 +2,13 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from .analytics import get_totals, rollup_daily_stats
+from .models import DailyStats
+from courses.models import Course, Enrollment, Review
 
 User = get_user_model()
 
@@ -80,4 +87,114 @@ class AccountsTestCase(TestCase):
             'password2': 'testpass123'
         })
         self.assertEqual(response.status_code, 302)  # Redirect after successful registration
-        self.assertTrue(User.objects.filter(username='newstudent').exists())
\ No newline at end of file
+        self.assertTrue(User.objects.filter(username='newstudent').exists())
+
+
+class DailyStatsTestCase(TestCase):
+    def setUp(self):
+        self.employee = User.objects.create_user(
+            username='statsemployee', password='testpass123', role='employee'
+        )
+        self.instructor = User.objects.create_user(
+            username='statsinstructor', password='testpass123', role='instructor'
+        )
+        self.student = User.objects.create_user(
+            username='statsstudent', password='testpass123', role='student'
+        )
+        self.course = Course.objects.create(
+            title='Stats Course', description='Counting things',
+            instructor=self.instructor, published=True
+        )
+        self.today = timezone.localdate()
+
+    def stats_for_today(self):
+        return DailyStats.objects.get(date=self.today)
+
+    def test_signals_count_new_records(self):
+        """Test that creating records adds to today's rollup"""
+        enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        Review.objects.create(course=self.course, student=self.student, rating=4, review_text='Good')
+        stats = self.stats_for_today()
+        self.assertEqual(stats.new_students, 1)
+        self.assertEqual(stats.new_instructors, 1)
+        self.assertEqual(stats.new_employees, 1)
+        self.assertEqual(stats.new_courses, 1)
+        self.assertEqual(stats.enrollments, 1)
+        self.assertEqual(stats.reviews, 1)
+        self.assertEqual(stats.completions, 0)
+
+        enrollment.completed = True
+        enrollment.completion_date = timezone.now()
+        enrollment.save(update_fields=['completed', 'completion_date'])
+        enrollment.save()
+        self.assertEqual(self.stats_for_today().completions, 1)
+
+        enrollment.delete()
+        stats = self.stats_for_today()
+        self.assertEqual(stats.enrollments, 0)
+        self.assertEqual(stats.completions, 0)
+
+    def test_role_change_moves_count(self):
+        """Test that changing a user's role moves them between counters"""
+        self.student.role = 'instructor'
+        self.student.save()
+        stats = self.stats_for_today()
+        self.assertEqual(stats.new_students, 0)
+        self.assertEqual(stats.new_instructors, 2)
+
+    def test_rollup_matches_signals(self):
+        """Test that the rollup command reproduces the signal-maintained rows"""
+        Enrollment.objects.create(student=self.student, course=self.course)
+        expected = get_totals()
+        DailyStats.objects.update(enrollments=99)
+
+        out = StringIO()
+        call_command('rollup_daily_stats', stdout=out)
+        self.assertIn('1 days', out.getvalue())
+        self.assertEqual(get_totals(), expected)
+
+    def test_rollup_range_keeps_other_days(self):
+        """Test that a ranged rollup leaves days outside the range alone"""
+        old_day = self.today - timedelta(days=10)
+        DailyStats.objects.create(date=old_day, enrollments=7)
+        rollup_daily_stats(start=self.today, end=self.today)
+        self.assertEqual(DailyStats.objects.get(date=old_day).enrollments, 7)
+
+    def test_employee_dashboard_reads_rollup(self):
+        """Test that dashboard totals come from DailyStats alone"""
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client.login(username='statsemployee', password='testpass123')
+        # Session, user, totals, trend, recent courses, recent enrollments
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('employee_dashboard'))
+        self.assertEqual(response.context['total_students'], 1)
+        self.assertEqual(response.context['total_enrollments'], 1)
+        trend = response.context['enrollment_trend']
+        self.assertEqual(len(trend), 30)
+        self.assertEqual(trend[-1], {'date': self.today, 'count': 1})
+
+    def test_trend_endpoint(self):
+        """Test the JSON trend endpoint with zero-filled days"""
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client.login(username='statsemployee', password='testpass123')
+        start = self.today - timedelta(days=2)
+        response = self.client.get(reverse('employee_stats_trend'), {
+            'start': start.isoformat(), 'end': self.today.isoformat(), 'metrics': 'enrollments,reviews'
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['metrics'], ['enrollments', 'reviews'])
+        self.assertEqual(data['days'], [
+            {'date': start.isoformat(), 'enrollments': 0, 'reviews': 0},
+            {'date': (start + timedelta(days=1)).isoformat(), 'enrollments': 0, 'reviews': 0},
+            {'date': self.today.isoformat(), 'enrollments': 1, 'reviews': 0},
+        ])
+
+        response = self.client.get(reverse('employee_stats_trend'), {'metrics': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_trend_endpoint_requires_employee(self):
+        """Test that non-employees cannot read the trend"""
+        self.client.login(username='statsstudent', password='testpass123')
+        response = self.client.get(reverse('employee_stats_trend'))
+        self.assertEqual(response.status_code, 403)
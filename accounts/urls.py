@@ -9,6 +9,7 @@ urlpatterns = [
     path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
     path('instructor/dashboard/', views.instructor_dashboard, name='instructor_dashboard'),
     path('employee/dashboard/', views.employee_dashboard, name='employee_dashboard'),
+    path('employee/stats/trend/', views.employee_stats_trend, name='employee_stats_trend'),
     path('employee/users/', views.employee_user_management, name='employee_user_management'),
     path('employee/users/<int:user_id>/', views.employee_user_detail, name='employee_user_detail'),
 ]
\ No newline at end of file
@@ -3,11 +3,14 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from .forms import CustomUserCreationForm
-from .models import User
+from .analytics import get_totals, get_trend
+from .models import DailyStats, User
+from courses.analytics import get_instructor_course_analytics
 from courses.models import Category, Course, Enrollment, LessonCompletion
 from django.db.models import Count, Q
+from django.http import JsonResponse
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 
 
 def login_view(request):
@@ -93,7 +96,7 @@ def student_dashboard(request):
     """
     if request.user.is_authenticated and request.user.role == 'student':
         # Get student's enrollments with related course and lesson completion data
-        enrollments = Enrollment.objects.filter(student=request.user).select_related('course', 'course__instructor')
+        enrollments = Enrollment.objects.filter(student=request.user).select_related('course', 'course__instructor', 'course__stats')
         
         # Calculate overall progress
         total_courses = enrollments.count()
@@ -120,28 +123,28 @@ def instructor_dashboard(request):
     Instructor dashboard view with course statistics.
     """
     if request.user.is_authenticated and request.user.role == 'instructor':
-        # Get instructor's courses
-        courses = Course.objects.filter(instructor=request.user).prefetch_related('enrollments')
+        # Get instructor's courses with per-course analytics (cached)
+        courses = get_instructor_course_analytics(request.user.pk)
         
         # Calculate statistics
-        total_courses = courses.count()
-        total_enrollments = sum(course.enrollments.count() for course in courses)
+        total_courses = len(courses)
+        total_enrollments = sum(course.enrollment_count for course in courses)
+        average_enrollment = round(total_enrollments / total_courses) if total_courses else 0
         
-        # Get recent courses
-        recent_courses = courses.order_by('-created_at')[:3]
+        # Get recent courses (analytics are already newest first)
+        recent_courses = courses[:3]
         
         # Get enrollment data for chart
-        enrollment_data = []
-        for course in courses:
-            enrollment_data.append({
-                'title': course.title,
-                'enrollments': course.enrollments.count()
-            })
+        enrollment_data = [
+            {'title': course.title, 'enrollments': course.enrollment_count}
+            for course in courses
+        ]
         
         context = {
             'courses': courses,
             'total_courses': total_courses,
             'total_enrollments': total_enrollments,
+            'average_enrollment': average_enrollment,
             'recent_courses': recent_courses,
             'enrollment_data': enrollment_data,
         }
@@ -157,32 +160,28 @@ def employee_dashboard(request):
     Employee dashboard view with system statistics.
     """
     if request.user.is_authenticated and request.user.role == 'employee':
-        # Get system statistics
-        total_students = User.objects.filter(role='student').count()
-        total_instructors = User.objects.filter(role='instructor').count()
-        total_courses = Course.objects.count()
-        total_enrollments = Enrollment.objects.count()
+        # Get system statistics from the daily rollups
+        totals = get_totals()
         
         # Get recent activity
-        recent_courses = Course.objects.select_related('instructor').order_by('-created_at')[:5]
+        recent_courses = Course.objects.select_related('instructor', 'stats').order_by('-created_at')[:5]
         recent_enrollments = Enrollment.objects.select_related('student', 'course').order_by('-enrolled_at')[:5]
         
         # Get enrollment trend (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        enrollment_trend = Enrollment.objects.filter(
-            enrolled_at__gte=thirty_days_ago
-        ).extra(select={'date': 'date(enrolled_at)'}).values('date').annotate(
-            count=Count('id')
-        ).order_by('date')
+        today = timezone.localdate()
+        enrollment_trend = [
+            {'date': day['date'], 'count': day['enrollments']}
+            for day in get_trend(today - timedelta(days=29), today, ['enrollments'])
+        ]
         
         context = {
-            'total_students': total_students,
-            'total_instructors': total_instructors,
-            'total_courses': total_courses,
-            'total_enrollments': total_enrollments,
+            'total_students': totals['new_students'],
+            'total_instructors': totals['new_instructors'],
+            'total_courses': totals['new_courses'],
+            'total_enrollments': totals['enrollments'],
             'recent_courses': recent_courses,
             'recent_enrollments': recent_enrollments,
-            'enrollment_trend': list(enrollment_trend),
+            'enrollment_trend': enrollment_trend,
         }
         
         return render(request, 'accounts/employee_dashboard.html', context)
@@ -191,6 +190,43 @@ def employee_dashboard(request):
         return redirect('login')
 
 
+# Longest range served by one trend request
+MAX_TREND_DAYS = 366
+
+
+@login_required
+def employee_stats_trend(request):
+    """
+    JSON endpoint returning daily activity counts for the employee dashboard.
+
+    Accepts optional start/end dates (YYYY-MM-DD, default the last 30 days)
+    and a comma-separated metrics list; days without activity are zero.
+    """
+    if request.user.role != 'employee':
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    try:
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - timedelta(days=29)
+    except ValueError:
+        return JsonResponse({'error': 'Dates must be formatted as YYYY-MM-DD.'}, status=400)
+    if start > end or (end - start).days >= MAX_TREND_DAYS:
+        return JsonResponse({'error': f'Choose a range of 1 to {MAX_TREND_DAYS} days.'}, status=400)
+    
+    metrics = [metric for metric in request.GET.get('metrics', '').split(',') if metric] or list(DailyStats.METRICS)
+    unknown = sorted(set(metrics) - set(DailyStats.METRICS))
+    if unknown:
+        return JsonResponse({'error': f'Unknown metrics: {", ".join(unknown)}.'}, status=400)
+    
+    trend = get_trend(start, end, metrics)
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'metrics': metrics,
+        'days': [{**day, 'date': day['date'].isoformat()} for day in trend],
+    })
+
+
 @login_required
 def employee_user_management(request):
     """
@@ -249,6 +285,8 @@ def employee_user_detail(request, user_id):
     
     context = {
         'user_detail': user,
+        'user_enrollments': user.enrollments.select_related('course__stats'),
+        'user_courses': user.courses.select_related('stats'),
     }
     
     return render(request, 'accounts/employee_user_detail.html', context)
\ No newline at end of file
@@ -1,3 +1,28 @@
 from django.contrib import admin
+from .models import AutogradeCheck, AutogradeJob
 
-# Register your models here.
+
+@admin.register(AutogradeCheck)
+class AutogradeCheckAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for AutogradeCheck model.
+    """
+    list_display = ('name', 'assignment', 'kind', 'points', 'order')
+    list_filter = ('kind',)
+    search_fields = ('name', 'assignment__title', 'pattern')
+    ordering = ('assignment', 'order')
+
+
+@admin.register(AutogradeJob)
+class AutogradeJobAdmin(admin.ModelAdmin):
+    """
+    Read-only admin for the autograder queue.
+    """
+    list_display = ('submission', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('submission__student__username', 'submission__assignment__title', 'error')
+    readonly_fields = ('submission', 'status', 'attempts', 'claim_token', 'claimed_at',
+                       'finished_at', 'result', 'error', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,198 @@
+"""
+Vectorized gradebook statistics for a course.
+
+The course's graded scores are loaded with one query into a dense
+(students x assignments) NumPy array, with NaN marking missing or
+ungraded entries, and every statistic is computed with whole-array
+operations: per-assignment mean, median, standard deviation, min/max,
+percentiles and score histograms, and per-student weighted totals.
+
+Results are cached under a key built from the latest
+Submission.updated_at, the submission count and the course's assignment
+and enrollment shape, so any grade, new submission or roster change
+produces a fresh key without explicit invalidation.
+"""
+import hashlib
+import warnings
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from courses.models import Enrollment
+from .gradebook import get_gradebook_assignments
+from .models import Submission
+
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Number of equal-width buckets, as a share of max_score, per histogram
+HISTOGRAM_BINS = 10
+
+
+def _to_value(value):
+    """Convert a float to a rounded Python float, or None for NaN."""
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def _to_list(values):
+    return [_to_value(value) for value in values]
+
+
+class GradebookMatrix:
+    """
+    Scores for one course as a students x assignments float array.
+
+    scores holds NaN where a student has no graded submission; mask is
+    True at those positions. Rows follow student_ids (ascending) and
+    columns follow the course's assignment order.
+    """
+
+    def __init__(self, course):
+        self.course = course
+        assignments = get_gradebook_assignments(course)
+        self.assignment_ids = np.array([pk for pk, _, _ in assignments], dtype=np.int64)
+        self.assignment_titles = [title for _, title, _ in assignments]
+        self.max_scores = np.array([max_score for _, _, max_score in assignments], dtype=float)
+
+        students = list(
+            Enrollment.objects.filter(course=course).order_by('student_id')
+            .values_list('student_id', 'student__username')
+        )
+        self.student_ids = np.array([pk for pk, _ in students], dtype=np.int64)
+        self.usernames = [username for _, username in students]
+        self.scores = np.full((len(self.student_ids), len(self.assignment_ids)), np.nan)
+        self._load_scores()
+        self.mask = np.isnan(self.scores)
+
+    def _load_scores(self):
+        rows = np.array(
+            Submission.objects.filter(
+                assignment__lesson__course=self.course, score__isnull=False
+            ).values_list('student_id', 'assignment_id', 'score'),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        if not len(rows) or not len(self.student_ids) or not len(self.assignment_ids):
+            return
+
+        column_order = np.argsort(self.assignment_ids)
+        student_index = np.searchsorted(self.student_ids, rows[:, 0])
+        assignment_index = np.searchsorted(self.assignment_ids[column_order], rows[:, 1])
+        # Drop scores of students who are no longer enrolled
+        enrolled = student_index < len(self.student_ids)
+        enrolled[enrolled] = self.student_ids[student_index[enrolled]] == rows[enrolled, 0]
+        self.scores[student_index[enrolled], column_order[assignment_index[enrolled]]] = rows[enrolled, 2]
+
+    def assignment_stats(self):
+        """Return one dict of statistics per assignment, in column order."""
+        scores = self.scores
+        graded = (~self.mask).sum(axis=0)
+        with warnings.catch_warnings():
+            # All-NaN columns (nothing graded yet) produce NaN results
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean = np.nanmean(scores, axis=0)
+            median = np.nanmedian(scores, axis=0)
+            stddev = np.nanstd(scores, axis=0)
+            low = np.nanmin(scores, axis=0) if len(scores) else np.full(len(graded), np.nan)
+            high = np.nanmax(scores, axis=0) if len(scores) else np.full(len(graded), np.nan)
+            percentiles = np.nanpercentile(scores, PERCENTILES, axis=0) if len(scores) else (
+                np.full((len(PERCENTILES), len(graded)), np.nan)
+            )
+
+        # Bucket every graded score by its share of max_score
+        histogram = np.zeros((len(self.assignment_ids), HISTOGRAM_BINS), dtype=np.int64)
+        student_index, assignment_index = np.nonzero(~self.mask)
+        if len(student_index):
+            share = scores[student_index, assignment_index] / np.maximum(self.max_scores[assignment_index], 1)
+            buckets = np.clip((share * HISTOGRAM_BINS).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+            np.add.at(histogram, (assignment_index, buckets), 1)
+
+        mean, median, stddev, low, high = (_to_list(values) for values in (mean, median, stddev, low, high))
+        percentiles = [_to_list(values) for values in percentiles]
+        return [
+            {
+                'id': int(self.assignment_ids[column]),
+                'title': self.assignment_titles[column],
+                'max_score': int(self.max_scores[column]),
+                'graded': int(graded[column]),
+                'mean': mean[column],
+                'median': median[column],
+                'stddev': stddev[column],
+                'min': low[column],
+                'max': high[column],
+                'percentiles': {
+                    str(percentile): values[column] for percentile, values in zip(PERCENTILES, percentiles)
+                },
+                'histogram': histogram[column].tolist(),
+            }
+            for column in range(len(self.assignment_ids))
+        ]
+
+    def student_totals(self, weights=None):
+        """
+        Return one dict per student with weighted totals as percentages.
+
+        weights default to each assignment's max_score (plain points).
+        total_percent counts missing work as zero; graded_percent only
+        considers graded assignments.
+        """
+        weights = self.max_scores if weights is None else np.asarray(weights, dtype=float)
+        shares = np.where(self.mask, 0.0, self.scores / np.maximum(self.max_scores, 1))
+        earned = shares @ weights
+        possible = weights.sum()
+        graded_weight = (~self.mask).astype(float) @ weights
+        with np.errstate(divide='ignore', invalid='ignore'):
+            total = earned / possible * 100 if possible else np.zeros(len(earned))
+            graded_percent = np.where(graded_weight > 0, earned / graded_weight * 100, np.nan)
+        graded = (~self.mask).sum(axis=1)
+
+        total, graded_percent = _to_list(total), _to_list(graded_percent)
+        return [
+            {
+                'id': int(self.student_ids[row]),
+                'username': self.usernames[row],
+                'graded': int(graded[row]),
+                'total_percent': total[row],
+                'graded_percent': graded_percent[row],
+            }
+            for row in range(len(self.student_ids))
+        ]
+
+    def get_stats(self):
+        """Return assignment statistics, student totals and course summary."""
+        students = self.student_totals()
+        totals = np.array([s['total_percent'] for s in students], dtype=float)
+        return {
+            'course': self.course.pk,
+            'students_count': len(students),
+            'assignments': self.assignment_stats(),
+            'students': students,
+            'mean_total_percent': _to_value(totals.mean()) if len(totals) else None,
+            'median_total_percent': _to_value(np.median(totals)) if len(totals) else None,
+        }
+
+
+def _stats_cache_key(course):
+    latest = Submission.objects.filter(assignment__lesson__course=course).aggregate(
+        latest=Max('updated_at'), count=Count('pk')
+    )
+    shape = Enrollment.objects.filter(course=course).aggregate(
+        count=Count('pk'), last=Max('enrolled_at')
+    )
+    assignments = get_gradebook_assignments(course)
+    raw = repr((course.pk, latest, shape, assignments))
+    return 'gradebook_stats:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_gradebook_stats(course):
+    """
+    Return GradebookMatrix(course).get_stats(), cached until a submission
+    is added, graded or removed, or the roster or assignments change.
+    """
+    key = _stats_cache_key(course)
+    stats = cache.get(key)
+    if stats is None:
+        stats = GradebookMatrix(course).get_stats()
+        timeout = getattr(settings, 'GRADEBOOK_STATS_CACHE_TIMEOUT', 3600)
+        cache.set(key, stats, timeout)
+    return stats
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AssignmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'assignments'
+
+    def ready(self):
+        # Register signal handlers that keep the similarity index in sync
+        from . import signals  # noqa: F401
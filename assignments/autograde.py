@@ -0,0 +1,442 @@
+"""
+Local autograder for submissions.
+
+Assignments may define AutogradeChecks:
+
+- regex: passes if the pattern is found in the submission.
+- expected_output: passes if the submission equals the expected text,
+  ignoring case and runs of whitespace.
+- script: passes if a small Python expression is true. It can use
+  text, lines, words and length plus a few safe builtins and string
+  methods, e.g. ``len(words) >= 200 and 'conclusion' in text.lower()``.
+
+New submissions to such assignments get an AutogradeJob. The worker
+(run_autograder, or the run_autograder command) claims queued jobs in
+batches, evaluates them on a ProcessPoolExecutor, and writes the scores
+back with one bulk_update per batch. Evaluation only needs the check
+definitions and the submission's text or file, so the pool processes
+never touch the database. Each pool process may grow by at most
+AUTOGRADE_MEMORY_LIMIT bytes. If one still dies or hangs, the tasks it
+left unfinished are evaluated again one at a time, so only the job that
+caused it fails, and the pool is replaced.
+
+Jobs are claimed by stamping a batch with a fresh claim_token in one
+UPDATE, so several workers can share the queue. A job left running
+by a crashed worker is queued again after AUTOGRADE_STALE_AFTER, up
+to AUTOGRADE_MAX_ATTEMPTS claims; after that it is marked failed.
+Submissions an instructor graded in the meantime are left alone.
+"""
+import ast
+import os
+import re
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+import signal
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from courses.analytics import invalidate_instructor_analytics
+from .models import AutogradeCheck, AutogradeJob, Submission
+
+
+# Jobs claimed and written back per round trip
+AUTOGRADE_BATCH_SIZE = 200
+
+# Running jobs older than this are assumed abandoned and queued again
+AUTOGRADE_STALE_AFTER = timedelta(minutes=10)
+
+# Claims a job gets before an abandoned run marks it failed, so a
+# submission that keeps crashing its worker is not retried forever
+AUTOGRADE_MAX_ATTEMPTS = 3
+
+# Seconds a pool chunk may take beyond its tasks' timeouts before its
+# process is assumed hung
+CHUNK_GRACE = 30
+
+# Only this much of a submitted file is read for grading
+MAX_FILE_BYTES = 1024 * 1024
+
+# Names, builtins and str methods available to script checks
+SCRIPT_BUILTINS = {
+    'len': len, 'min': min, 'max': max, 'sum': sum, 'abs': abs, 'any': any, 'all': all,
+    'int': int, 'float': float, 'str': str, 'set': set, 'sorted': sorted,
+}
+SCRIPT_NAMES = {'text', 'lines', 'words', 'length'}
+SCRIPT_METHODS = {
+    'lower', 'upper', 'strip', 'split', 'splitlines', 'count', 'find',
+    'startswith', 'endswith', 'isdigit', 'isalpha',
+}
+SCRIPT_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.IfExp, ast.Call, ast.Attribute, ast.Name, ast.Load, ast.Store, ast.Constant,
+    ast.Subscript, ast.Slice, ast.List, ast.Tuple, ast.Set,
+    ast.GeneratorExp, ast.ListComp, ast.comprehension,
+)
+# Calls that always return a number. Repeating or %-formatting a string
+# or list ("ab" * 3000000000) builds it in one C call that neither the
+# timeout nor anything else can interrupt, so * and % need numbers.
+NUMERIC_FUNCTIONS = {'len', 'abs', 'int', 'float'}
+NUMERIC_METHODS = {'count', 'find'}
+NUMERIC_ONLY_OPS = (ast.Mult, ast.Mod)
+
+
+class TaskTimeout(Exception):
+    """Raised inside a pool process when a submission takes too long."""
+
+
+def _is_number(node):
+    """Return whether a script expression can only evaluate to a number."""
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, (int, float))
+    if isinstance(node, ast.Name):
+        return node.id == 'length'
+    if isinstance(node, ast.UnaryOp):
+        return _is_number(node.operand)
+    if isinstance(node, ast.BinOp):
+        return _is_number(node.left) and _is_number(node.right)
+    if isinstance(node, ast.IfExp):
+        return _is_number(node.body) and _is_number(node.orelse)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        # sum() with a start value can add up lists
+        return node.func.id in NUMERIC_FUNCTIONS or (node.func.id == 'sum' and len(node.args) == 1)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        return node.func.attr in NUMERIC_METHODS
+    return False
+
+
+@lru_cache(maxsize=256)
+def _compile_script(expression):
+    tree = ast.parse(expression, mode='eval')
+    bound = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.comprehension) and isinstance(node.target, ast.Name):
+            bound.add(node.target.id)
+    for node in ast.walk(tree):
+        if not isinstance(node, SCRIPT_NODES):
+            raise ValueError(f'{type(node).__name__} is not allowed in scripted checks.')
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store) and (
+            node.id in SCRIPT_NAMES or node.id in SCRIPT_BUILTINS
+        ):
+            raise ValueError(f'"{node.id}" cannot be reassigned in scripted checks.')
+        if isinstance(node, ast.BinOp) and isinstance(node.op, NUMERIC_ONLY_OPS) and not (
+            _is_number(node.left) and _is_number(node.right)
+        ):
+            raise ValueError('Only numbers can be multiplied or take a remainder in scripted checks.')
+        if isinstance(node, ast.Attribute) and node.attr not in SCRIPT_METHODS:
+            raise ValueError(f'.{node.attr} is not allowed in scripted checks.')
+        if isinstance(node, ast.Name) and node.id not in SCRIPT_NAMES | SCRIPT_BUILTINS.keys() | bound:
+            raise ValueError(f'Unknown name "{node.id}" in scripted check.')
+    return compile(tree, '<check>', 'eval')
+
+
+def validate_check(kind, pattern):
+    """Raise ValidationError if a check's pattern is invalid for its kind."""
+    try:
+        if kind == 'regex':
+            re.compile(pattern)
+        elif kind == 'script':
+            _compile_script(pattern)
+    except (re.error, SyntaxError, ValueError) as e:
+        raise ValidationError({'pattern': str(e)})
+
+
+def _normalize(text):
+    return ' '.join(text.split()).casefold()
+
+
+def _run_check(kind, pattern, text):
+    if kind == 'regex':
+        return re.search(pattern, text, re.MULTILINE) is not None
+    if kind == 'expected_output':
+        return _normalize(text) == _normalize(pattern)
+    if kind == 'script':
+        namespace = {
+            '__builtins__': SCRIPT_BUILTINS,
+            'text': text, 'lines': text.splitlines(), 'words': text.split(), 'length': len(text),
+        }
+        return bool(eval(_compile_script(pattern), namespace))
+    raise ValueError(f'Unknown check kind "{kind}".')
+
+
+def _on_alarm(signum, frame):
+    raise TaskTimeout()
+
+
+def evaluate_submission(checks, text, file_path=None):
+    """
+    Run checks, a list of (check_id, name, kind, pattern, points), against
+    a submission's text and file. Returns {'earned', 'possible', 'checks'}.
+    A check that raises counts as failed and records the error.
+    """
+    if file_path:
+        with open(file_path, 'rb') as f:
+            content = f.read(MAX_FILE_BYTES).decode('utf-8', errors='replace')
+        text = f'{text}\n{content}' if text else content
+
+    earned = possible = 0
+    results = []
+    for check_id, name, kind, pattern, points in checks:
+        error = ''
+        try:
+            passed = _run_check(kind, pattern, text)
+        except TaskTimeout:
+            raise
+        except Exception as e:
+            passed, error = False, f'{type(e).__name__}: {e}'
+        possible += points
+        earned += points if passed else 0
+        results.append({'id': check_id, 'name': name, 'passed': passed, 'points': points, 'error': error})
+    return {'earned': earned, 'possible': possible, 'checks': results}
+
+
+def limit_memory(limit):
+    """
+    Pool initializer: let the process allocate at most limit more bytes
+    of address space than it uses now, so a runaway check raises
+    MemoryError instead of getting the process killed.
+    """
+    if resource is None or not limit:
+        return
+    try:
+        with open('/proc/self/statm') as f:
+            in_use = int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        in_use = 0
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    cap = in_use + limit
+    if hard != resource.RLIM_INFINITY:
+        cap = min(cap, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (cap, hard))
+
+
+def evaluate_tasks(tasks, timeout):
+    """
+    Pool entry point: evaluate (job_id, checks, text, file_path) tasks,
+    giving each at most timeout seconds. Returns (job_id, result, error).
+    """
+    use_alarm = hasattr(signal, 'setitimer')
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+    outcomes = []
+    try:
+        for job_id, checks, text, file_path in tasks:
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, timeout)
+                outcomes.append((job_id, evaluate_submission(checks, text, file_path), ''))
+            except TaskTimeout:
+                outcomes.append((job_id, None, f'Timed out after {timeout} seconds.'))
+            except Exception as e:
+                outcomes.append((job_id, None, f'{type(e).__name__}: {e}'))
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous)
+    return outcomes
+
+
+def enqueue_submissions(submissions):
+    """Queue ungraded submissions whose assignments have checks. Returns the number queued."""
+    ids = (
+        submissions.filter(score__isnull=True, assignment__autograde_checks__isnull=False, autograde_job__isnull=True)
+        .distinct().values_list('pk', flat=True)
+    )
+    created = AutogradeJob.objects.bulk_create(
+        [AutogradeJob(submission_id=pk) for pk in ids.iterator()],
+        batch_size=AUTOGRADE_BATCH_SIZE, ignore_conflicts=True,
+    )
+    return len(created)
+
+
+def claim_jobs(batch_size=AUTOGRADE_BATCH_SIZE):
+    """Mark up to batch_size queued jobs as running for this worker and return them."""
+    now = timezone.now()
+    stale = AutogradeJob.objects.filter(status='running', claimed_at__lt=now - AUTOGRADE_STALE_AFTER)
+    stale.filter(attempts__gte=AUTOGRADE_MAX_ATTEMPTS).update(
+        status='failed', claim_token=None, finished_at=now,
+        error=f'Abandoned by a worker {AUTOGRADE_MAX_ATTEMPTS} times; not retried.',
+    )
+    stale.filter(attempts__lt=AUTOGRADE_MAX_ATTEMPTS).update(status='queued', claim_token=None)
+
+    ids = list(AutogradeJob.objects.filter(status='queued').values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4()
+    AutogradeJob.objects.filter(pk__in=ids, status='queued').update(
+        status='running', claim_token=token, claimed_at=now, attempts=F('attempts') + 1
+    )
+    return list(
+        AutogradeJob.objects.filter(claim_token=token)
+        .select_related('submission__assignment__lesson__course')
+    )
+
+
+def _build_tasks(jobs):
+    checks = {}
+    for check in AutogradeCheck.objects.filter(
+        assignment_id__in={job.submission.assignment_id for job in jobs}
+    ):
+        checks.setdefault(check.assignment_id, []).append(
+            (check.pk, check.name, check.kind, check.pattern, check.points)
+        )
+    return [
+        (
+            job.pk,
+            checks.get(job.submission.assignment_id, []),
+            job.submission.text,
+            job.submission.file.path if job.submission.file else None,
+        )
+        for job in jobs
+    ]
+
+
+def _feedback(result):
+    lines = [f"Autograded: {result['earned']}/{result['possible']} points"]
+    for check in result['checks']:
+        mark = 'PASS' if check['passed'] else 'FAIL'
+        lines.append(f"[{mark}] {check['name']} ({check['points']} pts)")
+    return '\n'.join(lines)
+
+
+def write_results(jobs, outcomes):
+    """
+    Save evaluated jobs and grade their submissions. Returns the number
+    of submissions graded.
+    """
+    outcomes = {job_id: (result, error) for job_id, result, error in outcomes}
+    now = timezone.now()
+    with transaction.atomic():
+        already_graded = set(
+            Submission.objects.filter(
+                pk__in=[job.submission_id for job in jobs], score__isnull=False
+            ).values_list('pk', flat=True)
+        )
+        submissions = []
+        for job in jobs:
+            result, error = outcomes.get(job.pk, (None, 'No result from worker.'))
+            job.status = 'failed' if result is None else 'done'
+            job.result, job.error, job.finished_at, job.claim_token = result, error, now, None
+            submission = job.submission
+            if result is None or submission.pk in already_graded:
+                continue
+            max_score = submission.assignment.max_score
+            possible = result['possible']
+            submission.score = round(result['earned'] * max_score / possible) if possible else 0
+            if not submission.feedback:
+                submission.feedback = _feedback(result)
+            submission.updated_at = now
+            submissions.append(submission)
+
+        AutogradeJob.objects.bulk_update(jobs, ['status', 'result', 'error', 'finished_at', 'claim_token'])
+        Submission.objects.bulk_update(submissions, ['score', 'feedback', 'updated_at'])
+    if submissions:
+        # bulk_update skips signals, so refresh cached analytics explicitly
+        invalidate_instructor_analytics(
+            {submission.assignment.lesson.course.instructor_id for submission in submissions}
+        )
+    return len(submissions)
+
+
+def _new_executor(workers, memory_limit):
+    return ProcessPoolExecutor(max_workers=workers, initializer=limit_memory, initargs=(memory_limit,))
+
+
+def _terminate(executor):
+    # Running work cannot be cancelled, so end the processes rather than
+    # wait for a hung one; the executor then counts as broken
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _evaluate_isolated(tasks, timeout, memory_limit):
+    """
+    Evaluate tasks one at a time in a single process, replaced whenever
+    a task kills or hangs it, so only that task's job fails.
+    """
+    outcomes = []
+    executor = _new_executor(1, memory_limit)
+    try:
+        for task in tasks:
+            future = executor.submit(evaluate_tasks, [task], timeout)
+            try:
+                outcomes.extend(future.result(timeout=timeout + CHUNK_GRACE))
+                continue
+            except BrokenProcessPool:
+                outcomes.append((task[0], None, 'The grading process crashed.'))
+            except FutureTimeout:
+                outcomes.append((task[0], None, f'Timed out after {timeout} seconds.'))
+            _terminate(executor)
+            executor = _new_executor(1, memory_limit)
+    finally:
+        executor.shutdown()
+    return outcomes
+
+
+def evaluate_jobs(executor, tasks, workers, timeout, memory_limit):
+    """
+    Evaluate tasks on executor and return (outcomes, executor). If a pool
+    process dies or hangs, the unfinished tasks are evaluated again one by
+    one to find the culprit, and a fresh executor is returned.
+    """
+    # A few chunks per process keeps them busy without pickling every task separately
+    chunk = max(1, -(-len(tasks) // (workers * 4)))
+    chunks = [tasks[i:i + chunk] for i in range(0, len(tasks), chunk)]
+    futures = [executor.submit(evaluate_tasks, chunk_tasks, timeout) for chunk_tasks in chunks]
+    outcomes, unfinished = [], []
+    for chunk_tasks, future in zip(chunks, futures):
+        try:
+            outcomes.extend(future.result(timeout=len(chunk_tasks) * timeout + CHUNK_GRACE))
+        except (BrokenProcessPool, FutureTimeout):
+            unfinished.extend(chunk_tasks)
+        except Exception as e:
+            outcomes.extend((task[0], None, f'{type(e).__name__}: {e}') for task in chunk_tasks)
+    if unfinished:
+        _terminate(executor)
+        outcomes.extend(_evaluate_isolated(unfinished, timeout, memory_limit))
+        executor = _new_executor(workers, memory_limit)
+    return outcomes, executor
+
+
+def run_autograder(workers=None, batch_size=AUTOGRADE_BATCH_SIZE, timeout=None, drain=True, poll_interval=2):
+    """
+    Grade queued submissions until the queue is empty (drain) or forever.
+    Returns {'graded', 'failed', 'jobs', 'seconds'}.
+    """
+    workers = workers or getattr(settings, 'AUTOGRADE_WORKERS', None) or os.cpu_count() or 1
+    timeout = timeout or getattr(settings, 'AUTOGRADE_TASK_TIMEOUT', 5)
+    memory_limit = getattr(settings, 'AUTOGRADE_MEMORY_LIMIT', None)
+    totals = {'graded': 0, 'failed': 0, 'jobs': 0}
+    started = time.perf_counter()
+    executor = _new_executor(workers, memory_limit)
+    try:
+        while True:
+            jobs = claim_jobs(batch_size)
+            if not jobs:
+                if drain:
+                    break
+                time.sleep(poll_interval)
+                continue
+            outcomes, executor = evaluate_jobs(executor, _build_tasks(jobs), workers, timeout, memory_limit)
+            totals['graded'] += write_results(jobs, outcomes)
+            totals['failed'] += sum(1 for job in jobs if job.status == 'failed')
+            totals['jobs'] += len(jobs)
+    finally:
+        executor.shutdown()
+    totals['seconds'] = time.perf_counter() - started
+    return totals
@@ -84,4 +84,22 @@ class GradeSubmissionForm(forms.ModelForm):
                 raise ValidationError(f"Score cannot be higher than {self.assignment.max_score}.")
             if score < 0:
                 raise ValidationError("Score cannot be negative.")
-        return score
\ No newline at end of file
+        return score
+
+
+class GradeImportForm(forms.Form):
+    """
+    Form for uploading a CSV file of grades for one assignment.
+    """
+    file = forms.FileField(
+        help_text="CSV with a header row: submission_id or student, score, and optional feedback."
+    )
+
+    def clean_file(self):
+        """
+        Validate that the upload looks like a CSV file.
+        """
+        file = self.cleaned_data['file']
+        if not file.name.lower().endswith('.csv'):
+            raise ValidationError("Please upload a .csv file.")
+        return file
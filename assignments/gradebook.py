@@ -0,0 +1,105 @@
+"""
+Course gradebook export.
+
+A gradebook has one row per enrolled student and one column per
+assignment in the course, plus the student's lesson completion percent.
+Rows are produced by merging two streams ordered by student id, the
+course's enrollments and its submissions, both read with
+QuerySet.iterator(chunk_size), so memory use stays flat no matter how
+many students the course has.
+"""
+import csv
+import json
+
+from courses.models import Enrollment
+from .models import Assignment, Submission
+
+
+# Rows fetched per database round trip while streaming a gradebook
+GRADEBOOK_CHUNK_SIZE = 2000
+
+
+def get_gradebook_assignments(course):
+    """Return the course's assignments in lesson order as (id, title, max_score) tuples."""
+    return list(
+        Assignment.objects.filter(lesson__course=course)
+        .order_by('lesson__order', 'lesson__created_at', 'due_date', 'pk')
+        .values_list('pk', 'title', 'max_score')
+    )
+
+
+def iter_gradebook_rows(course, assignment_ids, chunk_size=GRADEBOOK_CHUNK_SIZE):
+    """
+    Yield (student_id, username, completion_percent, scores) for every
+    student enrolled in the course, ordered by student id. scores lists
+    one score (or None) per assignment id, in the given order.
+    """
+    lesson_count = course.get_lessons_count()
+    columns = {assignment_id: index for index, assignment_id in enumerate(assignment_ids)}
+
+    enrollments = (
+        Enrollment.objects.filter(course=course).order_by('student_id')
+        .values_list('student_id', 'student__username', 'completed_lessons_count')
+        .iterator(chunk_size=chunk_size)
+    )
+    submissions = (
+        Submission.objects.filter(assignment_id__in=assignment_ids).order_by('student_id')
+        .values_list('student_id', 'assignment_id', 'score')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    pending = next(submissions, None)
+    for student_id, username, completed_lessons in enrollments:
+        scores = [None] * len(assignment_ids)
+        # Skip submissions from students who are no longer enrolled
+        while pending is not None and pending[0] < student_id:
+            pending = next(submissions, None)
+        while pending is not None and pending[0] == student_id:
+            scores[columns[pending[1]]] = pending[2]
+            pending = next(submissions, None)
+        completion = min(100, round(completed_lessons * 100 / lesson_count)) if lesson_count else 0
+        yield student_id, username, completion, scores
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_gradebook_csv(course, chunk_size=GRADEBOOK_CHUNK_SIZE):
+    """Yield the gradebook as CSV lines, header first."""
+    assignments = get_gradebook_assignments(course)
+    writer = csv.writer(Echo())
+    yield writer.writerow(
+        ['student_id', 'student', 'completion_percent']
+        + [f'{title} (/{max_score})' for _, title, max_score in assignments]
+    )
+    assignment_ids = [pk for pk, _, _ in assignments]
+    for student_id, username, completion, scores in iter_gradebook_rows(course, assignment_ids, chunk_size):
+        yield writer.writerow(
+            [student_id, username, completion] + ['' if score is None else score for score in scores]
+        )
+
+
+def stream_gradebook_jsonl(course, chunk_size=GRADEBOOK_CHUNK_SIZE):
+    """
+    Yield the gradebook as JSON lines: one object describing the
+    assignments, then one object per student.
+    """
+    assignments = get_gradebook_assignments(course)
+    yield json.dumps({
+        'course': course.pk,
+        'assignments': [
+            {'id': pk, 'title': title, 'max_score': max_score} for pk, title, max_score in assignments
+        ],
+    }) + '\n'
+    assignment_ids = [pk for pk, _, _ in assignments]
+    for student_id, username, completion, scores in iter_gradebook_rows(course, assignment_ids, chunk_size):
+        yield json.dumps({
+            'student_id': student_id,
+            'student': username,
+            'completion_percent': completion,
+            'scores': {str(pk): score for pk, score in zip(assignment_ids, scores)},
+        }) + '\n'
@@ -0,0 +1,149 @@
+"""
+Bulk grading for assignment submissions.
+
+Grades arrive as an iterable of rows (from the JSON endpoint or a CSV
+upload), each naming a submission by submission_id or by the student's
+username, plus a score and optional feedback. Rows are validated against
+the assignment's max_score as they are read and written with one
+bulk_update per batch, so a large CSV file is never held in memory.
+Invalid rows are skipped and reported; valid rows are still applied.
+"""
+import codecs
+import csv
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from courses.analytics import invalidate_instructor_analytics
+from .models import Submission
+
+
+# Number of grade rows looked up and written per bulk_update
+GRADE_BATCH_SIZE = 500
+
+
+class GradingReport:
+    """
+    Outcome of a bulk grading run: how many submissions were updated and
+    a list of {'row', 'error'} dicts for rows that were rejected.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.updated_ids = set()
+        self.errors = []
+
+    @property
+    def updated(self):
+        return len(self.updated_ids)
+
+    def add_error(self, row, error):
+        self.errors.append({'row': row, 'error': error})
+
+    def as_dict(self):
+        return {'rows': self.rows, 'updated': self.updated, 'errors': self.errors}
+
+
+def iter_csv_grades(uploaded_file, encoding='utf-8-sig'):
+    """
+    Return a reader yielding grade rows from an uploaded CSV file one line
+    at a time. The header must include score and either submission_id or
+    student; feedback is optional. Raises ValueError for a bad header.
+    """
+    reader = csv.DictReader(codecs.iterdecode(uploaded_file, encoding))
+    columns = set(reader.fieldnames or [])
+    if 'score' not in columns or not columns & {'submission_id', 'student'}:
+        raise ValueError('The CSV header must include score and either submission_id or student.')
+    return reader
+
+
+def _clean_score(value, max_score):
+    if value is None or str(value).strip() == '':
+        raise ValueError('Score is required.')
+    try:
+        score = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f'Score "{value}" is not a whole number.')
+    if score < 0:
+        raise ValueError('Score cannot be negative.')
+    if score > max_score:
+        raise ValueError(f'Score cannot be higher than {max_score}.')
+    return score
+
+
+def _clean_row(row, max_score):
+    """Return (key, score, feedback) for a raw row, raising ValueError if invalid."""
+    if not isinstance(row, dict):
+        raise ValueError('Each row must be an object.')
+    submission_id = str(row.get('submission_id') or '').strip()
+    student = str(row.get('student') or '').strip()
+    if submission_id:
+        if not submission_id.isdigit():
+            raise ValueError(f'Submission id "{submission_id}" is not valid.')
+        key = ('id', int(submission_id))
+    elif student:
+        key = ('student', student)
+    else:
+        raise ValueError('Each row needs a submission_id or student.')
+    feedback = row.get('feedback')
+    if feedback is not None and not isinstance(feedback, str):
+        raise ValueError('Feedback must be text.')
+    return key, _clean_score(row.get('score'), max_score), feedback
+
+
+def _write_batch(assignment, batch, report):
+    """Resolve a batch of cleaned rows to submissions and bulk_update them."""
+    ids = [key[1] for key, _, _, _ in batch if key[0] == 'id']
+    usernames = [key[1] for key, _, _, _ in batch if key[0] == 'student']
+    matches = Submission.objects.filter(assignment=assignment).filter(
+        Q(pk__in=ids) | Q(student__username__in=usernames)
+    )
+    found = {}
+    for pk, username, feedback in matches.values_list('pk', 'student__username', 'feedback'):
+        found[('id', pk)] = (pk, feedback)
+        found[('student', username)] = (pk, feedback)
+
+    now = timezone.now()
+    updates = {}
+    for key, score, feedback, row_number in batch:
+        if key not in found:
+            label = 'submission' if key[0] == 'id' else 'submission from student'
+            report.add_error(row_number, f'No {label} "{key[1]}" for this assignment.')
+            continue
+        pk, current_feedback = found[key]
+        # A later row for the same submission wins
+        updates[pk] = Submission(
+            pk=pk, score=score, updated_at=now,
+            feedback=current_feedback if feedback is None else feedback,
+        )
+    if updates:
+        Submission.objects.bulk_update(updates.values(), ['score', 'feedback', 'updated_at'])
+        report.updated_ids.update(updates)
+
+
+def apply_grades(assignment, rows, batch_size=GRADE_BATCH_SIZE):
+    """
+    Validate and apply grade rows for one assignment, returning a
+    GradingReport. Row numbers in the report start at 1.
+    """
+    report = GradingReport()
+    batch = []
+    with transaction.atomic():
+        for row_number, row in enumerate(rows, start=1):
+            report.rows += 1
+            try:
+                key, score, feedback = _clean_row(row, assignment.max_score)
+            except ValueError as exc:
+                report.add_error(row_number, str(exc))
+                continue
+            batch.append((key, score, feedback, row_number))
+            if len(batch) >= batch_size:
+                _write_batch(assignment, batch, report)
+                batch = []
+        if batch:
+            _write_batch(assignment, batch, report)
+
+    if report.updated:
+        invalidate_instructor_analytics([assignment.lesson.course.instructor_id])
+    report.errors.sort(key=lambda error: error['row'])
+    return report
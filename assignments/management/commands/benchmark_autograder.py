@@ -0,0 +1,95 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+from accounts.models import User
+from assignments.autograde import AUTOGRADE_BATCH_SIZE, enqueue_submissions, run_autograder
+from assignments.models import Assignment, AutogradeCheck, Submission
+from courses.models import Course
+from lessons.models import Lesson
+
+
+WORDS = (
+    'function variable loop class object return value list string index '
+    'recursion algorithm complexity memory database query model view test'
+).split()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure autograder throughput (submissions graded per second) on throwaway data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--submissions',
+            type=int,
+            default=2000,
+            help='Number of synthetic submissions to grade (default: 2000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of grading processes (default: AUTOGRADE_WORKERS or one per CPU)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=AUTOGRADE_BATCH_SIZE,
+            help=f'Number of jobs claimed per batch (default: {AUTOGRADE_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            # Everything created here is rolled back afterwards
+            with transaction.atomic():
+                totals = self.run_benchmark(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+        rate = totals['graded'] / totals['seconds'] if totals['seconds'] else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully graded {totals['graded']} submissions in {totals['seconds']:.2f}s "
+                f"({rate:.1f} submissions/s, {totals['failed']} failed)"
+            )
+        )
+
+    def run_benchmark(self, options):
+        rng = random.Random(0)
+        instructor = User.objects.create_user(username='autograde_benchmark', role='instructor')
+        course = Course.objects.create(title='Autograder Benchmark', description='-', instructor=instructor)
+        lesson = Lesson.objects.create(title='Benchmark', description='-', course=course, order=1)
+        assignment = Assignment.objects.create(
+            title='Benchmark', description='-', lesson=lesson, due_date=timezone.now() + timedelta(days=1)
+        )
+        AutogradeCheck.objects.bulk_create([
+            AutogradeCheck(assignment=assignment, name='Mentions recursion', kind='regex',
+                           pattern=r'\brecursion\b', points=2),
+            AutogradeCheck(assignment=assignment, name='Defines a function', kind='regex',
+                           pattern=r'^def \w+\(', points=3),
+            AutogradeCheck(assignment=assignment, name='Long enough', kind='script',
+                           pattern="len(words) >= 100 and 'test' in text.lower()", points=3),
+            AutogradeCheck(assignment=assignment, name='Exact answer', kind='expected_output',
+                           pattern='42', points=2),
+        ])
+
+        count = options['submissions']
+        students = User.objects.bulk_create([
+            User(username=f'autograde_benchmark_{i}', role='student') for i in range(count)
+        ])
+        Submission.objects.bulk_create([
+            Submission(
+                assignment=assignment, student=student,
+                text='def solve(n):\n' + ' '.join(rng.choice(WORDS) for _ in range(rng.randint(50, 400))),
+            )
+            for student in students
+        ], batch_size=1000)
+        enqueue_submissions(Submission.objects.filter(assignment=assignment))
+
+        return run_autograder(workers=options['workers'], batch_size=options['batch_size'])
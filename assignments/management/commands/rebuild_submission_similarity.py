@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from assignments.similarity import INDEX_BATCH_SIZE, rebuild_similarity_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MinHash similarity index for text submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=INDEX_BATCH_SIZE,
+            help=f'Number of submissions indexed per batch (default: {INDEX_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        indexed = rebuild_similarity_index(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully indexed {indexed} text submissions')
+        )
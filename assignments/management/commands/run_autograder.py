@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from assignments.autograde import AUTOGRADE_BATCH_SIZE, enqueue_submissions, run_autograder
+from assignments.models import Submission
+
+
+class Command(BaseCommand):
+    help = 'Grade queued submissions with the assignment autograde checks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of grading processes (default: AUTOGRADE_WORKERS or one per CPU)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=AUTOGRADE_BATCH_SIZE,
+            help=f'Number of jobs claimed per batch (default: {AUTOGRADE_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            help='Seconds one submission may take (default: AUTOGRADE_TASK_TIMEOUT)'
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='First queue every ungraded submission of assignments with checks'
+        )
+        parser.add_argument(
+            '--forever',
+            action='store_true',
+            help='Keep polling for new jobs instead of exiting when the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            queued = enqueue_submissions(Submission.objects.all())
+            self.stdout.write(f"Queued {queued} submissions")
+
+        totals = run_autograder(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            timeout=options['timeout'],
+            drain=not options['forever'],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully processed {totals['jobs']} jobs: {totals['graded']} graded, "
+                f"{totals['failed']} failed in {totals['seconds']:.2f}s"
+            )
+        )
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0002_submission_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutogradeCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('kind', models.CharField(choices=[('regex', 'Regular expression'), ('expected_output', 'Expected output'), ('script', 'Scripted check')], default='regex', max_length=20)),
+                ('pattern', models.TextField()),
+                ('points', models.PositiveIntegerField(default=1)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='autograde_checks', to='assignments.assignment')),
+            ],
+            options={
+                'ordering': ['assignment', 'order', 'pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AutogradeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('claim_token', models.UUIDField(blank=True, null=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='autograde_job', to='assignments.submission')),
+            ],
+            options={
+                'ordering': ['pk'],
+                'indexes': [models.Index(fields=['status', 'id'], name='assignments_job_status_idx'), models.Index(fields=['claim_token'], name='assignments_job_claim_idx')],
+            },
+        ),
+    ]
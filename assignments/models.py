@@ -49,6 +49,10 @@ class Submission(models.Model):
     class Meta:
         unique_together = ('assignment', 'student')
         ordering = ['-submitted_at']
+        indexes = [
+            # Graded / ungraded submissions of an assignment and gradebook scores
+            models.Index(fields=['assignment', 'score'], name='assignments_sub_score_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username}'s submission for {self.assignment.title}"
@@ -60,4 +64,102 @@ class Submission(models.Model):
         """
         Check if the submission has been graded.
         """
-        return self.score is not None
\ No newline at end of file
+        return self.score is not None
+
+
+class SubmissionSignature(models.Model):
+    """
+    MinHash signature of a submission's text (see assignments/similarity.py).
+    """
+    submission = models.OneToOneField(
+        Submission, on_delete=models.CASCADE, primary_key=True, related_name='signature'
+    )
+    # NUM_PERM little-endian uint32 minimum hashes
+    minhashes = models.BinaryField()
+    text_digest = models.CharField(max_length=40)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Signature for submission {self.submission_id}"
+
+
+class SubmissionBand(models.Model):
+    """
+    One locality-sensitive hashing bucket of a submission's signature.
+    Submissions sharing any (band, bucket) are similarity candidates.
+    """
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='similarity_bands')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ('submission', 'band')
+        indexes = [
+            models.Index(fields=['bucket', 'band'], name='assignments_band_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"Band {self.band} of submission {self.submission_id}"
+
+
+class AutogradeCheck(models.Model):
+    """
+    One automatic check of an assignment's submissions, worth points
+    (see assignments/autograde.py).
+    """
+    KIND_CHOICES = (
+        ('regex', 'Regular expression'),
+        ('expected_output', 'Expected output'),
+        ('script', 'Scripted check'),
+    )
+
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='autograde_checks')
+    name = models.CharField(max_length=200)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='regex')
+    # Regex to search for, expected text, or expression over the submission
+    pattern = models.TextField()
+    points = models.PositiveIntegerField(default=1)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['assignment', 'order', 'pk']
+
+    def __str__(self):
+        return f"{self.name} ({self.assignment.title})"
+
+    def clean(self):
+        from .autograde import validate_check
+        validate_check(self.kind, self.pattern)
+
+
+class AutogradeJob(models.Model):
+    """
+    Queue entry asking the autograder worker to grade a submission.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name='autograde_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    # Set by the worker that claimed the job
+    claim_token = models.UUIDField(blank=True, null=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='assignments_job_status_idx'),
+            models.Index(fields=['claim_token'], name='assignments_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Autograde job for submission {self.submission_id} ({self.status})"
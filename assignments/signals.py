@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import AutogradeCheck, AutogradeJob, Submission
+from .similarity import index_submission
+
+
+@receiver(post_save, sender=Submission)
+def index_submission_similarity(sender, instance, created, update_fields=None, **kwargs):
+    """Refresh the submission's MinHash signature when its text may have changed."""
+    if created and not instance.text:
+        return
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    index_submission(instance)
+
+
+@receiver(post_save, sender=Submission)
+def enqueue_autograde_job(sender, instance, created, **kwargs):
+    """Queue new submissions for the autograder if their assignment has checks."""
+    if created and instance.score is None and AutogradeCheck.objects.filter(
+        assignment_id=instance.assignment_id
+    ).exists():
+        AutogradeJob.objects.create(submission=instance)
@@ -0,0 +1,275 @@
+"""
+Near-duplicate detection for text submissions.
+
+Each submission's text is split into overlapping word shingles and
+summarised by a MinHash signature of NUM_PERM minimum hashes; the share
+of equal positions in two signatures estimates the Jaccard similarity
+of their shingle sets. Signatures are cut into BANDS bands of ROWS
+hashes, and each band is hashed into a bucket stored in SubmissionBand.
+Submissions that share a (band, bucket) are candidates, so finding the
+matches for one submission is an indexed lookup and finding every
+similar pair in a set is a single sort over its bands, instead of
+comparing all pairs.
+
+With 32 bands of 4 rows, pairs at 0.5 similarity become candidates
+about 87% of the time and pairs at 0.8 almost always, while pairs below
+0.2 rarely do. Candidates are then filtered on their estimated
+similarity. A lookup reads at most MAX_BUCKET_ROWS submissions from each
+bucket, so text shared by a whole assignment does not make it linear.
+"""
+import hashlib
+import re
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .models import Submission, SubmissionBand, SubmissionSignature
+
+
+SHINGLE_SIZE = 3
+BANDS = 32
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+
+# Estimated Jaccard similarity at which submissions count as similar
+SIMILARITY_THRESHOLD = 0.5
+
+# Candidates sharing the most buckets that are compared for one submission
+MAX_CANDIDATES = 500
+
+# Submissions read from one bucket for one lookup. Boilerplate text can
+# put most of an assignment in the same bucket; the newest are kept.
+MAX_BUCKET_ROWS = 100
+
+# Submissions indexed per batch by rebuild_similarity_index()
+INDEX_BATCH_SIZE = 500
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Hashes are kept below the Mersenne prime 2**31 - 1 so that a * x + b
+# fits in an unsigned 64-bit integer.
+PRIME = (1 << 31) - 1
+
+
+def _coefficients(label):
+    values = [
+        int.from_bytes(hashlib.blake2b(f'{label}{i}'.encode(), digest_size=4).digest(), 'little')
+        for i in range(NUM_PERM)
+    ]
+    return np.array(values, dtype=np.uint64) % np.uint64(PRIME)
+
+
+# One (a, b) pair per permutation, fixed so signatures stay comparable
+PERM_A = np.maximum(_coefficients('a'), 1)
+PERM_B = _coefficients('b')
+
+
+def shingles(text):
+    """Return the set of lower-cased SHINGLE_SIZE-word shingles in text."""
+    words = TOKEN_RE.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """Return the MinHash signature of text as a uint32 array, or None if it has no words."""
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return None
+    hashes = np.array(
+        [
+            int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=4).digest(), 'little')
+            for shingle in shingle_set
+        ],
+        dtype=np.uint64,
+    ) % np.uint64(PRIME)
+    permuted = (np.outer(PERM_A, hashes) + PERM_B[:, None]) % np.uint64(PRIME)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature):
+    """Return the bucket of each band of a signature as signed 64-bit integers."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            'little', signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def _text_digest(text):
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _to_signature(minhashes):
+    return np.frombuffer(bytes(minhashes), dtype='<u4')
+
+
+def index_submission(submission):
+    """
+    Store the signature and band buckets of one submission, replacing any
+    previous ones. Does nothing if the text is unchanged since it was
+    last indexed.
+    """
+    digest = _text_digest(submission.text)
+    # Checked before hashing: full saves that leave the text alone are common
+    if SubmissionSignature.objects.filter(pk=submission.pk, text_digest=digest).exists():
+        return
+    signature = minhash(submission.text)
+    if signature is None:
+        SubmissionSignature.objects.filter(pk=submission.pk).delete()
+        SubmissionBand.objects.filter(submission_id=submission.pk).delete()
+        return
+
+    with transaction.atomic():
+        SubmissionSignature.objects.update_or_create(
+            submission_id=submission.pk,
+            defaults={'minhashes': signature.astype('<u4').tobytes(), 'text_digest': digest},
+        )
+        SubmissionBand.objects.filter(submission_id=submission.pk).delete()
+        SubmissionBand.objects.bulk_create([
+            SubmissionBand(submission_id=submission.pk, band=band, bucket=bucket)
+            for band, bucket in enumerate(band_buckets(signature))
+        ])
+
+
+def rebuild_similarity_index(batch_size=INDEX_BATCH_SIZE):
+    """Recompute every submission's signature and buckets. Returns the number indexed."""
+    SubmissionSignature.objects.all().delete()
+    SubmissionBand.objects.all().delete()
+
+    indexed = 0
+    submissions = Submission.objects.exclude(text='').order_by('pk').values_list('pk', 'text')
+    batch = []
+    for pk, text in submissions.iterator(chunk_size=batch_size):
+        batch.append((pk, text))
+        if len(batch) >= batch_size:
+            indexed += _index_batch(batch)
+            batch = []
+    if batch:
+        indexed += _index_batch(batch)
+    return indexed
+
+
+def _index_batch(batch):
+    signatures, bands = [], []
+    for pk, text in batch:
+        signature = minhash(text)
+        if signature is None:
+            continue
+        signatures.append(SubmissionSignature(
+            submission_id=pk, minhashes=signature.astype('<u4').tobytes(), text_digest=_text_digest(text)
+        ))
+        bands.extend(
+            SubmissionBand(submission_id=pk, band=band, bucket=bucket)
+            for band, bucket in enumerate(band_buckets(signature))
+        )
+    with transaction.atomic():
+        SubmissionSignature.objects.bulk_create(signatures)
+        SubmissionBand.objects.bulk_create(bands)
+    return len(signatures)
+
+
+def _estimate_similarities(signature, others):
+    """Return the share of equal MinHash positions between signature and each row of others."""
+    return (np.stack(others) == signature).mean(axis=1)
+
+
+def find_similar_submissions(
+    submission, submissions=None, threshold=SIMILARITY_THRESHOLD, limit=10, bucket_rows=MAX_BUCKET_ROWS
+):
+    """
+    Return up to limit submissions whose text is similar to this one,
+    most similar first, each with a similarity attribute (0 to 1).
+    submissions optionally restricts the search, e.g. to the courses
+    the viewer teaches. At most bucket_rows submissions are read from
+    each shared bucket.
+    """
+    own_bands = set(SubmissionBand.objects.filter(submission_id=submission.pk).values_list('band', 'bucket'))
+    if not own_bands:
+        return []
+
+    candidates = SubmissionBand.objects.filter(
+        bucket__in={bucket for _, bucket in own_bands}
+    ).exclude(submission_id=submission.pk)
+    if submissions is not None:
+        candidates = candidates.filter(submission__in=submissions)
+    # Numbered within each bucket in the query, so oversized buckets are cut there
+    candidates = candidates.annotate(
+        bucket_rank=Window(RowNumber(), partition_by=[F('band'), F('bucket')], order_by=F('submission_id').desc())
+    ).filter(bucket_rank__lte=bucket_rows)
+    shared = defaultdict(int)
+    for submission_id, band, bucket in candidates.values_list('submission_id', 'band', 'bucket'):
+        if (band, bucket) in own_bands:
+            shared[submission_id] += 1
+    if not shared:
+        return []
+    candidate_ids = sorted(shared, key=lambda pk: -shared[pk])[:MAX_CANDIDATES]
+
+    rows = dict(
+        SubmissionSignature.objects.filter(pk__in=candidate_ids + [submission.pk])
+        .values_list('submission_id', 'minhashes')
+    )
+    # Rows can vanish between the queries when a submission is re-indexed or deleted
+    own = rows.pop(submission.pk, None)
+    if own is None or not rows:
+        return []
+    own = _to_signature(own)
+    ids = list(rows)
+    similarities = _estimate_similarities(own, [_to_signature(rows[pk]) for pk in ids])
+    matches = sorted(
+        ((pk, float(value)) for pk, value in zip(ids, similarities) if value >= threshold),
+        key=lambda match: (-match[1], match[0]),
+    )[:limit]
+
+    found = Submission.objects.select_related('student', 'assignment__lesson__course').in_bulk(
+        [pk for pk, _ in matches]
+    )
+    results = []
+    for pk, similarity in matches:
+        match = found[pk]
+        match.similarity = similarity
+        results.append(match)
+    return results
+
+
+def similar_pairs(submissions, threshold=SIMILARITY_THRESHOLD):
+    """
+    Return (submission_id, other_id, similarity) for every similar pair
+    within a Submission queryset, most similar first.
+    """
+    bands = (
+        SubmissionBand.objects.filter(submission__in=submissions)
+        .order_by('band', 'bucket', 'submission_id')
+        .values_list('band', 'bucket', 'submission_id')
+    )
+    candidate_pairs = set()
+    group, current = [], None
+    for band, bucket, submission_id in bands.iterator(chunk_size=INDEX_BATCH_SIZE):
+        if (band, bucket) != current:
+            current, group = (band, bucket), []
+        candidate_pairs.update((other, submission_id) for other in group)
+        group.append(submission_id)
+    if not candidate_pairs:
+        return []
+
+    ids = {pk for pair in candidate_pairs for pk in pair}
+    signatures = {
+        pk: _to_signature(minhashes)
+        for pk, minhashes in SubmissionSignature.objects.filter(pk__in=ids).values_list('submission_id', 'minhashes')
+    }
+    pairs = sorted(candidate_pairs)
+    first = np.stack([signatures[a] for a, _ in pairs])
+    second = np.stack([signatures[b] for _, b in pairs])
+    similarities = (first == second).mean(axis=1)
+    return sorted(
+        (
+            (a, b, float(value))
+            for (a, b), value in zip(pairs, similarities) if value >= threshold
+        ),
+        key=lambda pair: (-pair[2], pair[0], pair[1]),
+    )
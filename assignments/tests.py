@@ -1,11 +1,34 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from courses.models import Category, Course, Enrollment
 from lessons.models import Lesson
-from assignments.models import Assignment
+from assignments.models import (
+    Assignment, AutogradeCheck, AutogradeJob, Submission, SubmissionBand, SubmissionSignature
+)
+from assignments.autograde import (
+    AUTOGRADE_MAX_ATTEMPTS, AUTOGRADE_STALE_AFTER, claim_jobs, evaluate_submission, evaluate_tasks,
+    run_autograder, validate_check,
+)
+from django.core.exceptions import ValidationError
+from assignments import autograde, similarity
+from assignments.gradebook import get_gradebook_assignments, iter_gradebook_rows
+from assignments.analytics import GradebookMatrix, get_gradebook_stats
+from assignments.similarity import BANDS, find_similar_submissions, minhash, similar_pairs
+from django.core.management import call_command
+from io import StringIO
+from django.core.cache import cache
+from courses.progress import record_lesson_completions
 from datetime import timedelta
+import json
 
 User = get_user_model()
 
@@ -88,4 +111,654 @@ class AssignmentsTestCase(TestCase):
         """Test that students can access assignments for enrolled courses"""
         self.client.login(username='teststudent', password='testpass123')
         response = self.client.get(reverse('assignment_list') + f'?lesson={self.lesson.pk}')
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+
+class SubmissionStatusTestCase(TestCase):
+    def setUp(self):
+        self.student_user = User.objects.create_user(
+            username='statusstudent', password='testpass123', role='student'
+        )
+        self.other_student = User.objects.create_user(
+            username='otherstudent', password='testpass123', role='student'
+        )
+        self.instructor_user = User.objects.create_user(
+            username='statusinstructor', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Status Course', description='d', instructor=self.instructor_user, published=True
+        )
+        self.lesson = Lesson.objects.create(title='L', description='d', course=self.course, order=1)
+        Enrollment.objects.create(student=self.student_user, course=self.course)
+        Enrollment.objects.create(student=self.other_student, course=self.course)
+        self.assignments = [
+            Assignment.objects.create(
+                title=f'A{i}', description='d', lesson=self.lesson,
+                due_date=timezone.now() + timedelta(days=7), max_score=50
+            )
+            for i in range(3)
+        ]
+        # Another student's graded work must not show up as ours
+        for assignment in self.assignments:
+            Submission.objects.create(assignment=assignment, student=self.other_student, text='x', score=40)
+        Submission.objects.create(assignment=self.assignments[0], student=self.student_user, text='mine')
+
+    def list_url(self):
+        return reverse('assignment_list') + f'?lesson={self.lesson.pk}'
+
+    def test_student_sees_own_status(self):
+        """Test that each row shows the current student's own submission"""
+        self.client.login(username='statusstudent', password='testpass123')
+        response = self.client.get(self.list_url())
+        statuses = {a.pk: a.user_submission for a in response.context['page_obj']}
+        self.assertEqual(statuses[self.assignments[0].pk].student, self.student_user)
+        self.assertIsNone(statuses[self.assignments[1].pk])
+        self.assertContains(response, 'Submitted')
+        self.assertContains(response, 'Not Submitted', count=2)
+        self.assertNotContains(response, 'Graded (40/50)')
+
+    def test_list_queries_do_not_grow_per_row(self):
+        """Test that the list page issues a constant number of queries"""
+        self.client.login(username='statusstudent', password='testpass123')
+        # Session, user, lesson, course, enrollment check, page count, page, submissions
+        with self.assertNumQueries(8):
+            self.client.get(self.list_url())
+        self.client.login(username='statusinstructor', password='testpass123')
+        # Session, user, lesson, course, instructor check, page count, annotated page
+        with self.assertNumQueries(7):
+            response = self.client.get(self.list_url())
+        self.assertContains(response, '2 submissions (1 graded)')
+        self.assertContains(response, '1 submissions (1 graded)', count=2)
+
+    def test_detail_uses_annotated_counts(self):
+        """Test that the detail page shows counts and the student's own submission"""
+        self.client.login(username='statusinstructor', password='testpass123')
+        response = self.client.get(reverse('assignment_detail', kwargs={'pk': self.assignments[0].pk}))
+        self.assertContains(response, 'View Submissions (2, 1 graded)')
+
+        self.client.login(username='statusstudent', password='testpass123')
+        response = self.client.get(reverse('assignment_detail', kwargs={'pk': self.assignments[1].pk}))
+        self.assertIsNone(response.context['submission'])
+
+
+class BulkGradingTestCase(TestCase):
+    def setUp(self):
+        self.instructor_user = User.objects.create_user(
+            username='gradinginstructor', password='testpass123', role='instructor'
+        )
+        self.other_instructor = User.objects.create_user(
+            username='otherinstructor', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Grading Course', description='d', instructor=self.instructor_user, published=True
+        )
+        lesson = Lesson.objects.create(title='L', description='d', course=self.course, order=1)
+        self.assignment = Assignment.objects.create(
+            title='Graded', description='d', lesson=lesson,
+            due_date=timezone.now() + timedelta(days=7), max_score=20
+        )
+        self.students = [
+            User.objects.create_user(username=f'gradee{i}', password='testpass123', role='student')
+            for i in range(3)
+        ]
+        self.submissions = [
+            Submission.objects.create(assignment=self.assignment, student=student, text='work', feedback='old')
+            for student in self.students
+        ]
+        self.client.login(username='gradinginstructor', password='testpass123')
+
+    def post_grades(self, grades):
+        return self.client.post(
+            reverse('bulk_grade_submissions', kwargs={'assignment_pk': self.assignment.pk}),
+            data=json.dumps({'grades': grades}),
+            content_type='application/json'
+        )
+
+    def test_bulk_endpoint_validates_and_reports(self):
+        """Test that valid rows are applied and invalid rows reported"""
+        response = self.post_grades([
+            {'submission_id': self.submissions[0].pk, 'score': 18, 'feedback': 'Nice'},
+            {'student': 'gradee1', 'score': 25},
+            {'student': 'gradee2', 'score': 'ten'},
+            {'student': 'nobody', 'score': 5},
+            {'student': 'gradee2', 'score': 12},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['rows'], 5)
+        self.assertEqual(data['updated'], 2)
+        self.assertEqual([error['row'] for error in data['errors']], [2, 3, 4])
+        self.assertIn('higher than 20', data['errors'][0]['error'])
+
+        for submission in self.submissions:
+            submission.refresh_from_db()
+        self.assertEqual((self.submissions[0].score, self.submissions[0].feedback), (18, 'Nice'))
+        self.assertIsNone(self.submissions[1].score)
+        self.assertEqual((self.submissions[2].score, self.submissions[2].feedback), (12, 'old'))
+
+    def test_bulk_endpoint_rejects_non_text_feedback(self):
+        """Test that feedback which is not a string is a row error, not a server error"""
+        response = self.post_grades([
+            {'student': 'gradee0', 'score': 15, 'feedback': {'a': 1}},
+            {'student': 'gradee1', 'score': 16, 'feedback': ['x']},
+            {'student': 'gradee2', 'score': 17, 'feedback': None},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['updated'], 1)
+        self.assertEqual(data['errors'], [
+            {'row': 1, 'error': 'Feedback must be text.'}, {'row': 2, 'error': 'Feedback must be text.'},
+        ])
+        self.submissions[0].refresh_from_db()
+        self.assertIsNone(self.submissions[0].score)
+
+    def test_bulk_endpoint_uses_one_update_per_batch(self):
+        """Test that grades are written with a single UPDATE"""
+        grades = [{'submission_id': s.pk, 'score': 10} for s in self.submissions]
+        with CaptureQueriesContext(connection) as queries:
+            self.post_grades(grades)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Submission.objects.filter(score=10).count(), 3)
+
+    def test_bulk_endpoint_requires_course_instructor(self):
+        """Test that other instructors cannot grade the assignment"""
+        self.client.login(username='otherinstructor', password='testpass123')
+        response = self.post_grades([{'student': 'gradee0', 'score': 1}])
+        self.assertEqual(response.status_code, 403)
+
+    def test_csv_import(self):
+        """Test grading from an uploaded CSV file"""
+        content = (
+            'student,score,feedback\n'
+            'gradee0,20,Perfect\n'
+            'gradee1,-1,\n'
+            'gradee2,7,"Needs work, see notes"\n'
+        ).encode()
+        response = self.client.post(
+            reverse('import_grades', kwargs={'assignment_pk': self.assignment.pk}),
+            {'file': SimpleUploadedFile('grades.csv', content, content_type='text/csv')}
+        )
+        self.assertEqual(response.status_code, 200)
+        report = response.context['report']
+        self.assertEqual(report.updated, 2)
+        self.assertEqual(report.errors, [{'row': 2, 'error': 'Score cannot be negative.'}])
+        self.submissions[2].refresh_from_db()
+        self.assertEqual(self.submissions[2].feedback, 'Needs work, see notes')
+
+    def test_csv_import_rejects_bad_header(self):
+        """Test that a CSV without the required columns is rejected"""
+        response = self.client.post(
+            reverse('import_grades', kwargs={'assignment_pk': self.assignment.pk}),
+            {'file': SimpleUploadedFile('grades.csv', b'name,points\nx,1\n', content_type='text/csv')}
+        )
+        self.assertIsNone(response.context['report'])
+        self.assertContains(response, 'header must include score')
+
+
+class GradebookExportTestCase(TestCase):
+    def setUp(self):
+        self.instructor_user = User.objects.create_user(
+            username='bookinstructor', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Gradebook Course', description='d', instructor=self.instructor_user, published=True
+        )
+        self.lessons = [
+            Lesson.objects.create(title=f'L{i}', description='d', course=self.course, order=i)
+            for i in range(2)
+        ]
+        self.assignments = [
+            Assignment.objects.create(
+                title=f'Essay {i}', description='d', lesson=self.lessons[i],
+                due_date=timezone.now() + timedelta(days=7), max_score=10
+            )
+            for i in range(2)
+        ]
+        self.students = [
+            User.objects.create_user(username=f'book{i}', password='testpass123', role='student')
+            for i in range(3)
+        ]
+        enrollments = [Enrollment.objects.create(student=student, course=self.course) for student in self.students]
+        record_lesson_completions(enrollments[0], self.lessons[:1])
+        Submission.objects.create(assignment=self.assignments[0], student=self.students[0], text='a', score=9)
+        Submission.objects.create(assignment=self.assignments[1], student=self.students[0], text='b')
+        Submission.objects.create(assignment=self.assignments[1], student=self.students[2], text='c', score=4)
+        # Submission from a student who has since left the course
+        dropout = User.objects.create_user(username='dropout', password='testpass123', role='student')
+        Submission.objects.create(assignment=self.assignments[0], student=dropout, text='d', score=1)
+        self.client.login(username='bookinstructor', password='testpass123')
+
+    def test_rows_merge_enrollments_and_submissions(self):
+        """Test one row per enrolled student with scores in assignment order"""
+        assignment_ids = [pk for pk, _, _ in get_gradebook_assignments(self.course)]
+        rows = list(iter_gradebook_rows(self.course, assignment_ids, chunk_size=1))
+        self.assertEqual(rows, [
+            (self.students[0].pk, 'book0', 50, [9, None]),
+            (self.students[1].pk, 'book1', 0, [None, None]),
+            (self.students[2].pk, 'book2', 0, [None, 4]),
+        ])
+
+    def test_csv_export(self):
+        """Test that the CSV export streams a header and one line per student"""
+        response = self.client.get(reverse('export_gradebook', kwargs={'course_pk': self.course.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'student_id,student,completion_percent,Essay 0 (/10),Essay 1 (/10)')
+        self.assertEqual(lines[1], f'{self.students[0].pk},book0,50,9,')
+        self.assertEqual(len(lines), 4)
+
+    def test_jsonl_export(self):
+        """Test that the JSON lines export describes assignments, then students"""
+        response = self.client.get(
+            reverse('export_gradebook', kwargs={'course_pk': self.course.pk}), {'format': 'jsonl'}
+        )
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([a['title'] for a in lines[0]['assignments']], ['Essay 0', 'Essay 1'])
+        self.assertEqual(lines[3]['scores'], {str(self.assignments[0].pk): None, str(self.assignments[1].pk): 4})
+
+    def test_export_requires_course_instructor(self):
+        """Test that other users cannot export the gradebook"""
+        self.client.login(username='book0', password='testpass123')
+        response = self.client.get(reverse('export_gradebook', kwargs={'course_pk': self.course.pk}))
+        self.assertEqual(response.status_code, 302)
+
+
+class GradebookStatsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor_user = User.objects.create_user(
+            username='statsinstructor', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Stats Course', description='d', instructor=self.instructor_user, published=True
+        )
+        lesson = Lesson.objects.create(title='L', description='d', course=self.course, order=1)
+        self.quiz = Assignment.objects.create(
+            title='Quiz', description='d', lesson=lesson,
+            due_date=timezone.now() + timedelta(days=7), max_score=10
+        )
+        self.project = Assignment.objects.create(
+            title='Project', description='d', lesson=lesson,
+            due_date=timezone.now() + timedelta(days=8), max_score=30
+        )
+        self.students = [
+            User.objects.create_user(username=f'matrix{i}', password='testpass123', role='student')
+            for i in range(4)
+        ]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+        for student, score in zip(self.students, [10, 8, 6, None]):
+            Submission.objects.create(assignment=self.quiz, student=student, text='q', score=score)
+        Submission.objects.create(assignment=self.project, student=self.students[0], text='p', score=15)
+
+    def test_matrix_and_mask(self):
+        """Test that scores land in a students x assignments array with a mask"""
+        matrix = GradebookMatrix(self.course)
+        self.assertEqual(matrix.scores.shape, (4, 2))
+        self.assertEqual(matrix.mask.sum(), 4)
+        self.assertEqual(matrix.scores[0].tolist(), [10.0, 15.0])
+
+    def test_assignment_stats(self):
+        """Test vectorized per-assignment statistics"""
+        quiz, project = GradebookMatrix(self.course).assignment_stats()
+        self.assertEqual(quiz['graded'], 3)
+        self.assertEqual(quiz['mean'], 8.0)
+        self.assertEqual(quiz['median'], 8.0)
+        self.assertEqual(quiz['stddev'], 1.63)
+        self.assertEqual((quiz['min'], quiz['max']), (6.0, 10.0))
+        self.assertEqual(quiz['percentiles']['25'], 7.0)
+        self.assertEqual(quiz['histogram'], [0, 0, 0, 0, 0, 0, 1, 0, 1, 1])
+        self.assertEqual(project['graded'], 1)
+
+    def test_student_totals(self):
+        """Test weighted totals with missing work counted as zero"""
+        totals = GradebookMatrix(self.course).student_totals()
+        self.assertEqual(totals[0]['total_percent'], 62.5)
+        self.assertEqual(totals[1]['graded_percent'], 80.0)
+        self.assertEqual(totals[3]['total_percent'], 0.0)
+        self.assertIsNone(totals[3]['graded_percent'])
+
+    def test_stats_cached_until_grade_changes(self):
+        """Test that stats are cached by the latest submission update"""
+        self.assertEqual(get_gradebook_stats(self.course)['assignments'][0]['graded'], 3)
+        # Only the cache key queries run on a hit
+        with self.assertNumQueries(3):
+            get_gradebook_stats(self.course)
+
+        submission = Submission.objects.get(assignment=self.quiz, student=self.students[3])
+        submission.score = 4
+        submission.save()
+        self.assertEqual(get_gradebook_stats(self.course)['assignments'][0]['graded'], 4)
+
+    def test_gradebook_views(self):
+        """Test the instructor gradebook page and JSON endpoint"""
+        self.client.login(username='statsinstructor', password='testpass123')
+        response = self.client.get(reverse('course_gradebook', kwargs={'course_pk': self.course.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'matrix0')
+
+        response = self.client.get(reverse('course_gradebook_stats', kwargs={'course_pk': self.course.pk}))
+        self.assertEqual(response.json()['students_count'], 4)
+
+        self.client.login(username='matrix0', password='testpass123')
+        response = self.client.get(reverse('course_gradebook_stats', kwargs={'course_pk': self.course.pk}))
+        self.assertEqual(response.status_code, 403)
+
+
+ESSAY = (
+    "The French Revolution began in 1789 when financial crisis and food shortages "
+    "pushed the Third Estate to declare itself a National Assembly and demand a "
+    "constitution that limited the power of the king and ended feudal privileges"
+)
+
+
+class SubmissionSimilarityTestCase(TestCase):
+    def setUp(self):
+        self.instructor_user = User.objects.create_user(
+            username='siminstructor', password='testpass123', role='instructor'
+        )
+        self.other_instructor = User.objects.create_user(
+            username='simother', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='History', description='d', instructor=self.instructor_user, published=True
+        )
+        self.past_course = Course.objects.create(
+            title='History (Last Term)', description='d', instructor=self.instructor_user, published=True
+        )
+        self.other_course = Course.objects.create(
+            title='Other History', description='d', instructor=self.other_instructor, published=True
+        )
+        due = timezone.now() + timedelta(days=7)
+        self.assignment = Assignment.objects.create(
+            title='Essay', description='d', due_date=due,
+            lesson=Lesson.objects.create(title='L', description='d', course=self.course, order=1),
+        )
+        self.past_assignment = Assignment.objects.create(
+            title='Old Essay', description='d', due_date=due,
+            lesson=Lesson.objects.create(title='L', description='d', course=self.past_course, order=1),
+        )
+        self.other_assignment = Assignment.objects.create(
+            title='Other Essay', description='d', due_date=due,
+            lesson=Lesson.objects.create(title='L', description='d', course=self.other_course, order=1),
+        )
+
+    def submit(self, assignment, username, text):
+        student = User.objects.create_user(username=username, password='testpass123', role='student')
+        return Submission.objects.create(assignment=assignment, student=student, text=text)
+
+    def test_minhash_estimates_jaccard_similarity(self):
+        self.assertIsNone(minhash('  ...  '))
+        self.assertTrue((minhash(ESSAY) == minhash(ESSAY.upper())).all())
+        unrelated = minhash('Photosynthesis converts light energy into chemical energy stored in glucose')
+        self.assertLess((minhash(ESSAY) == unrelated).mean(), 0.1)
+
+    def test_submissions_are_indexed_on_save(self):
+        submission = self.submit(self.assignment, 'simstudent1', ESSAY)
+        self.assertEqual(SubmissionBand.objects.filter(submission=submission).count(), BANDS)
+        digest = SubmissionSignature.objects.get(pk=submission.pk).text_digest
+
+        # Grading does not touch the index
+        submission.score = 80
+        submission.save(update_fields=['score'])
+        self.assertEqual(SubmissionSignature.objects.get(pk=submission.pk).text_digest, digest)
+
+        # A full save with the same text skips hashing
+        self.addCleanup(setattr, similarity, 'minhash', similarity.minhash)
+        similarity.minhash = None
+        submission.feedback = 'Well argued'
+        submission.save()
+        similarity.minhash = minhash
+
+        submission.text = 'Rewritten answer about something else entirely'
+        submission.save()
+        self.assertNotEqual(SubmissionSignature.objects.get(pk=submission.pk).text_digest, digest)
+
+        submission.text = ''
+        submission.save()
+        self.assertFalse(SubmissionBand.objects.filter(submission=submission).exists())
+        self.assertFalse(SubmissionSignature.objects.filter(pk=submission.pk).exists())
+
+    def test_find_similar_submissions(self):
+        original = self.submit(self.assignment, 'simstudent1', ESSAY)
+        copied = self.submit(self.assignment, 'simstudent2', ESSAY.replace('1789', 'the year 1789'))
+        past = self.submit(self.past_assignment, 'simstudent3', ESSAY)
+        self.submit(self.other_assignment, 'simstudent4', ESSAY)
+        self.submit(self.assignment, 'simstudent5', 'Napoleon crowned himself emperor in 1804 at Notre Dame')
+
+        with self.assertNumQueries(4):
+            similar = find_similar_submissions(
+                original, Submission.objects.filter(assignment__lesson__course__instructor=self.instructor_user)
+            )
+        self.assertEqual([s.pk for s in similar], [past.pk, copied.pk])
+        self.assertEqual(similar[0].similarity, 1.0)
+        self.assertGreater(similar[1].similarity, 0.5)
+        self.assertEqual(len(find_similar_submissions(original)), 3)
+
+        pairs = similar_pairs(Submission.objects.filter(assignment=self.assignment))
+        self.assertEqual([(a, b) for a, b, _ in pairs], [(original.pk, copied.pk)])
+
+        # Bands without a signature, as while the submission is being re-indexed
+        SubmissionSignature.objects.filter(pk=original.pk).delete()
+        self.assertEqual(find_similar_submissions(original), [])
+
+    def test_find_similar_submissions_caps_bucket_rows(self):
+        copies = [self.submit(self.assignment, f'simstudent{i}', ESSAY) for i in range(6)]
+        similar = find_similar_submissions(copies[0], bucket_rows=2)
+        # Only the newest rows of each shared bucket are read
+        self.assertEqual([s.pk for s in similar], [copies[4].pk, copies[5].pk])
+        self.assertEqual(len(find_similar_submissions(copies[0])), 5)
+
+    def test_submission_detail_shows_similar_panel(self):
+        original = self.submit(self.assignment, 'simstudent1', ESSAY)
+        self.submit(self.past_assignment, 'simstudent2', ESSAY)
+        self.submit(self.other_assignment, 'simstudent3', ESSAY)
+
+        self.client.login(username='siminstructor', password='testpass123')
+        response = self.client.get(reverse('submission_detail', args=[original.pk]))
+        self.assertContains(response, 'Similar Submissions')
+        self.assertContains(response, 'simstudent2')
+        self.assertContains(response, '100% similar')
+        self.assertNotContains(response, 'simstudent3')
+
+        self.client.login(username='simstudent1', password='testpass123')
+        response = self.client.get(reverse('submission_detail', args=[original.pk]))
+        self.assertNotContains(response, 'Similar Submissions')
+
+    def test_rebuild_submission_similarity_command(self):
+        submission = self.submit(self.assignment, 'simstudent1', ESSAY)
+        self.submit(self.assignment, 'simstudent2', '')
+        SubmissionBand.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_submission_similarity', stdout=out)
+        self.assertIn('Successfully indexed 1 text submissions', out.getvalue())
+        self.assertEqual(SubmissionBand.objects.filter(submission=submission).count(), BANDS)
+
+
+def crash_on_marker(tasks, timeout):
+    """evaluate_tasks stand-in whose process dies on a submission containing CRASH."""
+    if any('CRASH' in text for job_id, checks, text, file_path in tasks):
+        os._exit(1)
+    return evaluate_tasks(tasks, timeout)
+
+
+class AutograderTestCase(TestCase):
+    def setUp(self):
+        self.instructor_user = User.objects.create_user(
+            username='autoinstructor', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Python', description='d', instructor=self.instructor_user, published=True
+        )
+        self.lesson = Lesson.objects.create(title='L', description='d', course=self.course, order=1)
+        self.assignment = Assignment.objects.create(
+            title='Functions', description='d', lesson=self.lesson,
+            due_date=timezone.now() + timedelta(days=7), max_score=50
+        )
+        AutogradeCheck.objects.create(
+            assignment=self.assignment, name='Defines a function', kind='regex', pattern=r'^def \w+\(', points=3
+        )
+        AutogradeCheck.objects.create(
+            assignment=self.assignment, name='Uses return', kind='script',
+            pattern="'return' in words and len(lines) >= 2", points=1
+        )
+        self.checks = [
+            (check.pk, check.name, check.kind, check.pattern, check.points)
+            for check in self.assignment.autograde_checks.all()
+        ]
+
+    def submit(self, username, text):
+        student = User.objects.create_user(username=username, password='testpass123', role='student')
+        return Submission.objects.create(assignment=self.assignment, student=student, text=text)
+
+    def test_validate_check(self):
+        validate_check('regex', r'\d+')
+        validate_check('script', "any(w.startswith('x') for w in words)")
+        validate_check('script', 'len(words) * 2 > length % 7 and text.count("x") * -1 < 0')
+        for kind, pattern in [
+            ('regex', '('),
+            ('script', '__import__("os")'),
+            ('script', 'text.__class__'),
+            ('script', '2 ** 10'),
+            ('script', 'len(words) >'),
+            ('script', 'len("ab"*3000000000) > 0'),
+            ('script', 'len(words * length) > 0'),
+            ('script', 'len("%0999999999d" % 1) > 0'),
+            ('script', 'any(length * 3000000000 for length in words)'),
+        ]:
+            with self.assertRaises(ValidationError):
+                validate_check(kind, pattern)
+
+    def test_evaluate_submission(self):
+        result = evaluate_submission(self.checks, 'def add(a, b):\n    return a + b')
+        self.assertEqual((result['earned'], result['possible']), (4, 4))
+
+        result = evaluate_submission(self.checks, 'add = lambda a, b: a + b')
+        self.assertEqual(result['earned'], 0)
+        self.assertEqual([check['passed'] for check in result['checks']], [False, False])
+
+        expected = [(1, 'Answer', 'expected_output', 'The  answer is\n42', 1)]
+        self.assertEqual(evaluate_submission(expected, 'the answer is 42 ')['earned'], 1)
+
+    def test_evaluate_tasks_times_out_slow_checks(self):
+        slow = [(1, 'Backtracking', 'regex', r'(a+)+$', 1)]
+        outcomes = evaluate_tasks([(7, slow, 'a' * 40 + 'b', None), (8, self.checks, 'def f():', None)], 0.2)
+        self.assertEqual(outcomes[0], (7, None, 'Timed out after 0.2 seconds.'))
+        self.assertEqual(outcomes[1][1]['earned'], 3)
+
+    def test_new_submissions_are_queued(self):
+        submission = self.submit('autostudent1', 'def f():')
+        self.assertEqual(AutogradeJob.objects.get(submission=submission).status, 'queued')
+
+        other = Assignment.objects.create(
+            title='No checks', description='d', lesson=self.lesson, due_date=timezone.now() + timedelta(days=7)
+        )
+        student = User.objects.get(username='autostudent1')
+        plain = Submission.objects.create(assignment=other, student=student, text='x')
+        self.assertFalse(AutogradeJob.objects.filter(submission=plain).exists())
+
+    def test_run_autograder_grades_in_batches(self):
+        full = self.submit('autostudent1', 'def add(a, b):\n    return a + b')
+        partial = self.submit('autostudent2', 'def add(a, b): pass')
+        manual = self.submit('autostudent3', 'def add(a, b):\n    return a + b')
+        Submission.objects.filter(pk=manual.pk).update(score=10, feedback='Graded by hand')
+
+        totals = run_autograder(workers=1, batch_size=2)
+        self.assertEqual((totals['jobs'], totals['graded'], totals['failed']), (3, 2, 0))
+
+        full.refresh_from_db()
+        partial.refresh_from_db()
+        manual.refresh_from_db()
+        self.assertEqual(full.score, 50)
+        self.assertEqual(partial.score, 38)
+        self.assertIn('[PASS] Defines a function (3 pts)', partial.feedback)
+        self.assertIn('[FAIL] Uses return (1 pts)', partial.feedback)
+        self.assertEqual((manual.score, manual.feedback), (10, 'Graded by hand'))
+        self.assertEqual(set(AutogradeJob.objects.values_list('status', flat=True)), {'done'})
+
+    def test_crashed_pool_process_fails_only_its_job(self):
+        self.addCleanup(setattr, autograde, 'evaluate_tasks', autograde.evaluate_tasks)
+        autograde.evaluate_tasks = crash_on_marker
+        graded = [self.submit(f'autostudent{i}', 'def add(a, b):\n    return a + b') for i in range(3)]
+        crashing = self.submit('autocrash', 'def f(): CRASH')
+
+        totals = run_autograder(workers=2, batch_size=10)
+        self.assertEqual((totals['jobs'], totals['graded'], totals['failed']), (4, 3, 1))
+        job = AutogradeJob.objects.get(submission=crashing)
+        self.assertEqual((job.status, job.error), ('failed', 'The grading process crashed.'))
+        for submission in graded:
+            submission.refresh_from_db()
+            self.assertEqual(submission.score, 50)
+
+    def test_stale_claims_are_requeued(self):
+        submission = self.submit('autostudent1', 'def f():')
+        self.assertEqual(len(claim_jobs()), 1)
+        self.assertEqual(claim_jobs(), [])
+
+        AutogradeJob.objects.update(claimed_at=timezone.now() - AUTOGRADE_STALE_AFTER - timedelta(seconds=1))
+        jobs = claim_jobs()
+        self.assertEqual([job.submission_id for job in jobs], [submission.pk])
+        self.assertEqual(jobs[0].attempts, 2)
+
+    def test_stale_claims_fail_after_max_attempts(self):
+        submission = self.submit('autostudent1', 'def f():')
+        AutogradeJob.objects.update(
+            status='running', attempts=AUTOGRADE_MAX_ATTEMPTS,
+            claimed_at=timezone.now() - AUTOGRADE_STALE_AFTER - timedelta(seconds=1),
+        )
+        self.assertEqual(claim_jobs(), [])
+        job = AutogradeJob.objects.get(submission=submission)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn(f'{AUTOGRADE_MAX_ATTEMPTS} times', job.error)
+        self.assertIsNotNone(job.finished_at)
+
+
+class SubmissionFileDownloadTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.instructor_user = User.objects.create_user(
+            username='fileinstructor', password='testpass123', role='instructor'
+        )
+        self.other_instructor = User.objects.create_user(
+            username='fileother', password='testpass123', role='instructor'
+        )
+        self.student_user = User.objects.create_user(
+            username='filestudent', password='testpass123', role='student'
+        )
+        self.classmate = User.objects.create_user(
+            username='fileclassmate', password='testpass123', role='student'
+        )
+        course = Course.objects.create(
+            title='Files', description='d', instructor=self.instructor_user, published=True
+        )
+        assignment = Assignment.objects.create(
+            title='Upload', description='d', due_date=timezone.now() + timedelta(days=7),
+            lesson=Lesson.objects.create(title='L', description='d', course=course, order=1),
+        )
+        self.submission = Submission.objects.create(
+            assignment=assignment, student=self.student_user,
+            file=SimpleUploadedFile('answer.txt', b'my answer'),
+        )
+        self.url = reverse('submission_file', args=[self.submission.pk])
+
+    def test_download_permissions(self):
+        for username, status in [
+            ('filestudent', 200), ('fileinstructor', 200), ('fileclassmate', 403), ('fileother', 403),
+        ]:
+            self.client.login(username=username, password='testpass123')
+            self.assertEqual(self.client.get(self.url).status_code, status, username)
+
+        self.client.login(username='filestudent', password='testpass123')
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), b'my answer')
+        response = self.client.get(reverse('submission_detail', args=[self.submission.pk]))
+        self.assertContains(response, f'href="{self.url}"')
@@ -10,5 +10,11 @@ urlpatterns = [
     path('assignment/<int:assignment_pk>/submit/', views.submit_assignment, name='submit_assignment'),
     path('submission/<int:submission_pk>/grade/', views.grade_submission, name='grade_submission'),
     path('submission/<int:pk>/', views.submission_detail, name='submission_detail'),
+    path('submission/<int:pk>/file/', views.submission_file, name='submission_file'),
     path('assignment/<int:assignment_pk>/submissions/', views.assignment_submissions, name='assignment_submissions'),
+    path('assignment/<int:assignment_pk>/grades/', views.bulk_grade_submissions, name='bulk_grade_submissions'),
+    path('assignment/<int:assignment_pk>/grades/import/', views.import_grades, name='import_grades'),
+    path('course/<int:course_pk>/gradebook/', views.course_gradebook, name='course_gradebook'),
+    path('course/<int:course_pk>/gradebook/stats/', views.course_gradebook_stats, name='course_gradebook_stats'),
+    path('course/<int:course_pk>/gradebook/export/', views.export_gradebook, name='export_gradebook'),
 ]
\ No newline at end of file
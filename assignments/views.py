@@ -2,12 +2,43 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.http import HttpResponseForbidden
+from online_learning_system.pagination import CursorPaginator
+from django.http import Http404, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST, require_safe
+from online_learning_system.streaming import send_protected_file
 from .models import Assignment, Submission
-from .forms import AssignmentForm, SubmissionForm, GradeSubmissionForm
+from .forms import AssignmentForm, SubmissionForm, GradeSubmissionForm, GradeImportForm
+from .grading import apply_grades, iter_csv_grades
+from .gradebook import stream_gradebook_csv, stream_gradebook_jsonl
+from .analytics import HISTOGRAM_BINS, get_gradebook_stats
+from .similarity import find_similar_submissions
 from lessons.models import Lesson
 from courses.models import Course, Enrollment
+from django.db.models import Count, Q
 from django.utils import timezone
+import csv
+import json
+
+
+def with_submission_counts(assignments):
+    """
+    Annotate assignments with submission_count and graded_count.
+    """
+    return assignments.annotate(
+        submission_count=Count('submissions'),
+        graded_count=Count('submissions', filter=Q(submissions__score__isnull=False)),
+    )
+
+
+def get_user_submissions(user, assignment_ids):
+    """
+    Map assignment id to the user's own Submission for those assignments,
+    loaded with one query.
+    """
+    return {
+        submission.assignment_id: submission
+        for submission in Submission.objects.filter(student=user, assignment_id__in=assignment_ids)
+    }
 
 
 @login_required
@@ -38,17 +69,26 @@ def assignment_list(request):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
-    assignments = Assignment.objects.filter(lesson=lesson)
+    assignments = Assignment.objects.filter(lesson=lesson).order_by('due_date', 'pk')
+    if request.user.role != 'student':
+        assignments = with_submission_counts(assignments)
     
     # Pagination
     paginator = Paginator(assignments, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
+    # Attach the student's own submission to each row on this page
+    user_submissions = {}
+    if request.user.role == 'student':
+        user_submissions = get_user_submissions(request.user, [assignment.pk for assignment in page_obj])
+    for assignment in page_obj:
+        assignment.user_submission = user_submissions.get(assignment.pk)
+    
     return render(request, 'assignments/assignment_list.html', {
         'lesson': lesson,
         'course': course,
-        'page_obj': page_obj
+        'page_obj': page_obj,
     })
 
 
@@ -57,7 +97,10 @@ def assignment_detail(request, pk):
     """
     Display details of a specific assignment.
     """
-    assignment = get_object_or_404(Assignment, pk=pk)
+    assignments = Assignment.objects.select_related('lesson__course')
+    if request.user.role != 'student':
+        assignments = with_submission_counts(assignments)
+    assignment = get_object_or_404(assignments, pk=pk)
     lesson = assignment.lesson
     course = lesson.course
     
@@ -69,7 +112,7 @@ def assignment_detail(request, pk):
             return redirect('home')
     elif request.user.role == 'instructor':
         # Check if instructor owns this course
-        if course.instructor != request.user:
+        if course.instructor_id != request.user.pk:
             messages.error(request, 'You do not have permission to view this assignment.')
             return redirect('home')
     elif request.user.role != 'employee':
@@ -79,10 +122,7 @@ def assignment_detail(request, pk):
     # Get submission if student
     submission = None
     if request.user.role == 'student':
-        try:
-            submission = Submission.objects.get(assignment=assignment, student=request.user)
-        except Submission.DoesNotExist:
-            submission = None
+        submission = get_user_submissions(request.user, [assignment.pk]).get(assignment.pk)
     
     return render(request, 'assignments/assignment_detail.html', {
         'assignment': assignment,
@@ -278,6 +318,89 @@ def grade_submission(request, submission_pk):
     })
 
 
+# Upper bound on grade rows accepted by one JSON bulk grading request
+MAX_BULK_GRADES = 1000
+
+
+@login_required
+@require_POST
+def bulk_grade_submissions(request, assignment_pk):
+    """
+    JSON endpoint grading many submissions of an assignment at once.
+
+    Expects {"grades": [{"submission_id" or "student", "score", "feedback"}]}
+    and returns the number of updated submissions with per-row errors.
+    """
+    assignment = get_object_or_404(Assignment.objects.select_related('lesson__course'), pk=assignment_pk)
+    course = assignment.lesson.course
+    
+    # Check if user is instructor of this course or employee
+    if request.user.role == 'instructor' and course.instructor_id != request.user.pk:
+        return JsonResponse({'error': 'You do not have permission to grade this assignment.'}, status=403)
+    elif request.user.role not in ['instructor', 'employee']:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    try:
+        grades = json.loads(request.body)['grades']
+        if not isinstance(grades, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected a JSON body with a list of grades.'}, status=400)
+    
+    if len(grades) > MAX_BULK_GRADES:
+        return JsonResponse({'error': f'At most {MAX_BULK_GRADES} grades per request.'}, status=400)
+    
+    report = apply_grades(assignment, grades)
+    return JsonResponse(report.as_dict())
+
+
+@login_required
+def import_grades(request, assignment_pk):
+    """
+    Allow instructors to grade an assignment by uploading a CSV file.
+    """
+    assignment = get_object_or_404(Assignment.objects.select_related('lesson__course'), pk=assignment_pk)
+    lesson = assignment.lesson
+    course = lesson.course
+    
+    # Check if user is instructor of this course or employee
+    if request.user.role == 'instructor' and course.instructor_id != request.user.pk:
+        messages.error(request, 'You do not have permission to grade this assignment.')
+        return redirect('home')
+    elif request.user.role not in ['instructor', 'employee']:
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+    
+    report = None
+    if request.method == 'POST':
+        form = GradeImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report = apply_grades(assignment, iter_csv_grades(form.cleaned_data['file']))
+            except UnicodeDecodeError:
+                form.add_error('file', 'The file must be UTF-8 encoded.')
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+            except csv.Error as exc:
+                form.add_error('file', f'Could not read the CSV file: {exc}')
+            else:
+                if report.errors:
+                    messages.warning(request, f'Graded {report.updated} submissions; {len(report.errors)} rows were skipped.')
+                else:
+                    messages.success(request, f'Graded {report.updated} submissions.')
+    else:
+        form = GradeImportForm()
+    
+    return render(request, 'assignments/grade_import.html', {
+        'form': form,
+        'report': report,
+        'assignment': assignment,
+        'lesson': lesson,
+        'course': course,
+        'title': 'Import Grades'
+    })
+
+
 @login_required
 def submission_detail(request, pk):
     """
@@ -299,14 +422,50 @@ def submission_detail(request, pk):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
+    # Near-duplicate answers, limited to submissions the viewer may see
+    similar_submissions = []
+    if request.user.role == 'instructor':
+        similar_submissions = find_similar_submissions(
+            submission, Submission.objects.filter(assignment__lesson__course__instructor=request.user)
+        )
+    elif request.user.role == 'employee':
+        similar_submissions = find_similar_submissions(submission)
+    
     return render(request, 'assignments/submission_detail.html', {
         'submission': submission,
         'assignment': assignment,
         'lesson': lesson,
-        'course': course
+        'course': course,
+        'similar_submissions': similar_submissions
     })
 
 
+@login_required
+@require_safe
+def submission_file(request, pk):
+    """
+    Download a submission's file for its student, the course instructor
+    or employees.
+    """
+    submission = get_object_or_404(Submission.objects.select_related('assignment__lesson__course'), pk=pk)
+    course = submission.assignment.lesson.course
+    
+    # Same access rules as submission_detail
+    if request.user.role == 'student' and submission.student_id != request.user.pk:
+        return HttpResponseForbidden('You do not have permission to view this submission.')
+    elif request.user.role == 'instructor' and course.instructor_id != request.user.pk:
+        return HttpResponseForbidden('You do not have permission to view this submission.')
+    elif request.user.role not in ['student', 'instructor', 'employee']:
+        return HttpResponseForbidden('Access denied.')
+    
+    if not submission.file:
+        raise Http404('This submission has no file.')
+    try:
+        return send_protected_file(request, submission.file)
+    except FileNotFoundError:
+        raise Http404('Submission file not found.')
+
+
 @login_required
 def assignment_submissions(request, assignment_pk):
     """
@@ -324,16 +483,97 @@ def assignment_submissions(request, assignment_pk):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
-    submissions = Submission.objects.filter(assignment=assignment)
+    submissions = Submission.objects.filter(assignment=assignment).select_related('student')
     
-    # Pagination
-    paginator = Paginator(submissions, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination on -submitted_at
+    paginator = CursorPaginator(submissions, 10)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     return render(request, 'assignments/submission_list.html', {
         'assignment': assignment,
         'lesson': lesson,
         'course': course,
         'page_obj': page_obj
-    })
\ No newline at end of file
+    })
+
+
+# Streaming formats offered by the gradebook export: (generator, content type, extension)
+GRADEBOOK_FORMATS = {
+    'csv': (stream_gradebook_csv, 'text/csv', 'csv'),
+    'jsonl': (stream_gradebook_jsonl, 'application/x-ndjson', 'jsonl'),
+}
+
+
+@login_required
+def export_gradebook(request, course_pk):
+    """
+    Stream a course gradebook as CSV (default) or JSON lines (?format=jsonl).
+    """
+    course = get_object_or_404(Course.objects.select_related('stats'), pk=course_pk)
+    
+    # Check if user is instructor of this course or employee
+    if request.user.role == 'instructor' and course.instructor_id != request.user.pk:
+        messages.error(request, 'You do not have permission to export grades for this course.')
+        return redirect('home')
+    elif request.user.role not in ['instructor', 'employee']:
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+    
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in GRADEBOOK_FORMATS:
+        messages.error(request, 'Unknown export format.')
+        return redirect('instructor_dashboard')
+    stream, content_type, extension = GRADEBOOK_FORMATS[export_format]
+    
+    response = StreamingHttpResponse(stream(course), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="gradebook-course-{course.pk}.{extension}"'
+    return response
+
+
+@login_required
+def course_gradebook(request, course_pk):
+    """
+    Display per-assignment statistics and per-student totals for a course.
+    """
+    course = get_object_or_404(Course, pk=course_pk)
+    
+    # Check if user is instructor of this course or employee
+    if request.user.role == 'instructor' and course.instructor_id != request.user.pk:
+        messages.error(request, 'You do not have permission to view grades for this course.')
+        return redirect('home')
+    elif request.user.role not in ['instructor', 'employee']:
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+    
+    stats = get_gradebook_stats(course)
+    for assignment in stats['assignments']:
+        # Scale histogram bars against the tallest bucket of the assignment
+        tallest = max(assignment['histogram']) or 1
+        assignment['histogram_bars'] = [
+            {'count': count, 'height': round(count * 100 / tallest), 'from': index * 100 // HISTOGRAM_BINS}
+            for index, count in enumerate(assignment['histogram'])
+        ]
+    
+    # Pagination over the cached student totals
+    paginator = Paginator(stats['students'], 50)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    
+    return render(request, 'assignments/gradebook.html', {
+        'course': course,
+        'stats': stats,
+        'page_obj': page_obj,
+    })
+
+
+@login_required
+def course_gradebook_stats(request, course_pk):
+    """
+    JSON endpoint returning the gradebook statistics of a course.
+    """
+    course = get_object_or_404(Course, pk=course_pk)
+    if request.user.role == 'instructor' and course.instructor_id != request.user.pk:
+        return JsonResponse({'error': 'You do not have permission to view grades for this course.'}, status=403)
+    elif request.user.role not in ['instructor', 'employee']:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    return JsonResponse(get_gradebook_stats(course))
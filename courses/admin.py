@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, Tag, Course, Enrollment, LessonCompletion, Review
+from .models import Category, Tag, Course, CourseStats, Enrollment, LessonCompletion, Review
+from .stats import rebuild_course_stats
 
 
 @admin.register(Category)
@@ -76,6 +77,19 @@ class CourseAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(CourseStats)
+class CourseStatsAdmin(admin.ModelAdmin):
+    """
+    Read-only admin for denormalized course statistics.
+    """
+    list_display = ('course', 'lesson_count', 'enrollment_count', 'review_count', 'average_rating', 'updated_at')
+    search_fields = ('course__title',)
+    readonly_fields = ('course', 'lesson_count', 'enrollment_count', 'review_count', 'rating_total', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Enrollment)
 class EnrollmentAdmin(admin.ModelAdmin):
     """
@@ -163,12 +177,15 @@ class ReviewAdmin(admin.ModelAdmin):
     def approve_reviews(self, request, queryset):
         """Approve selected reviews."""
         queryset.update(approved=True)
+        # Bulk updates skip signals, so recount the affected courses
+        rebuild_course_stats(set(queryset.values_list('course_id', flat=True)))
         self.message_user(request, f"{queryset.count()} reviews approved.")
     approve_reviews.short_description = "Approve selected reviews"
     
     def disapprove_reviews(self, request, queryset):
         """Disapprove selected reviews."""
         queryset.update(approved=False)
+        rebuild_course_stats(set(queryset.values_list('course_id', flat=True)))
         self.message_user(request, f"{queryset.count()} reviews disapproved.")
     disapprove_reviews.short_description = "Disapprove selected reviews"
     
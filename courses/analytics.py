@@ -0,0 +1,102 @@
+"""
+Per-course analytics for the instructor dashboard.
+
+All of an instructor's courses are loaded with one query: lesson,
+enrollment and review totals come from CourseStats, and completed
+enrollments, summed lesson progress and ungraded submissions are
+correlated subqueries, so no enrollment or submission rows are loaded.
+
+Results are cached per instructor under a generation counter that is
+bumped whenever one of their courses, or its lessons, enrollments,
+progress, reviews or submissions, is written (see courses/signals.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import Course, Enrollment
+
+
+def _generation_key(instructor_id):
+    return f'instructor_analytics:gen:{instructor_id}'
+
+
+def _per_course_total(queryset, course_field, aggregate):
+    """Wrap a per-course aggregate as a scalar subquery defaulting to 0."""
+    totals = (
+        queryset.filter(**{course_field: OuterRef('pk')}).order_by()
+        .values(course_field).annotate(total=aggregate).values('total')[:1]
+    )
+    return Coalesce(Subquery(totals, output_field=IntegerField()), Value(0))
+
+
+def invalidate_instructor_analytics(instructor_ids):
+    """Drop the cached analytics of the given instructors."""
+    for instructor_id in set(instructor_ids):
+        if instructor_id is None:
+            continue
+        try:
+            cache.incr(_generation_key(instructor_id))
+        except ValueError:
+            cache.set(_generation_key(instructor_id), 1, None)
+
+
+def invalidate_course_analytics(course_id):
+    """Drop the cached analytics of the instructor who owns a course."""
+    invalidate_instructor_analytics(
+        Course.objects.filter(pk=course_id).values_list('instructor_id', flat=True)
+    )
+
+
+def _annotated_courses(instructor_id):
+    from assignments.models import Submission
+
+    return (
+        Course.objects.filter(instructor_id=instructor_id)
+        .select_related('category', 'stats')
+        .annotate(
+            completed_count=_per_course_total(
+                Enrollment.objects.filter(completed=True), 'course_id', Count('pk')
+            ),
+            completed_lessons_total=_per_course_total(
+                Enrollment.objects.all(), 'course_id', Sum('completed_lessons_count')
+            ),
+            pending_submissions=_per_course_total(
+                Submission.objects.filter(score__isnull=True), 'assignment__lesson__course_id', Count('pk')
+            ),
+        )
+    )
+
+
+def _add_derived_metrics(course):
+    stats = course.get_stats()
+    course.lesson_count = stats.lesson_count
+    course.enrollment_count = stats.enrollment_count
+    course.review_count = stats.review_count
+    course.average_rating = stats.average_rating
+    if stats.enrollment_count:
+        course.completion_rate = round(course.completed_count * 100 / stats.enrollment_count)
+    else:
+        course.completion_rate = 0
+    possible = stats.enrollment_count * stats.lesson_count
+    course.average_progress = (
+        min(100, round(course.completed_lessons_total * 100 / possible)) if possible else 0
+    )
+
+
+def get_instructor_course_analytics(instructor_id):
+    """
+    Return the instructor's courses (newest first) with enrollment_count,
+    completed_count, completion_rate, average_progress, average_rating,
+    review_count, lesson_count and pending_submissions attributes.
+    """
+    generation = cache.get_or_set(_generation_key(instructor_id), 1, None)
+    key = f'instructor_analytics:{instructor_id}:{generation}'
+    courses = cache.get(key)
+    if courses is None:
+        courses = list(_annotated_courses(instructor_id))
+        for course in courses:
+            _add_derived_metrics(course)
+        timeout = getattr(settings, 'INSTRUCTOR_ANALYTICS_CACHE_TIMEOUT', 300)
+        cache.set(key, courses, timeout)
+    return courses
@@ -0,0 +1,143 @@
+"""
+Facet counts for the course catalog filters.
+
+Each facet (category, tag, instructor) is counted over the published
+courses matching the search query and the *other* selected filters, so
+the dropdowns show how many courses each option would leave. Missing
+facets are computed together in one UNION of grouped queries and cached
+per filter combination.
+
+Cache keys embed generation counters for the filter values they depend
+on. Publishing, unpublishing or editing a published course bumps only
+the counters for its own category, tags and instructor (plus the global
+one used by unfiltered and search views), so unrelated cached facets
+stay valid. Generations live in the default cache, so deployments with
+several processes should point CACHES at a shared backend.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Value, CharField
+from .models import Course
+from .search import get_search_backend
+
+
+FACETS = {
+    'category': ('category_id', 'category__name'),
+    'tag': ('tags__id', 'tags__name'),
+    'instructor': ('instructor_id', 'instructor__username'),
+}
+
+GLOBAL_GENERATION = 'all'
+
+# Bumped when a category, tag or instructor is renamed or deleted, since
+# option labels appear in every cached facet.
+LABELS_GENERATION = 'labels'
+
+
+def _generation_key(token):
+    return f'course_facets:gen:{token}'
+
+
+def _get_generations(tokens):
+    keys = [_generation_key(token) for token in tokens]
+    generations = cache.get_many(keys)
+    missing = {key: 1 for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(tokens):
+    """Invalidate every cached facet that depends on any of the tokens."""
+    for token in set(tokens):
+        try:
+            cache.incr(_generation_key(token))
+        except ValueError:
+            cache.set(_generation_key(token), 1, None)
+
+
+def course_facet_tokens(category_id, instructor_id, tag_ids):
+    """Return the generation tokens a published course contributes to."""
+    tokens = [GLOBAL_GENERATION, f'instructor:{instructor_id}']
+    if category_id:
+        tokens.append(f'category:{category_id}')
+    tokens.extend(f'tag:{tag_id}' for tag_id in tag_ids)
+    return tokens
+
+
+class CourseFacets:
+    """
+    Compute facet counts for one catalog filter state.
+
+    filters maps facet names ('category', 'tag', 'instructor') to the
+    selected id or None; query is the free-text search string.
+    """
+
+    def __init__(self, query=None, filters=None):
+        self.query = query or ''
+        self.filters = {name: (filters or {}).get(name) for name in FACETS}
+
+    def _scope(self, facet):
+        return {name: value for name, value in self.filters.items() if name != facet and value}
+
+    def _cache_key(self, facet):
+        scope = self._scope(facet)
+        tokens = [f'{name}:{value}' for name, value in sorted(scope.items())]
+        if self.query or not tokens:
+            tokens.append(GLOBAL_GENERATION)
+        tokens.append(LABELS_GENERATION)
+        generations = _get_generations(tokens)
+        raw = repr((facet, self.query, sorted(scope.items()), tokens, generations))
+        return 'course_facets:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def _base_queryset(self):
+        courses = Course.objects.filter(published=True)
+        if self.query:
+            matches = get_search_backend().search(Course.objects.filter(published=True), self.query)
+            courses = courses.filter(pk__in=matches.order_by().values('pk'))
+        return courses
+
+    def _facet_queryset(self, base, facet):
+        value_field, label_field = FACETS[facet]
+        courses = base
+        for name, value in self._scope(facet).items():
+            courses = courses.filter(**{FACETS[name][0]: value})
+        return (
+            courses.filter(**{f'{value_field}__isnull': False})
+            .annotate(
+                facet=Value(facet, output_field=CharField()),
+                value_id=F(value_field),
+                label=F(label_field),
+            )
+            .values('facet', 'value_id', 'label')
+            .annotate(count=Count('pk', distinct=True))
+            .order_by()
+        )
+
+    def get_counts(self):
+        """
+        Return {facet: [{'id', 'name', 'count'}, ...]} sorted by name.
+        """
+        keys = {facet: self._cache_key(facet) for facet in FACETS}
+        cached = cache.get_many(keys.values())
+        results = {facet: cached[key] for facet, key in keys.items() if key in cached}
+
+        missing = [facet for facet in FACETS if facet not in results]
+        if missing:
+            base = self._base_queryset()
+            querysets = [self._facet_queryset(base, facet) for facet in missing]
+            combined = querysets[0].union(*querysets[1:], all=True) if len(querysets) > 1 else querysets[0]
+
+            computed = {facet: [] for facet in missing}
+            for row in combined:
+                computed[row['facet']].append({'id': row['value_id'], 'name': row['label'], 'count': row['count']})
+            timeout = getattr(settings, 'COURSE_FACETS_CACHE_TIMEOUT', 300)
+            for facet, options in computed.items():
+                options.sort(key=lambda option: option['name'].lower())
+                results[facet] = options
+            cache.set_many({keys[facet]: computed[facet] for facet in missing}, timeout)
+
+        return results
@@ -0,0 +1,142 @@
+"""
+Responsive variants of course images.
+
+Catalog cards show Course.image at a few hundred pixels wide, so each
+upload gets fixed-size thumbnails in THUMBNAIL_SIZES. There is one set
+in WebP and one in JPEG, or PNG when the image has transparency. The
+course_image template tag offers them through srcset.
+
+Variants are named by the SHA-256 of the original and stored next to
+it under courses/derived/. Re-uploading the same picture, or giving
+it to another course, reuses the existing files.
+
+Generation never happens during a request. Course.image_variants_source
+records which image the variants were made from, so a course whose
+image differs is pending. The generate_course_images command processes
+pending courses, either once or as a polling worker. Until a course is
+processed, the tag renders the original image.
+"""
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .models import Course
+
+
+# (width, height) of each thumbnail; cropped to fill, never upscaled
+THUMBNAIL_SIZES = ((320, 180), (640, 360), (960, 540))
+
+DERIVED_DIR = 'courses/derived'
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# Courses processed per query by process_pending_images()
+IMAGE_BATCH_SIZE = 50
+
+
+def _image_sha256(field_file):
+    digest = hashlib.sha256()
+    with field_file.open('rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def generate_variants(field_file, storage=default_storage):
+    """
+    Create the thumbnails of an image file and return
+    {format: {width: storage name}}, e.g. {'webp': {'320': ...}}.
+    Files that already exist for the same content are reused.
+    """
+    digest = _image_sha256(field_file)
+    with field_file.open('rb') as f:
+        original = Image.open(f)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+    has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+    original = original.convert('RGBA' if has_alpha else 'RGB')
+    fallback = 'png' if has_alpha else 'jpeg'
+
+    sizes = [size for size in THUMBNAIL_SIZES if size[0] <= original.width] or [THUMBNAIL_SIZES[0]]
+    variants = {'webp': {}, fallback: {}}
+    for width, height in sizes:
+        thumbnail = None
+        for fmt in variants:
+            name = f'{DERIVED_DIR}/{digest[:2]}/{digest}-{width}x{height}.{fmt}'
+            if not storage.exists(name):
+                if thumbnail is None:
+                    thumbnail = ImageOps.fit(original, (width, height), Image.Resampling.LANCZOS)
+                name = storage.save(name, ContentFile(_encode(thumbnail, fmt)))
+            variants[fmt][str(width)] = name
+    return variants
+
+
+def pending_courses():
+    """Return courses whose image variants are missing or out of date."""
+    return Course.objects.filter(
+        Q(image__isnull=False) & ~Q(image_variants_source=F('image'))
+        | Q(image__isnull=True, image_variants_source__gt='')
+    )
+
+
+def process_course_image(course):
+    """
+    Generate and record the variants for a course's current image.
+    Returns False if the image could not be read.
+    """
+    source = course.image.name if course.image else ''
+    variants, ok = {}, True
+    if source:
+        try:
+            variants = generate_variants(course.image)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            # Recorded with no variants so the worker does not retry it forever
+            ok = False
+    # Skip the write if the image was replaced meanwhile; the new one stays pending
+    current = Course.objects.filter(pk=course.pk)
+    current = current.filter(image=source) if source else current.filter(Q(image='') | Q(image__isnull=True))
+    current.update(image_variants=variants, image_variants_source=source)
+    return ok
+
+
+def process_pending_images(limit=None):
+    """Process pending courses. Returns (processed, failed)."""
+    processed = failed = 0
+    while limit is None or processed < limit:
+        batch = IMAGE_BATCH_SIZE if limit is None else min(IMAGE_BATCH_SIZE, limit - processed)
+        courses = list(pending_courses().order_by('pk').only('pk', 'image')[:batch])
+        if not courses:
+            break
+        for course in courses:
+            if not process_course_image(course):
+                failed += 1
+            processed += 1
+    return processed, failed
+
+
+def variant_names(course):
+    """Return every storage name in a course's image_variants."""
+    return [name for sizes in course.image_variants.values() for name in sizes.values()]
+
+
+def build_srcset(sizes):
+    """Return a srcset value from a {width: storage name} dict."""
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w'
+        for width, name in sorted(sizes.items(), key=lambda item: int(item[0]))
+    )
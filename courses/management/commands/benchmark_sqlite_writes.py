@@ -0,0 +1,155 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from accounts.models import User
+from courses.models import Course, Enrollment
+from courses.progress import record_lesson_completions
+from lessons.models import Lesson, Module
+
+
+# Django's own SQLite defaults: rollback journal, deferred transactions,
+# a 5 second busy timeout and a new connection per request
+BASELINE_PROFILE = {'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}
+
+
+def _use_database(path, profile):
+    """Point this process's default database alias at path, with profile's settings."""
+    default = connections['default']
+    settings_dict = {**default.settings_dict, 'NAME': path, **profile}
+    connections['default'] = default.__class__(settings_dict, 'default')
+
+
+def prepare_database(path, lessons, enrollments):
+    """
+    Pool entry point: migrate a fresh database at path and fill it with one
+    course of lessons and enrollments. Returns (enrollment ids, lesson ids).
+    """
+    _use_database(path, BASELINE_PROFILE)
+    call_command('migrate', verbosity=0, interactive=False)
+    instructor = User.objects.create_user(username='sqlite_benchmark', role='instructor')
+    course = Course.objects.create(title='SQLite Benchmark', description='-', instructor=instructor, published=True)
+    modules = [Module.objects.create(course=course, title=f'Module {i}', order=i + 1) for i in range(4)]
+    lesson_ids = [
+        Lesson.objects.create(
+            title=f'Lesson {i}', description='-', course=course, order=i + 1, module=modules[i % len(modules)]
+        ).pk
+        for i in range(lessons)
+    ]
+    students = User.objects.bulk_create([
+        User(username=f'sqlite_benchmark_{i}', role='student') for i in range(enrollments)
+    ])
+    enrollment_ids = [Enrollment.objects.create(student=student, course=course).pk for student in students]
+    connections['default'].close()
+    return enrollment_ids, lesson_ids
+
+
+def complete_lessons(path, profile, tasks):
+    """
+    Pool entry point: mark (enrollment id, lesson id) tasks complete, each
+    like one mark_lesson_complete request. Returns (completed, failed).
+    """
+    _use_database(path, profile)
+    completed = failed = 0
+    for enrollment_id, lesson_id in tasks:
+        # Connections are closed or kept between requests per CONN_MAX_AGE
+        close_old_connections()
+        try:
+            enrollment = Enrollment.objects.get(pk=enrollment_id)
+            lesson = Lesson.objects.only('pk', 'bit_index', 'module_id').get(pk=lesson_id)
+            record_lesson_completions(enrollment, [lesson])
+            completed += 1
+        except OperationalError:
+            # "database is locked"
+            failed += 1
+        finally:
+            close_old_connections()
+    connections['default'].close()
+    return completed, failed
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure lesson completions per second with several processes writing to a scratch SQLite '
+        'database, with Django\'s SQLite defaults and with the configured DATABASES settings'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of writing processes (default: 8)'
+        )
+        parser.add_argument(
+            '--completions',
+            type=int,
+            default=2000,
+            help='Number of lesson completions across all processes (default: 2000)'
+        )
+        parser.add_argument(
+            '--lessons',
+            type=int,
+            default=50,
+            help='Number of lessons in the benchmark course (default: 50)'
+        )
+        parser.add_argument(
+            '--profile',
+            choices=['baseline', 'configured', 'both'],
+            default='both',
+            help='Settings to benchmark: Django defaults, DATABASES["default"], or both (default: both)'
+        )
+
+    def handle(self, *args, **options):
+        default = connections['default']
+        if default.vendor != 'sqlite':
+            raise CommandError('benchmark_sqlite_writes needs a SQLite default database.')
+        configured = {
+            'OPTIONS': dict(default.settings_dict['OPTIONS']),
+            'CONN_MAX_AGE': default.settings_dict['CONN_MAX_AGE'],
+            'CONN_HEALTH_CHECKS': default.settings_dict['CONN_HEALTH_CHECKS'],
+        }
+        profiles = {'baseline': BASELINE_PROFILE, 'configured': configured}
+        names = list(profiles) if options['profile'] == 'both' else [options['profile']]
+        workers, lessons = options['workers'], options['lessons']
+        enrollments = -(-options['completions'] // lessons)
+
+        with tempfile.TemporaryDirectory() as directory:
+            template = os.path.join(directory, 'template.sqlite3')
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                enrollment_ids, lesson_ids = executor.submit(
+                    prepare_database, template, lessons, enrollments
+                ).result()
+
+            tasks = [(enrollment_id, lesson_id) for enrollment_id in enrollment_ids for lesson_id in lesson_ids]
+            random.Random(0).shuffle(tasks)
+            tasks = tasks[:options['completions']]
+
+            for name in names:
+                # Each profile starts from an identical copy of the data
+                path = os.path.join(directory, f'{name}.sqlite3')
+                shutil.copyfile(template, path)
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    started = time.perf_counter()
+                    futures = [
+                        executor.submit(complete_lessons, path, profiles[name], tasks[index::workers])
+                        for index in range(workers)
+                    ]
+                    results = [future.result() for future in futures]
+                    seconds = time.perf_counter() - started
+                completed = sum(result[0] for result in results)
+                failed = sum(result[1] for result in results)
+                self.stdout.write(
+                    f'{name}: {completed} completions in {seconds:.2f}s '
+                    f'({completed / seconds:.1f} completions/s, {failed} failed with "database is locked")'
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully benchmarked {len(tasks)} completions with {workers} processes')
+        )
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from courses.images import process_pending_images
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and WebP variants for new or changed course images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Process at most this many courses'
+        )
+        parser.add_argument(
+            '--forever',
+            action='store_true',
+            help='Keep polling for new images instead of exiting when none are pending'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds between polls with --forever (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        while True:
+            batch_processed, batch_failed = process_pending_images(limit=options['limit'])
+            processed += batch_processed
+            failed += batch_failed
+            if not options['forever']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully processed {processed} course images ({failed} unreadable)')
+        )
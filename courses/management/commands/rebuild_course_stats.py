@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from courses.stats import rebuild_all_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Reconcile denormalized course statistics with the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of courses to rebuild per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        for processed in rebuild_all_course_stats(chunk_size=options['chunk_size']):
+            self.stdout.write(f"Rebuilt stats for {processed} courses")
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully reconciled stats for {processed} courses')
+        )
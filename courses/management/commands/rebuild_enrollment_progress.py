@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from courses.progress import rebuild_all_enrollment_progress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild completion bitmaps and lesson counts for every enrollment'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of enrollments to rebuild per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        for processed in rebuild_all_enrollment_progress(chunk_size=options['chunk_size']):
+            self.stdout.write(f"Rebuilt progress for {processed} enrollments")
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt progress for {processed} enrollments')
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from courses.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for the course catalog'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt course search index ({backend.__class__.__name__})')
+        )
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create and fill the FTS5 shadow table used by courses.search on SQLite.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS courses_course_fts USING fts5("
+        "title, description, instructor, tags, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO courses_course_fts (rowid, title, description, instructor, tags) "
+        "SELECT c.id, c.title, c.description, u.username, "
+        "(SELECT group_concat(t.name, ' ') FROM courses_tag t "
+        " JOIN courses_course_tags ct ON ct.tag_id = t.id WHERE ct.course_id = c.id) "
+        "FROM courses_course c JOIN accounts_user u ON u.id = c.instructor_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS courses_course_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_review'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_course_stats(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseStats = apps.get_model('courses', 'CourseStats')
+    Lesson = apps.get_model('lessons', 'Lesson')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Review = apps.get_model('courses', 'Review')
+
+    lesson_counts = dict(Lesson.objects.values_list('course_id').annotate(total=Count('id')).order_by())
+    enrollment_counts = dict(Enrollment.objects.values_list('course_id').annotate(total=Count('id')).order_by())
+    review_totals = {
+        row['course_id']: row for row in
+        Review.objects.filter(approved=True).values('course_id')
+        .annotate(count=Count('id'), total=Sum('rating')).order_by()
+    }
+    CourseStats.objects.bulk_create([
+        CourseStats(
+            course_id=course_id,
+            lesson_count=lesson_counts.get(course_id, 0),
+            enrollment_count=enrollment_counts.get(course_id, 0),
+            review_count=review_totals.get(course_id, {}).get('count', 0),
+            rating_total=review_totals.get(course_id, {}).get('total') or 0,
+        )
+        for course_id in Course.objects.values_list('pk', flat=True)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_course_search_index'),
+        ('lessons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.course')),
+                ('lesson_count', models.PositiveIntegerField(default=0)),
+                ('enrollment_count', models.PositiveIntegerField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Course stats',
+            },
+        ),
+        migrations.RunPython(populate_course_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_completed_lessons_count(apps, schema_editor):
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    LessonCompletion = apps.get_model('courses', 'LessonCompletion')
+    completions = (
+        LessonCompletion.objects.filter(enrollment=OuterRef('pk'))
+        .values('enrollment').annotate(total=Count('id')).values('total')
+    )
+    Enrollment.objects.update(completed_lessons_count=Coalesce(Subquery(completions), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_coursestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_completed_lessons_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:05
+
+from django.db import migrations, models
+
+
+def populate_completed_lessons_bitmap(apps, schema_editor):
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    LessonCompletion = apps.get_model('courses', 'LessonCompletion')
+    bitmaps = {}
+    for enrollment_id, bit_index in LessonCompletion.objects.values_list('enrollment_id', 'lesson__bit_index'):
+        bitmaps[enrollment_id] = bitmaps.get(enrollment_id, 0) | (1 << bit_index)
+    enrollments = []
+    for enrollment in Enrollment.objects.filter(pk__in=bitmaps.keys()):
+        bits = bitmaps[enrollment.pk]
+        enrollment.completed_lessons_bitmap = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        enrollment.completed_lessons_count = bits.bit_count()
+        enrollments.append(enrollment)
+    Enrollment.objects.bulk_update(
+        enrollments, ['completed_lessons_bitmap', 'completed_lessons_count'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_enrollment_completed_lessons_count'),
+        ('lessons', '0002_lesson_bit_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons_bitmap',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(populate_completed_lessons_bitmap, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_enrollment_completed_lessons_bitmap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='image_variants_source',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_course_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(
+                condition=models.Q(('published', True)), fields=['-created_at'], name='courses_course_published_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['student', 'completed'], name='courses_enroll_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(
+                condition=models.Q(('approved', True)), fields=['course', '-created_at'], name='courses_review_approved_idx'
+            ),
+        ),
+    ]
@@ -44,6 +44,10 @@ class Course(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     image = models.ImageField(upload_to='courses/', blank=True, null=True)
+    # Resized copies of image by format and size (see courses/images.py),
+    # and the image name they were generated from
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    image_variants_source = models.CharField(max_length=100, blank=True, editable=False)
     published = models.BooleanField(default=False)
     instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
@@ -53,6 +57,14 @@ class Course(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The catalog: published courses, newest first. Partial, since
+            # filter(published=True) compiles to a bare column test that a
+            # composite (published, created_at) index cannot serve
+            models.Index(
+                fields=['-created_at'], condition=models.Q(published=True), name='courses_course_published_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -60,20 +72,59 @@ class Course(models.Model):
     def get_absolute_url(self):
         return reverse('course_detail', kwargs={'pk': self.pk})
 
+    def get_stats(self):
+        """
+        Return the denormalized CourseStats row, rebuilding it if missing.
+        """
+        try:
+            return self.stats
+        except CourseStats.DoesNotExist:
+            from .stats import rebuild_course_stats
+            rebuild_course_stats([self.pk])
+            self.stats = CourseStats.objects.get(course_id=self.pk)
+            return self.stats
+
     def get_lessons_count(self):
         """Return the total number of lessons in this course."""
-        return self.lessons.count()
+        return self.get_stats().lesson_count
 
     def get_average_rating(self):
-        """Calculate and return the average rating for this course."""
-        reviews = self.reviews.filter(approved=True)
-        if reviews.exists():
-            return round(reviews.aggregate(models.Avg('rating'))['rating__avg'], 1)
-        return 0
+        """Return the average approved rating for this course."""
+        return self.get_stats().average_rating
 
     def get_review_count(self):
         """Return the number of approved reviews for this course."""
-        return self.reviews.filter(approved=True).count()
+        return self.get_stats().review_count
+
+    def get_enrollment_count(self):
+        """Return the number of students enrolled in this course."""
+        return self.get_stats().enrollment_count
+
+
+class CourseStats(models.Model):
+    """
+    Denormalized per-course counters, updated incrementally by signals
+    (see courses/signals.py) and rebuilt by the rebuild_course_stats command.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    lesson_count = models.PositiveIntegerField(default=0)
+    enrollment_count = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Course stats"
+
+    def __str__(self):
+        return f"Stats for course #{self.course_id}"
+
+    @property
+    def average_rating(self):
+        """Average of approved review ratings, rounded to one decimal."""
+        if self.review_count:
+            return round(self.rating_total / self.review_count, 1)
+        return 0
 
 
 class Enrollment(models.Model):
@@ -85,26 +136,48 @@ class Enrollment(models.Model):
     enrolled_at = models.DateTimeField(auto_now_add=True)
     completed = models.BooleanField(default=False)
     completion_date = models.DateTimeField(null=True, blank=True)
+    completed_lessons_count = models.PositiveIntegerField(default=0)
+    # Bit N is set when the lesson with bit_index N is complete (see courses/progress.py)
+    completed_lessons_bitmap = models.BinaryField(default=b'', editable=False)
 
     class Meta:
         unique_together = ('student', 'course')
         ordering = ['-enrolled_at']
+        indexes = [
+            # A student's completed and in-progress courses
+            models.Index(fields=['student', 'completed'], name='courses_enroll_completed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} enrolled in {self.course.title}"
 
     def get_progress(self):
-        """Calculate the progress of this enrollment as a percentage."""
+        """
+        Calculate the progress of this enrollment as a percentage.
+        Reads only stored counters, so select_related('course__stats')
+        makes this query-free.
+        """
         total_lessons = self.course.get_lessons_count()
         if total_lessons == 0:
             return 0
         
-        completed_lessons = self.lesson_completions.count()
+        completed_lessons = min(self.completed_lessons_count, total_lessons)
         return int((completed_lessons / total_lessons) * 100)
 
     def get_completed_lessons_count(self):
         """Return the number of completed lessons for this enrollment."""
-        return self.lesson_completions.count()
+        return self.completed_lessons_count
+
+    def has_completed_lesson(self, lesson):
+        """Check the completion bitmap for a lesson of this course."""
+        if lesson.bit_index is None:
+            return False
+        bits = int.from_bytes(bytes(self.completed_lessons_bitmap or b''), 'little')
+        return bool((bits >> lesson.bit_index) & 1)
+
+    def get_completed_lesson_ids(self, lessons):
+        """Return the ids of the given course lessons that are complete."""
+        return {lesson.pk for lesson in lessons if self.has_completed_lesson(lesson)}
 
 
 class LessonCompletion(models.Model):
@@ -146,6 +219,12 @@ class Review(models.Model):
     class Meta:
         unique_together = ('student', 'course')
         ordering = ['-created_at']
+        indexes = [
+            # Approved reviews of a course, newest first
+            models.Index(
+                fields=['course', '-created_at'], condition=models.Q(approved=True), name='courses_review_approved_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student.username}'s review for {self.course.title}"
@@ -0,0 +1,130 @@
+"""
+Per-enrollment lesson completion state.
+
+LessonCompletion keeps one timestamped row per completed lesson for
+auditing. For reads, each Enrollment also stores a bitmap in which bit N
+is set when the course's lesson with bit_index N is complete, plus its
+popcount in completed_lessons_count, so progress and "is this lesson
+done" checks are answered from the enrollment row alone.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from .analytics import invalidate_course_analytics
+from .models import Enrollment, LessonCompletion
+
+
+def bitmap_to_int(bitmap):
+    return int.from_bytes(bytes(bitmap or b''), 'little')
+
+
+def int_to_bitmap(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def record_lesson_completions(enrollment, lessons):
+    """
+    Mark lessons complete for an enrollment and return the ids of the
+    lessons that were not already complete.
+
+    The enrollment row is locked while its bitmap is updated, and the
+    LessonCompletion rows are inserted with one bulk_create that relies
+    on the (enrollment, lesson) unique constraint to skip duplicates.
+    Lessons must have bit_index and module_id loaded.
+    """
+    from lessons.modules import adjust_module_completions
+
+    with transaction.atomic():
+        locked = Enrollment.objects.select_for_update().only('completed_lessons_bitmap').get(pk=enrollment.pk)
+        bits = bitmap_to_int(locked.completed_lessons_bitmap)
+        new_lessons = [
+            lesson for lesson in lessons
+            if lesson.bit_index is None or not (bits >> lesson.bit_index) & 1
+        ]
+
+        LessonCompletion.objects.bulk_create(
+            [LessonCompletion(enrollment_id=enrollment.pk, lesson=lesson) for lesson in new_lessons],
+            ignore_conflicts=True
+        )
+        for lesson in new_lessons:
+            if lesson.bit_index is not None:
+                bits |= 1 << lesson.bit_index
+
+        enrollment.completed_lessons_bitmap = int_to_bitmap(bits)
+        enrollment.completed_lessons_count = bits.bit_count()
+        Enrollment.objects.filter(pk=enrollment.pk).update(
+            completed_lessons_bitmap=enrollment.completed_lessons_bitmap,
+            completed_lessons_count=enrollment.completed_lessons_count,
+        )
+        adjust_module_completions(lesson.module_id for lesson in new_lessons)
+    if new_lessons:
+        invalidate_course_analytics(enrollment.course_id)
+    return [lesson.pk for lesson in new_lessons]
+
+
+def forget_lesson_completions(lesson):
+    """
+    Clear a lesson's bit from every enrollment that completed it, so the
+    slot can be reused by a later lesson.
+    """
+    if lesson.bit_index is None:
+        return
+    mask = ~(1 << lesson.bit_index)
+    with transaction.atomic():
+        enrollments = list(
+            Enrollment.objects.select_for_update()
+            .filter(lesson_completions__lesson=lesson)
+            .only('completed_lessons_bitmap')
+        )
+        for enrollment in enrollments:
+            bits = bitmap_to_int(enrollment.completed_lessons_bitmap) & mask
+            enrollment.completed_lessons_bitmap = int_to_bitmap(bits)
+            enrollment.completed_lessons_count = bits.bit_count()
+        Enrollment.objects.bulk_update(
+            enrollments, ['completed_lessons_bitmap', 'completed_lessons_count'], batch_size=500
+        )
+
+
+def rebuild_enrollment_progress(enrollment_ids):
+    """
+    Recompute bitmaps and completed lesson counts from LessonCompletion
+    rows for the given enrollments.
+    """
+    enrollment_ids = list(enrollment_ids)
+    bits = defaultdict(int)
+    completions = LessonCompletion.objects.filter(
+        enrollment_id__in=enrollment_ids, lesson__bit_index__isnull=False
+    ).values_list('enrollment_id', 'lesson__bit_index')
+    for enrollment_id, bit_index in completions:
+        bits[enrollment_id] |= 1 << bit_index
+
+    enrollments = [
+        Enrollment(
+            pk=enrollment_id,
+            completed_lessons_bitmap=int_to_bitmap(bits[enrollment_id]),
+            completed_lessons_count=bits[enrollment_id].bit_count(),
+        )
+        for enrollment_id in enrollment_ids
+    ]
+    Enrollment.objects.bulk_update(
+        enrollments, ['completed_lessons_bitmap', 'completed_lessons_count'], batch_size=500
+    )
+
+
+def rebuild_all_enrollment_progress(chunk_size=1000):
+    """
+    Rebuild completion bitmaps and counters for every enrollment in chunks.
+    Yields the number of enrollments processed after each chunk.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        enrollment_ids = list(
+            Enrollment.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not enrollment_ids:
+            break
+        rebuild_enrollment_progress(enrollment_ids)
+        processed += len(enrollment_ids)
+        last_id = enrollment_ids[-1]
+        yield processed
@@ -0,0 +1,145 @@
+import re
+
+from django.conf import settings
+from django.db import connection, models
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+
+FTS_TABLE = 'courses_course_fts'
+
+# Maximum number of ranked matches pulled from the full-text index per search.
+SEARCH_RESULT_LIMIT = 1000
+
+# bm25() column weights: title, description, instructor, tags.
+COLUMN_WEIGHTS = (10.0, 1.0, 3.0, 5.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class BaseSearchBackend:
+    """
+    Interface for course catalog search backends.
+    """
+
+    def index_course(self, course):
+        """Add or refresh the index entry for a course."""
+        raise NotImplementedError
+
+    def remove_course(self, course_id):
+        """Drop the index entry for a course."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Rebuild the whole index from the Course table."""
+        raise NotImplementedError
+
+    def search(self, queryset, query):
+        """Filter a Course queryset by query, ordered by relevance."""
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Fallback backend using icontains lookups (no index to maintain).
+    """
+
+    def index_course(self, course):
+        pass
+
+    def remove_course(self, course_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(instructor__username__icontains=query) |
+            Q(tags__name__icontains=query)
+        ).distinct()
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    Backend storing course text in an SQLite FTS5 shadow table.
+
+    The table is created by courses migration 0004 and keyed by course id
+    (the FTS rowid), with one column each for title, description,
+    instructor username and space-separated tag names.
+    """
+
+    def index_course(self, course):
+        tags = ' '.join(course.tags.values_list('name', flat=True)) if course.pk else ''
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [course.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, instructor, tags) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                [course.pk, course.title, course.description, course.instructor.username, tags]
+            )
+
+    def remove_course(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [course_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, instructor, tags) '
+                'SELECT c.id, c.title, c.description, u.username, '
+                '(SELECT group_concat(t.name, \' \') FROM courses_tag t '
+                ' JOIN courses_course_tags ct ON ct.tag_id = t.id WHERE ct.course_id = c.id) '
+                'FROM courses_course c JOIN accounts_user u ON u.id = c.instructor_id'
+            )
+
+    def build_match_expression(self, query):
+        """
+        Turn free text into an FTS5 MATCH expression.
+
+        Every word becomes a quoted prefix term, so "djan intro" matches
+        courses containing words starting with both "djan" and "intro".
+        """
+        tokens = TOKEN_RE.findall(query)
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def search(self, queryset, query):
+        match = self.build_match_expression(query)
+        if not match:
+            return queryset.none()
+
+        weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+                [match, SEARCH_RESULT_LIMIT]
+            )
+            ranked_ids = [row[0] for row in cursor.fetchall()]
+
+        if not ranked_ids:
+            return queryset.none()
+
+        relevance = models.Case(
+            *[models.When(pk=pk, then=position) for position, pk in enumerate(ranked_ids)],
+            output_field=models.IntegerField()
+        )
+        return queryset.filter(pk__in=ranked_ids).annotate(search_rank=relevance).order_by('search_rank')
+
+
+def get_search_backend():
+    """
+    Return the configured course search backend.
+
+    Uses settings.COURSE_SEARCH_BACKEND when set, otherwise FTS5 on SQLite
+    and the icontains fallback on other databases.
+    """
+    backend_path = getattr(settings, 'COURSE_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return SimpleSearchBackend()
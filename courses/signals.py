@@ -0,0 +1,270 @@
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+from accounts.models import User
+from .models import Category, Course, CourseStats, Tag, Enrollment, Review
+from .analytics import invalidate_course_analytics, invalidate_instructor_analytics
+from .facets import LABELS_GENERATION, bump_generations, course_facet_tokens
+from .search import get_search_backend
+from .progress import forget_lesson_completions
+from .stats import adjust_course_stats
+
+
+@receiver(post_save, sender=Course)
+def index_course_on_save(sender, instance, **kwargs):
+    """Refresh the search index entry when a course is saved."""
+    get_search_backend().index_course(instance)
+
+
+@receiver(post_save, sender=Course)
+def create_course_stats(sender, instance, created, **kwargs):
+    """Give every new course an empty stats row."""
+    if created:
+        # Use course_id so the fresh row is not cached on the instance
+        CourseStats.objects.get_or_create(course_id=instance.pk)
+
+
+@receiver(post_delete, sender=Course)
+def remove_course_from_index(sender, instance, **kwargs):
+    """Drop the search index entry when a course is deleted."""
+    get_search_backend().remove_course(instance.pk)
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def index_course_on_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refresh the search index when tags are added to or removed from courses."""
+    if action == 'pre_clear' and reverse:
+        # Remember the affected courses before the rows disappear
+        instance._search_cleared_course_ids = list(instance.courses.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    backend = get_search_backend()
+    if not reverse:
+        backend.index_course(instance)
+        return
+
+    if action == 'post_clear':
+        course_ids = getattr(instance, '_search_cleared_course_ids', [])
+    else:
+        course_ids = pk_set or []
+    for course in Course.objects.filter(pk__in=course_ids).select_related('instructor'):
+        backend.index_course(course)
+
+
+@receiver(post_save, sender=Tag)
+def index_courses_on_tag_save(sender, instance, created, **kwargs):
+    """Refresh the courses carrying a tag when the tag is renamed."""
+    if created:
+        return
+    backend = get_search_backend()
+    for course in instance.courses.select_related('instructor'):
+        backend.index_course(course)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_courses_on_tag_delete(sender, instance, **kwargs):
+    instance._search_deleted_course_ids = list(instance.courses.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def index_courses_on_tag_delete(sender, instance, **kwargs):
+    """Refresh the courses that carried a deleted tag."""
+    course_ids = getattr(instance, '_search_deleted_course_ids', [])
+    backend = get_search_backend()
+    for course in Course.objects.filter(pk__in=course_ids).select_related('instructor'):
+        backend.index_course(course)
+
+
+@receiver(post_save, sender=User)
+def index_courses_on_instructor_save(sender, instance, created, update_fields, **kwargs):
+    """Refresh an instructor's courses when their username may have changed."""
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    backend = get_search_backend()
+    for course in Course.objects.filter(instructor=instance).select_related('instructor'):
+        backend.index_course(course)
+
+
+@receiver(post_save, sender='lessons.Lesson')
+def count_lesson_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_course_stats(instance.course_id, lesson_count=1)
+
+
+@receiver(post_delete, sender='lessons.Lesson')
+def count_lesson_deleted(sender, instance, **kwargs):
+    adjust_course_stats(instance.course_id, lesson_count=-1)
+
+
+@receiver(pre_delete, sender='lessons.Lesson')
+def uncount_deleted_lesson_completions(sender, instance, **kwargs):
+    """Clear the lesson from the progress of enrollments that had completed it."""
+    forget_lesson_completions(instance)
+
+
+@receiver(post_save, sender=Enrollment)
+def count_enrollment_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_course_stats(instance.course_id, enrollment_count=1)
+
+
+@receiver(post_delete, sender=Enrollment)
+def count_enrollment_deleted(sender, instance, **kwargs):
+    adjust_course_stats(instance.course_id, enrollment_count=-1)
+
+
+def _approved_rating(course_id, approved, rating):
+    """Return a review's (course_id, count, rating) contribution to course stats."""
+    if approved:
+        return course_id, 1, rating
+    return course_id, 0, 0
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    """Record the stored approval state so post_save can apply the difference."""
+    previous = None
+    if instance.pk:
+        previous = Review.objects.filter(pk=instance.pk).values_list('course_id', 'approved', 'rating').first()
+    instance._stats_previous = _approved_rating(*previous) if previous else None
+
+
+@receiver(post_save, sender=Review)
+def count_review_saved(sender, instance, **kwargs):
+    """Apply changes in approval or rating to the course's review counters."""
+    previous = getattr(instance, '_stats_previous', None)
+    course_id, count, rating = _approved_rating(instance.course_id, instance.approved, instance.rating)
+    if previous and previous[0] == course_id:
+        adjust_course_stats(course_id, review_count=count - previous[1], rating_total=rating - previous[2])
+        return
+    if previous:
+        adjust_course_stats(previous[0], review_count=-previous[1], rating_total=-previous[2])
+    adjust_course_stats(course_id, review_count=count, rating_total=rating)
+
+
+@receiver(post_delete, sender=Review)
+def count_review_deleted(sender, instance, **kwargs):
+    if instance.approved:
+        adjust_course_stats(instance.course_id, review_count=-1, rating_total=-instance.rating)
+
+
+@receiver(pre_save, sender=Course)
+def remember_course_facets(sender, instance, **kwargs):
+    """Record the stored facet values so post_save can invalidate both old and new."""
+    previous = None
+    if instance.pk:
+        previous = Course.objects.filter(pk=instance.pk).values(
+            'published', 'category_id', 'instructor_id'
+        ).first()
+    instance._facets_previous = previous
+
+
+@receiver(post_save, sender=Course)
+def invalidate_facets_on_course_save(sender, instance, **kwargs):
+    """Invalidate the facets of a course that is, or was, published."""
+    previous = getattr(instance, '_facets_previous', None)
+    was_published = bool(previous and previous['published'])
+    if not (instance.published or was_published):
+        return
+    tag_ids = list(instance.tags.values_list('pk', flat=True))
+    tokens = course_facet_tokens(instance.category_id, instance.instructor_id, tag_ids)
+    if previous:
+        tokens += course_facet_tokens(previous['category_id'], previous['instructor_id'], [])
+    bump_generations(tokens)
+
+
+@receiver(pre_delete, sender=Course)
+def remember_course_tags_on_delete(sender, instance, **kwargs):
+    instance._facets_tag_ids = list(instance.tags.values_list('pk', flat=True)) if instance.published else []
+
+
+@receiver(post_delete, sender=Course)
+def invalidate_facets_on_course_delete(sender, instance, **kwargs):
+    if instance.published:
+        tag_ids = getattr(instance, '_facets_tag_ids', [])
+        bump_generations(course_facet_tokens(instance.category_id, instance.instructor_id, tag_ids))
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def invalidate_facets_on_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate tag facets when a published course gains or loses tags."""
+    if action not in ('pre_clear', 'post_add', 'post_remove'):
+        return
+    if not reverse:
+        if not instance.published:
+            return
+        tag_ids = pk_set if action != 'pre_clear' else instance.tags.values_list('pk', flat=True)
+        bump_generations(course_facet_tokens(instance.category_id, instance.instructor_id, tag_ids))
+        return
+
+    courses = Course.objects.filter(published=True)
+    if action == 'pre_clear':
+        courses = courses.filter(tags=instance)
+    else:
+        courses = courses.filter(pk__in=pk_set or [])
+    tokens = [f'tag:{instance.pk}']
+    for category_id, instructor_id in courses.values_list('category_id', 'instructor_id'):
+        tokens += course_facet_tokens(category_id, instructor_id, [])
+    bump_generations(tokens)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_facet_labels(sender, instance, **kwargs):
+    """Renamed or deleted options change labels in every cached facet."""
+    if kwargs.get('created'):
+        return
+    bump_generations([LABELS_GENERATION])
+
+
+@receiver(post_save, sender=User)
+def invalidate_facet_labels_on_instructor_save(sender, instance, created, update_fields, **kwargs):
+    if created or instance.role != 'instructor':
+        return
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    bump_generations([LABELS_GENERATION])
+
+
+@receiver(post_save, sender=Course)
+def invalidate_analytics_on_course_save(sender, instance, **kwargs):
+    """Drop cached instructor analytics for the course's current and previous owner."""
+    previous = getattr(instance, '_facets_previous', None)
+    instructor_ids = [instance.instructor_id]
+    if previous:
+        instructor_ids.append(previous['instructor_id'])
+    invalidate_instructor_analytics(instructor_ids)
+
+
+@receiver(post_delete, sender=Course)
+def invalidate_analytics_on_course_delete(sender, instance, **kwargs):
+    invalidate_instructor_analytics([instance.instructor_id])
+
+
+@receiver(post_save, sender='lessons.Lesson')
+def invalidate_analytics_on_lesson_created(sender, instance, created, **kwargs):
+    if created:
+        invalidate_course_analytics(instance.course_id)
+
+
+@receiver(post_delete, sender='lessons.Lesson')
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_analytics_on_course_activity(sender, instance, **kwargs):
+    """Drop cached instructor analytics when a course's lessons, enrollments or reviews change."""
+    invalidate_course_analytics(instance.course_id)
+
+
+@receiver(post_save, sender='assignments.Submission')
+@receiver(post_delete, sender='assignments.Submission')
+def invalidate_analytics_on_submission(sender, instance, **kwargs):
+    """Drop cached instructor analytics when a submission arrives, is graded or is removed."""
+    invalidate_instructor_analytics(
+        Course.objects.filter(lessons__assignments__id=instance.assignment_id)
+        .values_list('instructor_id', flat=True)
+    )
@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from .analytics import invalidate_instructor_analytics
+from .models import Course, CourseStats, Enrollment, Review
+
+
+def adjust_course_stats(course_id, **deltas):
+    """
+    Atomically add deltas to a course's counters, e.g.
+    adjust_course_stats(course.pk, lesson_count=1).
+    """
+    deltas = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if deltas:
+        CourseStats.objects.filter(course_id=course_id).update(**deltas)
+
+
+def rebuild_course_stats(course_ids):
+    """
+    Recompute the counters for the given courses from the source tables.
+    """
+    from lessons.models import Lesson
+
+    course_ids = list(course_ids)
+    lesson_counts = dict(
+        Lesson.objects.filter(course_id__in=course_ids)
+        .values_list('course_id').annotate(total=Count('id')).order_by()
+    )
+    enrollment_counts = dict(
+        Enrollment.objects.filter(course_id__in=course_ids)
+        .values_list('course_id').annotate(total=Count('id')).order_by()
+    )
+    review_totals = {
+        row['course_id']: row for row in
+        Review.objects.filter(course_id__in=course_ids, approved=True)
+        .values('course_id').annotate(count=Count('id'), total=Sum('rating')).order_by()
+    }
+
+    stats = []
+    for course_id in course_ids:
+        reviews = review_totals.get(course_id, {})
+        stats.append(CourseStats(
+            course_id=course_id,
+            lesson_count=lesson_counts.get(course_id, 0),
+            enrollment_count=enrollment_counts.get(course_id, 0),
+            review_count=reviews.get('count', 0),
+            rating_total=reviews.get('total') or 0,
+        ))
+
+    fields = ['lesson_count', 'enrollment_count', 'review_count', 'rating_total']
+    with transaction.atomic():
+        CourseStats.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=['course'], update_fields=fields
+        )
+    invalidate_instructor_analytics(
+        Course.objects.filter(pk__in=course_ids).values_list('instructor_id', flat=True)
+    )
+
+
+def rebuild_all_course_stats(chunk_size=500):
+    """
+    Rebuild stats for every course, chunk_size courses at a time.
+    Yields the number of courses processed after each chunk.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        course_ids = list(
+            Course.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not course_ids:
+            break
+        rebuild_course_stats(course_ids)
+        processed += len(course_ids)
+        last_id = course_ids[-1]
+        yield processed
+
@@ -0,0 +1,32 @@
+from django import template
+from django.utils.html import format_html
+from courses.images import build_srcset
+
+register = template.Library()
+
+# Card images span the full column: one column on phones, two on
+# tablets and three on desktops (see course_list.html and home.html)
+CARD_SIZES = '(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw'
+
+
+@register.simple_tag
+def course_image(course, css_class='', sizes=CARD_SIZES):
+    """
+    Render a course's image as a <picture> with WebP and JPEG/PNG srcsets,
+    or a plain <img> of the original while variants are still pending.
+    """
+    variants = course.image_variants if course.image_variants_source == course.image.name else {}
+    if not variants:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">', course.image.url, course.title, css_class
+        )
+
+    fallback = variants.get('jpeg') or variants.get('png')
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy">'
+        '</picture>',
+        build_srcset(variants['webp']), sizes,
+        course.image.url, build_srcset(fallback), sizes, course.title, css_class,
+    )
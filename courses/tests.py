@@ -1,7 +1,24 @@
-from django.test import TestCase
+import base64
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.test import TestCase, override_settings
+from django.core.files.base import ContentFile
+from PIL import Image
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from courses.models import Category, Tag, Course, Enrollment, Review
+from django.core.management import call_command
+from django.core.cache import cache
+from io import StringIO
+import json
+from courses.models import Category, Tag, Course, CourseStats, Enrollment, LessonCompletion, Review
+from courses.facets import CourseFacets
+from courses.analytics import get_instructor_course_analytics
+from courses.progress import record_lesson_completions
+from courses.images import pending_courses, process_pending_images
+from uploads.storage import referenced_names
 from lessons.models import Lesson
 
 User = get_user_model()
@@ -135,4 +152,577 @@ class CoursesTestCase(TestCase):
         self.assertTrue(Enrollment.objects.filter(
             student=self.student_user,
             course=self.course
-        ).exists())
\ No newline at end of file
+        ).exists())
+
+
+class CourseSearchTestCase(TestCase):
+    def setUp(self):
+        self.instructor_user = User.objects.create_user(
+            username='searchinstructor',
+            email='searchinstructor@test.com',
+            password='testpass123',
+            role='instructor'
+        )
+        self.tag = Tag.objects.create(name='Backend')
+        self.python_course = Course.objects.create(
+            title='Python Fundamentals',
+            description='Learn the basics of programming.',
+            instructor=self.instructor_user,
+            published=True
+        )
+        self.web_course = Course.objects.create(
+            title='Web Development',
+            description='Build websites with Python and Django.',
+            instructor=self.instructor_user,
+            published=True
+        )
+
+    def test_search_ranks_title_matches_first(self):
+        """Test that title matches rank above description matches"""
+        response = self.client.get(reverse('course_list'), {'q': 'python'})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.python_course, self.web_course]
+        )
+
+    def test_search_matches_word_prefix(self):
+        """Test that partial words match the start of indexed words"""
+        response = self.client.get(reverse('course_list'), {'q': 'fundament'})
+        self.assertEqual(list(response.context['page_obj']), [self.python_course])
+
+    def test_search_index_follows_tag_changes(self):
+        """Test that adding and renaming tags updates the index"""
+        self.web_course.tags.add(self.tag)
+        response = self.client.get(reverse('course_list'), {'q': 'backend'})
+        self.assertEqual(list(response.context['page_obj']), [self.web_course])
+
+        self.tag.name = 'Server'
+        self.tag.save()
+        response = self.client.get(reverse('course_list'), {'q': 'backend'})
+        self.assertEqual(list(response.context['page_obj']), [])
+
+    def test_search_matches_instructor_username(self):
+        """Test that courses can be found by instructor username"""
+        response = self.client.get(reverse('course_list'), {'q': 'searchinstructor'})
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_deleted_course_removed_from_index(self):
+        """Test that deleted courses no longer match"""
+        self.python_course.delete()
+        response = self.client.get(reverse('course_list'), {'q': 'fundamentals'})
+        self.assertEqual(list(response.context['page_obj']), [])
+
+
+class CourseStatsTestCase(TestCase):
+    def setUp(self):
+        self.student_user = User.objects.create_user(
+            username='statsstudent',
+            email='statsstudent@test.com',
+            password='testpass123',
+            role='student'
+        )
+        self.instructor_user = User.objects.create_user(
+            username='statsinstructor',
+            email='statsinstructor@test.com',
+            password='testpass123',
+            role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Stats Course',
+            description='Stats course description',
+            instructor=self.instructor_user,
+            published=True
+        )
+
+    def get_stats(self):
+        return CourseStats.objects.get(course=self.course)
+
+    def test_lesson_and_enrollment_counts(self):
+        """Test that lesson and enrollment counters follow creates and deletes"""
+        lesson = Lesson.objects.create(title='L1', description='d', course=self.course, order=1)
+        Lesson.objects.create(title='L2', description='d', course=self.course, order=2)
+        enrollment = Enrollment.objects.create(student=self.student_user, course=self.course)
+        self.assertEqual(self.get_stats().lesson_count, 2)
+        self.assertEqual(self.get_stats().enrollment_count, 1)
+
+        lesson.delete()
+        enrollment.delete()
+        self.assertEqual(self.get_stats().lesson_count, 1)
+        self.assertEqual(self.get_stats().enrollment_count, 0)
+
+    def test_review_approval_updates_rating(self):
+        """Test that only approved reviews count towards the rating"""
+        review = Review.objects.create(
+            course=self.course,
+            student=self.student_user,
+            rating=4,
+            review_text='Pending review',
+        )
+        self.assertEqual(self.get_stats().review_count, 0)
+
+        review.approved = True
+        review.save()
+        self.assertEqual(self.get_stats().review_count, 1)
+        self.assertEqual(self.get_stats().average_rating, 4.0)
+
+        review.delete()
+        self.assertEqual(self.get_stats().review_count, 0)
+        self.assertEqual(self.get_stats().average_rating, 0)
+
+    def test_rebuild_course_stats_command(self):
+        """Test that the reconcile command repairs drifted counters"""
+        Lesson.objects.create(title='L1', description='d', course=self.course, order=1)
+        CourseStats.objects.filter(course=self.course).update(lesson_count=7, enrollment_count=3)
+        call_command('rebuild_course_stats', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.get_stats().lesson_count, 1)
+        self.assertEqual(self.get_stats().enrollment_count, 0)
+
+    def test_course_list_reads_stats_without_extra_queries(self):
+        """Test that course cards do not query per course for their stats"""
+        for i in range(5):
+            Course.objects.create(
+                title=f'Extra Course {i}',
+                description='d',
+                instructor=self.instructor_user,
+                published=True
+            )
+        with self.assertNumQueries(3):
+            self.client.get(reverse('course_list'))
+
+
+class CursorPaginationTestCase(TestCase):
+    def setUp(self):
+        self.instructor_user = User.objects.create_user(
+            username='pageinstructor',
+            email='pageinstructor@test.com',
+            password='testpass123',
+            role='instructor'
+        )
+        for i in range(13):
+            Course.objects.create(
+                title=f'Paged Course {i}',
+                description='d',
+                instructor=self.instructor_user,
+                published=True
+            )
+
+    def test_course_list_cursor_navigation(self):
+        """Test that next and previous cursors walk the catalog without gaps"""
+        expected = list(Course.objects.order_by('-created_at', '-pk'))
+
+        first = self.client.get(reverse('course_list')).context['page_obj']
+        self.assertEqual(list(first), expected[:6])
+        self.assertFalse(first.has_previous())
+
+        second = self.client.get(reverse('course_list'), {'cursor': first.next_cursor}).context['page_obj']
+        self.assertEqual(list(second), expected[6:12])
+
+        third = self.client.get(reverse('course_list'), {'cursor': second.next_cursor}).context['page_obj']
+        self.assertEqual(list(third), expected[12:])
+        self.assertFalse(third.has_next())
+
+        back = self.client.get(reverse('course_list'), {'cursor': third.previous_cursor}).context['page_obj']
+        self.assertEqual(list(back), expected[6:12])
+        self.assertTrue(back.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Test that a malformed cursor falls back to the first page"""
+        expected = list(Course.objects.order_by('-created_at', '-pk'))[:6]
+        response = self.client.get(reverse('course_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 6)
+
+        # Well-formed JSON with values of the wrong shape or type
+        for payload in ['{"v":5}', '{"v":[5,1]}', '{"v":[null,1]}', '{"v":["soon",1]}', '[1]']:
+            cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+            response = self.client.get(reverse('course_list'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 200, payload)
+            self.assertEqual(list(response.context['page_obj']), expected, payload)
+
+
+class CourseFacetsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor_user = User.objects.create_user(
+            username='facetinstructor',
+            email='facetinstructor@test.com',
+            password='testpass123',
+            role='instructor'
+        )
+        self.programming = Category.objects.create(name='Programming')
+        self.design = Category.objects.create(name='Design')
+        self.tag = Tag.objects.create(name='Beginner')
+        self.course = Course.objects.create(
+            title='Intro to Python',
+            description='d',
+            instructor=self.instructor_user,
+            category=self.programming,
+            published=True
+        )
+        self.course.tags.add(self.tag)
+        Course.objects.create(
+            title='Color Theory',
+            description='d',
+            instructor=self.instructor_user,
+            category=self.design,
+            published=True
+        )
+        Course.objects.create(
+            title='Draft Course',
+            description='d',
+            instructor=self.instructor_user,
+            category=self.design,
+            published=False
+        )
+
+    def counts(self, facet, **kwargs):
+        facets = CourseFacets(kwargs.pop('query', None), kwargs).get_counts()
+        return {option['name']: option['count'] for option in facets[facet]}
+
+    def test_facet_counts_published_courses(self):
+        """Test that facets count only published courses per option"""
+        self.assertEqual(self.counts('category'), {'Design': 1, 'Programming': 1})
+        self.assertEqual(self.counts('tag'), {'Beginner': 1})
+        self.assertEqual(self.counts('instructor'), {'facetinstructor': 2})
+
+    def test_facet_counts_respect_other_filters(self):
+        """Test that each facet applies the other selected filters"""
+        self.assertEqual(self.counts('category', tag=str(self.tag.pk)), {'Programming': 1})
+        self.assertEqual(
+            self.counts('category', category=str(self.design.pk)),
+            {'Design': 1, 'Programming': 1}
+        )
+        self.assertEqual(self.counts('instructor', query='color'), {'facetinstructor': 1})
+
+    def test_facets_cached_until_course_published(self):
+        """Test that cached facets are reused and invalidated on publish"""
+        self.counts('category')
+        with self.assertNumQueries(0):
+            self.counts('category')
+
+        draft = Course.objects.get(title='Draft Course')
+        draft.published = True
+        draft.save()
+        self.assertEqual(self.counts('category'), {'Design': 2, 'Programming': 1})
+
+    def test_unrelated_filter_state_stays_cached(self):
+        """Test that publishing a course only invalidates facets it affects"""
+        self.counts('category', tag=str(self.tag.pk))
+        draft = Course.objects.get(title='Draft Course')
+        draft.published = True
+        draft.save()
+        # The draft has no tags, so only the (unfiltered) tag facet is recomputed
+        with self.assertNumQueries(1) as context:
+            self.assertEqual(self.counts('category', tag=str(self.tag.pk)), {'Programming': 1})
+        self.assertNotIn("'category' AS", context.captured_queries[0]['sql'])
+
+
+class EnrollmentProgressTestCase(TestCase):
+    def setUp(self):
+        self.student_user = User.objects.create_user(
+            username='progressstudent',
+            email='progressstudent@test.com',
+            password='testpass123',
+            role='student'
+        )
+        self.instructor_user = User.objects.create_user(
+            username='progressinstructor',
+            email='progressinstructor@test.com',
+            password='testpass123',
+            role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Progress Course',
+            description='d',
+            instructor=self.instructor_user,
+            published=True
+        )
+        self.lessons = [
+            Lesson.objects.create(title=f'L{i}', description='d', course=self.course, order=i)
+            for i in range(4)
+        ]
+        self.enrollment = Enrollment.objects.create(student=self.student_user, course=self.course)
+        self.client.login(username='progressstudent', password='testpass123')
+
+    def complete(self, lesson):
+        return self.client.post(reverse('mark_lesson_complete', kwargs={
+            'course_pk': self.course.pk,
+            'lesson_pk': lesson.pk
+        }))
+
+    def test_mark_lesson_complete_increments_counter(self):
+        """Test that completing a lesson once increments the stored counter"""
+        self.complete(self.lessons[0])
+        self.complete(self.lessons[0])
+        self.complete(self.lessons[1])
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons_count, 2)
+        self.assertEqual(self.enrollment.get_progress(), 50)
+
+    def test_completing_all_lessons_completes_course(self):
+        """Test that the enrollment is marked complete after the last lesson"""
+        for lesson in self.lessons:
+            self.complete(lesson)
+        self.enrollment.refresh_from_db()
+        self.assertTrue(self.enrollment.completed)
+
+    def test_deleting_completed_lesson_decrements_counter(self):
+        """Test that deleting a completed lesson keeps progress consistent"""
+        self.complete(self.lessons[0])
+        self.complete(self.lessons[1])
+        self.lessons[0].delete()
+        enrollment = Enrollment.objects.select_related('course__stats').get(pk=self.enrollment.pk)
+        self.assertEqual(enrollment.completed_lessons_count, 1)
+        self.assertEqual(enrollment.get_progress(), 33)
+
+    def test_progress_reads_without_queries(self):
+        """Test that progress is served from stored counters"""
+        enrollment = Enrollment.objects.select_related('course__stats').get(pk=self.enrollment.pk)
+        with self.assertNumQueries(0):
+            enrollment.get_progress()
+
+    def test_rebuild_enrollment_progress_command(self):
+        """Test that the rebuild command fixes counter drift"""
+        self.complete(self.lessons[0])
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_lessons_count=3)
+        call_command('rebuild_enrollment_progress', stdout=StringIO())
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons_count, 1)
+
+    def complete_batch(self, lesson_ids):
+        return self.client.post(
+            reverse('mark_lessons_complete_batch', kwargs={'course_pk': self.course.pk}),
+            data=json.dumps({'lesson_ids': lesson_ids}),
+            content_type='application/json'
+        )
+
+    def test_batch_completion_inserts_new_lessons(self):
+        """Test that the batch endpoint skips duplicates and reports progress"""
+        self.complete(self.lessons[0])
+        response = self.complete_batch([self.lessons[0].pk, self.lessons[1].pk, self.lessons[2].pk])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['created'], [self.lessons[1].pk, self.lessons[2].pk])
+        self.assertEqual(data['completed_lessons'], 3)
+        self.assertEqual(data['progress'], 75)
+        self.assertFalse(data['course_completed'])
+        self.assertEqual(LessonCompletion.objects.filter(enrollment=self.enrollment).count(), 3)
+
+    def test_batch_completion_completes_course(self):
+        """Test that a batch covering every lesson completes the course"""
+        response = self.complete_batch([lesson.pk for lesson in self.lessons])
+        self.assertTrue(response.json()['course_completed'])
+        self.enrollment.refresh_from_db()
+        self.assertTrue(self.enrollment.completed)
+        self.assertIsNotNone(self.enrollment.completion_date)
+
+    def test_batch_completion_rejects_foreign_lessons(self):
+        """Test that lessons from other courses are reported and ignored"""
+        other_course = Course.objects.create(title='Other', description='d', instructor=self.instructor_user)
+        other_lesson = Lesson.objects.create(title='X', description='d', course=other_course, order=1)
+        data = self.complete_batch([other_lesson.pk]).json()
+        self.assertEqual(data['invalid'], [other_lesson.pk])
+        self.assertEqual(data['completed_lessons'], 0)
+
+    def test_batch_completion_validates_payload(self):
+        """Test that malformed bodies are rejected"""
+        response = self.client.post(
+            reverse('mark_lessons_complete_batch', kwargs={'course_pk': self.course.pk}),
+            data='{"lesson_ids": "abc"}',
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_completion_bitmap_tracks_lessons(self):
+        """Test that the bitmap answers per-lesson completion checks"""
+        self.complete(self.lessons[1])
+        self.complete(self.lessons[3])
+        self.enrollment.refresh_from_db()
+        self.assertTrue(self.enrollment.has_completed_lesson(self.lessons[1]))
+        self.assertFalse(self.enrollment.has_completed_lesson(self.lessons[2]))
+        self.assertEqual(
+            self.enrollment.get_completed_lesson_ids(self.lessons),
+            {self.lessons[1].pk, self.lessons[3].pk}
+        )
+
+    def test_deleted_lesson_slot_is_cleared_before_reuse(self):
+        """Test that a new lesson reusing a freed bit is not shown as complete"""
+        self.complete(self.lessons[3])
+        self.lessons[3].delete()
+        new_lesson = Lesson.objects.create(title='L4', description='d', course=self.course, order=4)
+        self.assertEqual(new_lesson.bit_index, self.lessons[3].bit_index)
+        self.enrollment.refresh_from_db()
+        self.assertFalse(self.enrollment.has_completed_lesson(new_lesson))
+
+    def test_course_lessons_checklist_from_bitmap(self):
+        """Test that the course lessons page marks completed lessons"""
+        self.complete(self.lessons[0])
+        response = self.client.get(reverse('course_lessons', kwargs={'course_pk': self.course.pk}))
+        self.assertEqual(response.context['completed_lessons'], {self.lessons[0].pk})
+
+
+class InstructorAnalyticsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor_user = User.objects.create_user(
+            username='analyticsinstructor', password='testpass123', role='instructor'
+        )
+        self.students = [
+            User.objects.create_user(username=f'analyticsstudent{i}', password='testpass123', role='student')
+            for i in range(4)
+        ]
+        self.course = Course.objects.create(
+            title='Analytics Course', description='d', instructor=self.instructor_user, published=True
+        )
+        self.empty_course = Course.objects.create(
+            title='Empty Course', description='d', instructor=self.instructor_user
+        )
+        self.lessons = [
+            Lesson.objects.create(title=f'L{i}', description='d', course=self.course, order=i)
+            for i in range(2)
+        ]
+        self.enrollments = [
+            Enrollment.objects.create(student=student, course=self.course) for student in self.students
+        ]
+
+    def get_course(self, course):
+        return next(c for c in get_instructor_course_analytics(self.instructor_user.pk) if c.pk == course.pk)
+
+    def test_metrics(self):
+        """Test enrollment, completion, progress, rating and pending submission figures"""
+        from assignments.models import Assignment, Submission
+        from django.utils import timezone
+
+        record_lesson_completions(self.enrollments[0], self.lessons)
+        record_lesson_completions(self.enrollments[1], self.lessons[:1])
+        Enrollment.objects.filter(pk=self.enrollments[0].pk).update(completed=True)
+        Review.objects.create(course=self.course, student=self.students[0], rating=4, review_text='r', approved=True)
+        assignment = Assignment.objects.create(
+            title='A', description='d', lesson=self.lessons[0], due_date=timezone.now()
+        )
+        Submission.objects.create(assignment=assignment, student=self.students[0], text='a')
+        Submission.objects.create(assignment=assignment, student=self.students[1], text='b', score=80)
+
+        course = self.get_course(self.course)
+        self.assertEqual(course.enrollment_count, 4)
+        self.assertEqual(course.completion_rate, 25)
+        self.assertEqual(course.average_progress, 38)
+        self.assertEqual(course.average_rating, 4)
+        self.assertEqual(course.pending_submissions, 1)
+
+        empty = self.get_course(self.empty_course)
+        self.assertEqual((empty.enrollment_count, empty.completion_rate, empty.average_progress), (0, 0, 0))
+
+    def test_cached_until_write(self):
+        """Test that analytics are cached per instructor and invalidated on writes"""
+        get_instructor_course_analytics(self.instructor_user.pk)
+        with self.assertNumQueries(0):
+            get_instructor_course_analytics(self.instructor_user.pk)
+
+        record_lesson_completions(self.enrollments[0], self.lessons)
+        self.assertEqual(self.get_course(self.course).average_progress, 25)
+
+        Enrollment.objects.create(
+            student=User.objects.create_user(username='late', password='x', role='student'),
+            course=self.course
+        )
+        self.assertEqual(self.get_course(self.course).enrollment_count, 5)
+
+    def test_dashboard_query_count_is_constant(self):
+        """Test that the instructor dashboard does not query per course"""
+        self.client.login(username='analyticsinstructor', password='testpass123')
+        # Session, user, analytics
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('instructor_dashboard'))
+        self.assertEqual(response.context['total_enrollments'], 4)
+        self.assertContains(response, '4 students')
+
+
+def make_image(size=(1200, 800), color=(200, 30, 30), fmt='PNG', mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, fmt)
+    return ContentFile(buffer.getvalue())
+
+
+class CourseImageVariantsTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.instructor_user = User.objects.create_user(
+            username='imageinstructor', password='testpass123', role='instructor'
+        )
+        self.course = self.make_course('Painting')
+
+    def make_course(self, title, image=None):
+        course = Course(title=title, description='d', instructor=self.instructor_user, published=True)
+        course.image.save('cover.png', image or make_image(), save=False)
+        course.save()
+        return course
+
+    def test_variants_are_generated_by_the_worker(self):
+        response = self.client.get(reverse('course_list'))
+        self.assertContains(response, f'<img src="{self.course.image.url}"')
+        self.assertNotContains(response, 'srcset')
+        self.assertEqual(list(pending_courses()), [self.course])
+
+        out = StringIO()
+        call_command('generate_course_images', stdout=out)
+        self.assertIn('Successfully processed 1 course images (0 unreadable)', out.getvalue())
+        self.assertFalse(pending_courses().exists())
+
+        self.course.refresh_from_db()
+        self.assertEqual(set(self.course.image_variants), {'webp', 'jpeg'})
+        self.assertEqual(set(self.course.image_variants['webp']), {'320', '640', '960'})
+        with Image.open(os.path.join(self.media_root, self.course.image_variants['webp']['640'])) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (640, 360)))
+
+        response = self.client.get(reverse('course_list'))
+        self.assertContains(response, '<source type="image/webp" srcset="/media/courses/derived/')
+        self.assertContains(response, '640w')
+        self.assertContains(response, f'src="{self.course.image.url}" srcset=')
+
+    def test_variants_are_cached_by_content(self):
+        process_pending_images()
+        copy = self.make_course('Painting Again')
+        small = self.make_course('Small', make_image(size=(500, 400), mode='RGBA', color=(0, 0, 0, 0)))
+        self.assertEqual(process_pending_images(), (2, 0))
+
+        copy.refresh_from_db()
+        small.refresh_from_db()
+        self.course.refresh_from_db()
+        self.assertEqual(copy.image_variants, self.course.image_variants)
+        # Never upscaled; transparency keeps a PNG fallback
+        self.assertEqual(set(small.image_variants), {'webp', 'png'})
+        self.assertEqual(set(small.image_variants['png']), {'320'})
+        self.assertTrue(set(self.course.image_variants['jpeg'].values()) <= referenced_names())
+
+    def test_changed_and_broken_images(self):
+        process_pending_images()
+        self.course.image.save('new.png', make_image(color=(0, 0, 255)))
+        self.assertEqual(list(pending_courses()), [self.course])
+
+        broken = self.make_course('Broken', ContentFile(b'not an image'))
+        self.assertEqual(process_pending_images(), (2, 1))
+        broken.refresh_from_db()
+        self.assertEqual(broken.image_variants, {})
+        self.assertFalse(pending_courses().exists())
+
+        self.course.refresh_from_db()
+        self.course.image = None
+        self.course.save()
+        self.assertEqual(list(pending_courses()), [self.course])
+        self.assertEqual(process_pending_images(), (1, 0))
+
+
+class SQLiteWriteBenchmarkTestCase(TestCase):
+    def test_benchmark_compares_profiles(self):
+        out = StringIO()
+        call_command('benchmark_sqlite_writes', workers=2, completions=20, lessons=5, stdout=out)
+        output = out.getvalue()
+        self.assertIn('baseline: ', output)
+        self.assertIn('configured: 20 completions in ', output)
+        self.assertIn('Successfully benchmarked 20 completions with 2 processes', output)
@@ -11,7 +11,10 @@ urlpatterns = [
     path('course/<int:course_pk>/enroll/', views.enroll_in_course, name='enroll_in_course'),
     path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
     path('course/<int:course_pk>/lessons/', views.course_lessons, name='course_lessons'),
+    path('course/<int:course_pk>/module/<int:module_pk>/lessons/', views.course_module_lessons, name='course_module_lessons'),
+    path('course/<int:course_pk>/lessons/other/', views.course_module_lessons, name='course_other_lessons'),
     path('course/<int:course_pk>/lesson/<int:lesson_pk>/complete/', views.mark_lesson_complete, name='mark_lesson_complete'),
+    path('course/<int:course_pk>/lessons/complete/', views.mark_lessons_complete_batch, name='mark_lessons_complete_batch'),
     path('employee/enrollments/', views.employee_enrollments, name='employee_enrollments'),
     path('course/<int:course_pk>/review/', views.submit_review, name='submit_review'),
     path('review/<int:review_pk>/approve/', views.approve_review, name='approve_review'),
@@ -1,30 +1,32 @@
+import json
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q, Avg
-from django.http import JsonResponse
-from .models import Course, Category, Tag, Enrollment, LessonCompletion, Review
-from accounts.models import User
+from django.db.models import Avg
+from django.http import HttpResponseForbidden, JsonResponse
+from django.db import transaction
+from django.utils import timezone
+from django.views.decorators.http import require_POST, require_safe
+from .models import Course, Enrollment, Review
 from .forms import CourseForm
-from lessons.models import Lesson
+from .search import get_search_backend
+from .facets import CourseFacets
+from .progress import record_lesson_completions
+from lessons.models import Lesson, Module
+from lessons.modules import module_progress
+from online_learning_system.pagination import CursorPaginator
 
 
 def course_list(request):
     """
     Display a list of published courses.
     """
-    courses = Course.objects.filter(published=True).select_related('instructor', 'category').prefetch_related('tags')
+    courses = Course.objects.filter(published=True).select_related('instructor', 'category', 'stats').prefetch_related('tags')
     
     # Search functionality
     query = request.GET.get('q')
     if query:
-        courses = courses.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(instructor__username__icontains=query) |
-            Q(tags__name__icontains=query)
-        ).distinct()
+        courses = get_search_backend().search(courses, query)
     
     # Category filter
     category_id = request.GET.get('category')
@@ -41,21 +43,22 @@ def course_list(request):
     if instructor_id:
         courses = courses.filter(instructor_id=instructor_id)
     
-    # Pagination
-    paginator = Paginator(courses, 6)  # Show 6 courses per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination on -created_at (or search relevance)
+    paginator = CursorPaginator(courses, 6)  # Show 6 courses per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
-    # Get categories, tags, and instructors for filter dropdowns
-    categories = Category.objects.all()
-    tags = Tag.objects.all()
-    instructors = User.objects.filter(role='instructor')
+    # Facet counts for the filter dropdowns (cached per filter combination)
+    facets = CourseFacets(query, {
+        'category': category_id,
+        'tag': tag_id,
+        'instructor': instructor_id,
+    }).get_counts()
     
     context = {
         'page_obj': page_obj,
-        'categories': categories,
-        'tags': tags,
-        'instructors': instructors,
+        'categories': facets['category'],
+        'tags': facets['tag'],
+        'instructors': facets['instructor'],
         'query': query,
         'selected_category': int(category_id) if category_id else None,
         'selected_tag': int(tag_id) if tag_id else None,
@@ -69,7 +72,9 @@ def course_detail(request, pk):
     """
     Display details of a specific course.
     """
-    course = get_object_or_404(Course, pk=pk)
+    course = get_object_or_404(
+        Course.objects.select_related('stats', 'instructor', 'category').prefetch_related('tags'), pk=pk
+    )
     
     # Check if student is enrolled in this course
     enrollment = None
@@ -106,9 +111,8 @@ def instructor_courses(request):
     courses = Course.objects.filter(instructor=request.user).select_related('category').prefetch_related('tags')
     
     # Pagination
-    paginator = Paginator(courses, 5)  # Show 5 courses per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(courses, 5)  # Show 5 courses per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     return render(request, 'courses/instructor_courses.html', {'page_obj': page_obj})
 
@@ -227,7 +231,7 @@ def student_dashboard(request):
         return redirect('home')
     
     # Get student's enrollments with related course and lesson completion data
-    enrollments = Enrollment.objects.filter(student=request.user).select_related('course', 'course__instructor')
+    enrollments = Enrollment.objects.filter(student=request.user).select_related('course', 'course__instructor', 'course__stats')
     
     return render(request, 'courses/student_dashboard.html', {'enrollments': enrollments})
 
@@ -245,22 +249,67 @@ def course_lessons(request, course_pk):
     
     # Check if student is enrolled in this course
     try:
-        enrollment = Enrollment.objects.get(student=request.user, course=course)
+        enrollment = Enrollment.objects.select_related('course__stats').get(student=request.user, course=course)
     except Enrollment.DoesNotExist:
         messages.error(request, 'You must be enrolled in this course to view its lessons.')
         return redirect('course_detail', pk=course.pk)
     
+    # Courses split into modules show collapsed sections built from the
+    # modules' stored counts; each section loads its lessons when opened
+    modules = module_progress(
+        enrollment, list(Module.objects.filter(course=course).order_by('order', 'created_at', 'pk'))
+    )
+    if modules:
+        other_lessons = {
+            'lesson_count': enrollment.course.get_lessons_count() - sum(module.lesson_count for module in modules),
+            'completed_count': enrollment.completed_lessons_count - sum(module.completed_count for module in modules),
+        }
+        return render(request, 'courses/course_lessons.html', {
+            'course': course,
+            'modules': modules,
+            'other_lessons': other_lessons,
+            'enrollment': enrollment,
+        })
+    
     # Get lessons for this course
-    lessons = Lesson.objects.filter(course=course).order_by('order', 'created_at')
+    lessons = Lesson.objects.filter(course=course).order_by('order', 'created_at', 'pk')
     
-    # Get completed lessons for this enrollment
-    completed_lessons = LessonCompletion.objects.filter(enrollment=enrollment).values_list('lesson_id', flat=True)
+    # Completed lessons come from the enrollment's completion bitmap
+    completed_lessons = enrollment.get_completed_lesson_ids(lessons)
     
     return render(request, 'courses/course_lessons.html', {
         'course': course,
         'lessons': lessons,
         'enrollment': enrollment,
-        'completed_lessons': set(completed_lessons)
+        'completed_lessons': completed_lessons
+    })
+
+
+@login_required
+@require_safe
+def course_module_lessons(request, course_pk, module_pk=None):
+    """
+    Return the lesson list of one module (or, without module_pk, of the
+    lessons outside any module) as an HTML fragment for course_lessons.
+    """
+    if request.user.role != 'student':
+        return HttpResponseForbidden('Access denied.')
+    
+    enrollment = Enrollment.objects.select_related('course').filter(student=request.user, course_id=course_pk).first()
+    if enrollment is None:
+        return HttpResponseForbidden('You must be enrolled in this course to view its lessons.')
+    
+    lessons = Lesson.objects.filter(course_id=course_pk).order_by('order', 'created_at', 'pk')
+    if module_pk is None:
+        lessons = lessons.filter(module__isnull=True)
+    else:
+        module = get_object_or_404(Module, pk=module_pk, course_id=course_pk)
+        lessons = lessons.filter(module=module)
+    
+    return render(request, 'courses/course_lesson_items.html', {
+        'course': enrollment.course,
+        'lessons': lessons,
+        'completed_lessons': enrollment.get_completed_lesson_ids(lessons)
     })
 
 
@@ -284,7 +333,7 @@ def mark_lesson_complete(request, course_pk, lesson_pk):
         return redirect('course_detail', pk=course.pk)
     
     # Create lesson completion if it doesn't exist
-    LessonCompletion.objects.get_or_create(enrollment=enrollment, lesson=lesson)
+    record_lesson_completions(enrollment, [lesson])
     
     # Check if course is now complete
     total_lessons = course.get_lessons_count()
@@ -292,7 +341,8 @@ def mark_lesson_complete(request, course_pk, lesson_pk):
     
     if total_lessons > 0 and completed_lessons >= total_lessons and not enrollment.completed:
         enrollment.completed = True
-        enrollment.save()
+        enrollment.completion_date = timezone.now()
+        enrollment.save(update_fields=['completed', 'completion_date'])
         messages.success(request, f'Congratulations! You have completed the course "{course.title}"!')
     else:
         messages.success(request, f'Lesson "{lesson.title}" marked as complete!')
@@ -300,6 +350,65 @@ def mark_lesson_complete(request, course_pk, lesson_pk):
     return redirect('course_lessons', course_pk=course.pk)
 
 
+# Upper bound on lesson ids accepted by one batch completion request
+MAX_BATCH_COMPLETIONS = 500
+
+
+@login_required
+@require_POST
+def mark_lessons_complete_batch(request, course_pk):
+    """
+    JSON endpoint marking many lessons complete for the current student.
+
+    Expects {"lesson_ids": [...]} and inserts all completions in one
+    bulk_create, relying on the (enrollment, lesson) unique constraint to
+    skip lessons that are already done. Returns the updated progress.
+    """
+    if request.user.role != 'student':
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    try:
+        raw_ids = json.loads(request.body)['lesson_ids']
+        if not isinstance(raw_ids, list):
+            raise TypeError('lesson_ids must be a list')
+        lesson_ids = {int(lesson_id) for lesson_id in raw_ids}
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Expected a JSON body with a list of lesson_ids.'}, status=400)
+    
+    if len(lesson_ids) > MAX_BATCH_COMPLETIONS:
+        return JsonResponse({'error': f'At most {MAX_BATCH_COMPLETIONS} lessons per request.'}, status=400)
+    
+    try:
+        enrollment = Enrollment.objects.select_related('course__stats').get(
+            student=request.user, course_id=course_pk
+        )
+    except Enrollment.DoesNotExist:
+        return JsonResponse({'error': 'You are not enrolled in this course.'}, status=403)
+    course = enrollment.course
+    
+    lessons = list(Lesson.objects.filter(course=course, pk__in=lesson_ids).only('pk', 'bit_index', 'module_id'))
+    invalid_ids = sorted(lesson_ids - {lesson.pk for lesson in lessons})
+    
+    with transaction.atomic():
+        new_ids = record_lesson_completions(enrollment, lessons)
+        
+        # Check course completion once for the whole batch
+        total_lessons = course.get_lessons_count()
+        if total_lessons > 0 and enrollment.completed_lessons_count >= total_lessons and not enrollment.completed:
+            enrollment.completed = True
+            enrollment.completion_date = timezone.now()
+            enrollment.save(update_fields=['completed', 'completion_date'])
+    
+    return JsonResponse({
+        'created': sorted(new_ids),
+        'invalid': invalid_ids,
+        'completed_lessons': enrollment.completed_lessons_count,
+        'total_lessons': total_lessons,
+        'progress': enrollment.get_progress(),
+        'course_completed': enrollment.completed,
+    })
+
+
 @login_required
 def employee_enrollments(request):
     """
@@ -309,12 +418,11 @@ def employee_enrollments(request):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
-    enrollments = Enrollment.objects.select_related('student', 'course').all()
+    enrollments = Enrollment.objects.select_related('student', 'course', 'course__instructor', 'course__stats').all()
     
-    # Pagination
-    paginator = Paginator(enrollments, 10)  # Show 10 enrollments per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination on -enrolled_at avoids deep OFFSET scans
+    paginator = CursorPaginator(enrollments, 10)  # Show 10 enrollments per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     return render(request, 'courses/employee_enrollments.html', {'page_obj': page_obj})
 
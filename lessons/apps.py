@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LessonsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lessons'
+
+    def ready(self):
+        # Register signal handlers that keep module counts in sync
+        from . import signals  # noqa: F401
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Lesson
+from .models import Lesson, Module
 
 
 class LessonForm(forms.ModelForm):
@@ -8,13 +8,22 @@ class LessonForm(forms.ModelForm):
     """
     class Meta:
         model = Lesson
-        fields = ['title', 'description', 'video_file', 'video_url', 'document', 'order']
+        fields = ['title', 'description', 'module', 'video_file', 'video_url', 'document']
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}),
         }
 
-    def __init__(self, *args, **kwargs):
+    # 1-based place in the course; Lesson.order itself is a sparse sort key
+    position = forms.IntegerField(
+        min_value=1, required=False, help_text='Leave empty to keep the current place (new lessons go last).'
+    )
+
+    def __init__(self, *args, course=None, **kwargs):
         super().__init__(*args, **kwargs)
+        # Only the course's own modules can be chosen
+        self.fields['module'].queryset = Module.objects.filter(course=course) if course else Module.objects.none()
+        self.fields['module'].required = False
+        self.fields['module'].label_from_instance = lambda module: module.title
         # Make video_file and video_url optional
         self.fields['video_file'].required = False
         self.fields['video_url'].required = False
@@ -34,4 +43,21 @@ class LessonForm(forms.ModelForm):
         if not video_file and not video_url:
             raise forms.ValidationError("Please provide either a video file or a video URL.")
 
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+
+class ModuleForm(forms.ModelForm):
+    """
+    Form for creating and editing course modules.
+    """
+    class Meta:
+        model = Module
+        fields = ['title', 'description']
+        widgets = {
+            'description': forms.Textarea(attrs={'rows': 3}),
+        }
+
+    # 1-based place in the course; Module.order itself is a sparse sort key
+    position = forms.IntegerField(
+        min_value=1, required=False, help_text='Leave empty to keep the current place (new modules go last).'
+    )
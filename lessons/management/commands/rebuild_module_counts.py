@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from lessons.modules import MODULE_BATCH_SIZE, rebuild_module_counts
+
+
+class Command(BaseCommand):
+    help = 'Reconcile stored module lesson and completion counts with the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            action='append',
+            dest='course_ids',
+            help='Only recount the modules of this course id (may be repeated)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=MODULE_BATCH_SIZE,
+            help=f'Number of modules to recount per batch (default: {MODULE_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_module_counts(options['course_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully recounted {count} modules'))
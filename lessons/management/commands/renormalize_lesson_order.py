@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from courses.models import Course
+from lessons.ordering import MIN_ORDER_GAP, crowded_course_ids, renormalize_course
+
+
+class Command(BaseCommand):
+    help = 'Respace lesson ordering keys in courses where repeated moves have used up the gaps'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-gap',
+            type=int,
+            default=MIN_ORDER_GAP,
+            help=f'Renumber courses with neighbouring keys closer than this (default: {MIN_ORDER_GAP})'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Renumber every course, e.g. once after upgrading from dense 1, 2, 3 ordering'
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            course_ids = list(Course.objects.values_list('pk', flat=True))
+        else:
+            course_ids = crowded_course_ids(options['min_gap'])
+
+        updated = sum(renormalize_course(course_id) for course_id in course_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully renormalized {len(course_ids)} courses ({updated} lessons updated)')
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:05
+
+from django.db import migrations, models
+
+
+def assign_bit_indexes(apps, schema_editor):
+    Lesson = apps.get_model('lessons', 'Lesson')
+    next_index = {}
+    lessons = []
+    for lesson in Lesson.objects.order_by('course_id', 'order', 'created_at', 'pk'):
+        lesson.bit_index = next_index.get(lesson.course_id, 0)
+        next_index[lesson.course_id] = lesson.bit_index + 1
+        lessons.append(lesson)
+    Lesson.objects.bulk_update(lessons, ['bit_index'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='bit_index',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(assign_bit_indexes, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='lesson',
+            unique_together={('course', 'bit_index')},
+        ),
+    ]
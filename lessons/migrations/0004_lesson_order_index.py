@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_hot_filter_indexes'),
+        ('lessons', '0003_lesson_modules'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'order', 'created_at'], name='lessons_lesson_order_idx'),
+        ),
+    ]
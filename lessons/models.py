@@ -1,8 +1,36 @@
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from courses.models import Course
 
 
+class Module(models.Model):
+    """
+    A section of a course that groups lessons.
+
+    lesson_count, completion_count and lesson_bitmap are stored so a
+    course's outline can be shown without loading its lessons; they are
+    kept up to date by lessons.modules.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='modules')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    order = models.PositiveIntegerField(default=0)
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    # Lesson completions by all students, for every lesson in the module
+    completion_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bit N is set when the module holds the course's lesson with bit_index N,
+    # so a student's progress in it is a popcount of the enrollment's bitmap AND this
+    lesson_bitmap = models.BinaryField(default=b'', editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['order', 'created_at']
+
+    def __str__(self):
+        return f"{self.title} ({self.course.title})"
+
+
 class Lesson(models.Model):
     """
     Lesson model representing a lesson within a course.
@@ -10,28 +38,54 @@ class Lesson(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lessons')
+    module = models.ForeignKey(Module, on_delete=models.SET_NULL, null=True, blank=True, related_name='lessons')
     video_file = models.FileField(upload_to='lessons/videos/', blank=True, null=True)
     video_url = models.URLField(blank=True, null=True)
     document = models.FileField(upload_to='lessons/documents/', blank=True, null=True)
     order = models.PositiveIntegerField(default=0)
+    # Stable position of this lesson in Enrollment.completed_lessons_bitmap.
+    # Assigned once on creation and never changed by reordering.
+    bit_index = models.PositiveIntegerField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order', 'created_at']
+        unique_together = ('course', 'bit_index')
+        indexes = [
+            # A course's lessons in display order
+            models.Index(fields=['course', 'order', 'created_at'], name='lessons_lesson_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.course.title})"
 
+    def save(self, *args, **kwargs):
+        if self.bit_index is not None:
+            return super().save(*args, **kwargs)
+        # Pick the slot and insert in one transaction, so two lessons added
+        # at once cannot take the same slot. SQLite's IMMEDIATE transactions
+        # hold the write lock throughout; other databases lock the course row.
+        with transaction.atomic():
+            list(Course.objects.select_for_update().filter(pk=self.course_id).values_list('pk', flat=True))
+            # Reuse the slot after the highest one in use; bits of deleted
+            # lessons are cleared from every enrollment on delete.
+            highest = Lesson.objects.filter(course_id=self.course_id).aggregate(
+                highest=models.Max('bit_index')
+            )['highest']
+            self.bit_index = 0 if highest is None else highest + 1
+            super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('lesson_detail', kwargs={'course_pk': self.course.pk, 'lesson_pk': self.pk})
 
     def get_video_source(self):
         """
         Return the video source URL, either from uploaded file or external URL.
+        Uploaded files go through the permission-checked streaming view.
         """
         if self.video_file:
-            return self.video_file.url
+            return reverse('lesson_video', kwargs={'course_pk': self.course_id, 'lesson_pk': self.pk})
         elif self.video_url:
             return self.video_url
         return None
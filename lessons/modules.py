@@ -0,0 +1,83 @@
+"""
+Stored counts for course modules.
+
+Each Module keeps lesson_count, completion_count (completions by every
+student of every lesson in it) and lesson_bitmap, the bit_index slots
+of its lessons. A course outline then needs one query for the modules
+plus the student's enrollment. A student's progress in a module is the
+popcount of Enrollment.completed_lessons_bitmap AND the module's
+lesson_bitmap.
+
+Lesson membership changes are rare, so they recount the affected
+modules (refresh_module_counts). Completions are frequent, so
+record_lesson_completions adds to completion_count with F() instead.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F
+from courses.models import LessonCompletion
+from courses.progress import bitmap_to_int, int_to_bitmap
+from .models import Lesson, Module
+
+
+# Modules recounted per round trip by rebuild_module_counts()
+MODULE_BATCH_SIZE = 500
+
+
+def refresh_module_counts(module_ids):
+    """Recount lessons and completions for the given modules."""
+    module_ids = {pk for pk in module_ids if pk is not None}
+    if not module_ids:
+        return
+    lesson_counts, bitmaps = Counter(), defaultdict(int)
+    for module_id, bit_index in Lesson.objects.filter(module_id__in=module_ids).values_list('module_id', 'bit_index'):
+        lesson_counts[module_id] += 1
+        if bit_index is not None:
+            bitmaps[module_id] |= 1 << bit_index
+    completions = dict(
+        LessonCompletion.objects.filter(lesson__module_id__in=module_ids)
+        .values('lesson__module_id').annotate(total=Count('pk')).values_list('lesson__module_id', 'total')
+    )
+    Module.objects.bulk_update(
+        [
+            Module(
+                pk=pk,
+                lesson_count=lesson_counts[pk],
+                completion_count=completions.get(pk, 0),
+                lesson_bitmap=int_to_bitmap(bitmaps[pk]),
+            )
+            for pk in module_ids
+        ],
+        ['lesson_count', 'completion_count', 'lesson_bitmap'],
+    )
+
+
+def adjust_module_completions(module_ids, sign=1):
+    """
+    Add (or with sign=-1, remove) one completion per entry in module_ids,
+    an iterable of the completed lessons' module_id.
+    """
+    counts = Counter(pk for pk in module_ids if pk is not None)
+    for module_id, count in counts.items():
+        Module.objects.filter(pk=module_id).update(completion_count=F('completion_count') + sign * count)
+
+
+def rebuild_module_counts(course_ids=None, batch_size=MODULE_BATCH_SIZE):
+    """Recount every module, or those of the given courses. Returns the number recounted."""
+    modules = Module.objects.order_by('pk')
+    if course_ids is not None:
+        modules = modules.filter(course_id__in=course_ids)
+    module_ids = list(modules.values_list('pk', flat=True))
+    for start in range(0, len(module_ids), batch_size):
+        refresh_module_counts(module_ids[start:start + batch_size])
+    return len(module_ids)
+
+
+def module_progress(enrollment, modules):
+    """Set completed_count and progress (0-100) on each module for one enrollment."""
+    bits = bitmap_to_int(enrollment.completed_lessons_bitmap)
+    for module in modules:
+        completed = (bits & bitmap_to_int(module.lesson_bitmap)).bit_count()
+        module.completed_count = completed
+        module.progress = round(completed * 100 / module.lesson_count) if module.lesson_count else 0
+    return modules
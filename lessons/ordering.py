@@ -0,0 +1,182 @@
+"""
+Sparse ordering keys for lessons.
+
+Lesson.order is a sort key, not a position. New keys are spaced
+ORDER_GAP apart, so moving a lesson only rewrites that one row: it gets
+the midpoint of its new neighbours' keys. Only when two neighbours have
+run out of room between them is the course renumbered. That takes one
+bulk_update, and the renormalize_lesson_order command does it ahead of
+time for courses whose gaps have grown small.
+
+Positions shown to users (lesson 1, 2, 3, ...) are computed from the
+key order; see lesson_position(). Module.order uses the same scheme
+within a course, through move_module().
+"""
+from bisect import bisect_left
+
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import Lag
+from .models import Lesson, Module
+
+
+ORDER_GAP = 1024
+
+# Largest value a PositiveIntegerField holds on every database backend
+MAX_ORDER_KEY = 2147483647
+
+# Courses with neighbouring keys closer than this are renumbered by
+# renormalize_lesson_order before moves start needing it
+MIN_ORDER_GAP = 8
+
+
+class ReorderError(Exception):
+    pass
+
+
+def _ordered(course_id, model=Lesson):
+    return list(
+        model.objects.filter(course_id=course_id).order_by('order', 'created_at', 'pk').only('pk', 'order')
+    )
+
+
+def lesson_position(lesson):
+    """Return the 1-based position of a lesson within its course."""
+    return Lesson.objects.filter(course_id=lesson.course_id).filter(
+        Q(order__lt=lesson.order)
+        | Q(order=lesson.order, created_at__lt=lesson.created_at)
+        | Q(order=lesson.order, created_at=lesson.created_at, pk__lt=lesson.pk)
+    ).count() + 1
+
+
+def next_order_key(course_id, model=Lesson):
+    """Return the key that places a new lesson (or module) after every existing one."""
+    last = model.objects.filter(course_id=course_id).order_by('-order').values_list('order', flat=True).first()
+    return ORDER_GAP if last is None else last + ORDER_GAP
+
+
+def _save_keys(lessons, keys):
+    changed = []
+    for lesson, key in zip(lessons, keys):
+        if lesson.order != key:
+            lesson.order = key
+            changed.append(lesson)
+    if changed:
+        type(changed[0]).objects.bulk_update(changed, ['order'])
+    return len(changed)
+
+
+def _spread_keys(count):
+    return [(index + 1) * ORDER_GAP for index in range(count)]
+
+
+def _fill_keys(lessons, fixed):
+    """
+    Return keys for lessons in their new order that keep the keys of the
+    positions in fixed and fit the others between them, or None if some
+    run of moved lessons has no room left.
+    """
+    keys = [None] * len(lessons)
+    previous_index, previous_key = -1, 0
+    for index in sorted(fixed) + [len(lessons)]:
+        if index < len(lessons):
+            upper = lessons[index].order
+        else:
+            upper = previous_key + (index - previous_index) * ORDER_GAP
+        count = index - previous_index - 1
+        step = (upper - previous_key) // (count + 1)
+        if step < 1 or upper > MAX_ORDER_KEY:
+            return None
+        for offset in range(count):
+            keys[previous_index + 1 + offset] = previous_key + step * (offset + 1)
+        if index < len(lessons):
+            keys[index] = upper
+        previous_index, previous_key = index, upper
+    return keys
+
+
+def _longest_increasing(keys):
+    """Return the indexes of a longest strictly increasing subsequence of keys."""
+    tails, tail_indexes, parents = [], [], [None] * len(keys)
+    for index, key in enumerate(keys):
+        slot = bisect_left(tails, key)
+        if slot:
+            parents[index] = tail_indexes[slot - 1]
+        if slot == len(tails):
+            tails.append(key)
+            tail_indexes.append(index)
+        else:
+            tails[slot], tail_indexes[slot] = key, index
+    result, index = [], tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        result.append(index)
+        index = parents[index]
+    return set(result)
+
+
+def _apply_order(lessons):
+    """
+    Give lessons, listed in their new order, increasing keys with as few
+    writes as possible. Returns (rows updated, renormalized).
+    """
+    # Lessons already in increasing key order keep their keys
+    keys = _fill_keys(lessons, _longest_increasing([lesson.order for lesson in lessons]))
+    if keys is None:
+        return _save_keys(lessons, _spread_keys(len(lessons))), True
+    return _save_keys(lessons, keys), False
+
+
+def reorder_lessons(course, lesson_ids):
+    """
+    Put a course's lessons in the order of lesson_ids, which must list
+    each of them exactly once. Returns (rows updated, renormalized).
+    """
+    with transaction.atomic():
+        lessons = {lesson.pk: lesson for lesson in _ordered(course.pk)}
+        if len(lesson_ids) != len(set(lesson_ids)) or set(lesson_ids) != set(lessons):
+            raise ReorderError('The new order must list every lesson of the course exactly once.')
+        return _apply_order([lessons[pk] for pk in lesson_ids])
+
+
+def move_lesson(lesson, position):
+    """
+    Move a lesson to a 1-based position in its course (clamped to the
+    valid range). Returns (rows updated, renormalized).
+    """
+    return _move(lesson, position, Lesson)
+
+
+def move_module(module, position):
+    """Move a module to a 1-based position in its course, like move_lesson()."""
+    return _move(module, position, Module)
+
+
+def _move(item, position, model):
+    with transaction.atomic():
+        items = _ordered(item.course_id, model)
+        moving = next((other for other in items if other.pk == item.pk), None)
+        if moving is None:
+            raise ReorderError(f'The {model._meta.verbose_name} does not belong to this course.')
+        items.remove(moving)
+        index = min(max(position, 1), len(items) + 1) - 1
+        items.insert(index, moving)
+        updated, renormalized = _apply_order(items)
+    item.order = moving.order
+    return updated, renormalized
+
+
+def renormalize_course(course_id):
+    """Respace a course's keys ORDER_GAP apart. Returns the rows updated."""
+    with transaction.atomic():
+        lessons = _ordered(course_id)
+        return _save_keys(lessons, _spread_keys(len(lessons)))
+
+
+def crowded_course_ids(min_gap=MIN_ORDER_GAP):
+    """Return ids of courses where two neighbouring lessons' keys are closer than min_gap."""
+    gaps = Lesson.objects.annotate(
+        previous_order=Window(
+            Lag('order'), partition_by=[F('course_id')], order_by=[F('order'), F('created_at'), F('pk')]
+        )
+    ).filter(previous_order__isnull=False, order__lt=F('previous_order') + min_gap)
+    return sorted({course_id for course_id in gaps.values_list('course_id', flat=True)})
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from courses.models import LessonCompletion
+from .models import Lesson
+from .modules import adjust_module_completions, refresh_module_counts
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_module(sender, instance, **kwargs):
+    """Record the stored module so post_save can recount both old and new."""
+    previous = None
+    if instance.pk:
+        previous = Lesson.objects.filter(pk=instance.pk).values_list('module_id', flat=True).first()
+    instance._module_previous = previous
+
+
+@receiver(post_save, sender=Lesson)
+def count_lesson_module_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_module_previous', None)
+    if created or previous != instance.module_id:
+        refresh_module_counts([previous, instance.module_id])
+
+
+@receiver(post_delete, sender=Lesson)
+def count_lesson_module_deleted(sender, instance, **kwargs):
+    # Completions of the lesson were deleted with it, so recount
+    refresh_module_counts([instance.module_id])
+
+
+@receiver(pre_delete, sender='courses.Enrollment')
+def uncount_enrollment_module_completions(sender, instance, **kwargs):
+    """Remove a deleted enrollment's completions from its course's modules."""
+    adjust_module_completions(
+        LessonCompletion.objects.filter(enrollment=instance, lesson__module__isnull=False)
+        .values_list('lesson__module_id', flat=True),
+        sign=-1,
+    )
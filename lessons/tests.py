@@ -1,8 +1,21 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.core.files.base import ContentFile
+from django.core.exceptions import ImproperlyConfigured
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from courses.models import Category, Course, Enrollment
-from lessons.models import Lesson
+from courses.progress import record_lesson_completions
+from lessons.models import Lesson, Module
+from lessons.ordering import ORDER_GAP, crowded_course_ids, lesson_position, move_lesson
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+import json
 
 User = get_user_model()
 
@@ -87,4 +100,381 @@ class LessonsTestCase(TestCase):
             'course_pk': self.course.pk,
             'lesson_pk': self.lesson.pk
         }))
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+
+class LessonVideoStreamingTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.student_user = User.objects.create_user(
+            username='videostudent', password='testpass123', role='student'
+        )
+        self.outsider = User.objects.create_user(
+            username='videooutsider', password='testpass123', role='student'
+        )
+        self.instructor_user = User.objects.create_user(
+            username='videoinstructor', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Video Course', description='d', instructor=self.instructor_user, published=True
+        )
+        self.lesson = Lesson.objects.create(title='Lecture', description='d', course=self.course, order=1)
+        self.data = os.urandom(1000)
+        self.lesson.video_file.save('lecture.mp4', ContentFile(self.data))
+        Enrollment.objects.create(student=self.student_user, course=self.course)
+        self.url = reverse('lesson_video', args=[self.course.pk, self.lesson.pk])
+        self.client.login(username='videostudent', password='testpass123')
+
+    def test_lesson_detail_uses_streaming_url(self):
+        self.assertEqual(self.lesson.get_video_source(), self.url)
+        response = self.client.get(self.lesson.get_absolute_url())
+        self.assertContains(response, f'src="{self.url}"')
+
+    def test_full_response(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'private')
+        self.assertTrue(response['ETag'])
+
+        response = self.client.head(self.url)
+        self.assertEqual(response['Content-Length'], '1000')
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/1000')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=900-')
+        self.assertEqual(b''.join(response.streaming_content), self.data[900:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(response['Content-Range'], 'bytes 990-999/1000')
+        self.assertEqual(b''.join(response.streaming_content), self.data[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1000')
+
+        # Several ranges, or an outdated If-Range, get the whole file
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_requests(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_permissions(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+        self.client.login(username='videooutsider', password='testpass123')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.client.login(username='videoinstructor', password='testpass123')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        other = Lesson.objects.create(title='No video', description='d', course=self.course, order=2)
+        response = self.client.get(reverse('lesson_video', args=[self.course.pk, other.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class LessonDocumentDownloadTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.student_user = User.objects.create_user(
+            username='docstudent', password='testpass123', role='student'
+        )
+        self.outsider = User.objects.create_user(
+            username='docoutsider', password='testpass123', role='student'
+        )
+        self.instructor_user = User.objects.create_user(
+            username='docinstructor', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Doc Course', description='d', instructor=self.instructor_user, published=True
+        )
+        self.lesson = Lesson.objects.create(title='Reading', description='d', course=self.course, order=1)
+        self.lesson.document.save('notes.pdf', ContentFile(b'%PDF-1.4 notes'))
+        Enrollment.objects.create(student=self.student_user, course=self.course)
+        self.url = reverse('lesson_document', args=[self.course.pk, self.lesson.pk])
+        self.client.login(username='docstudent', password='testpass123')
+
+    def test_streams_document_without_proxy(self):
+        response = self.client.get(self.lesson.get_absolute_url())
+        self.assertContains(response, f'href="{self.url}"')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 notes')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="notes.pdf"')
+
+    @override_settings(PROTECTED_MEDIA_SERVER='x-accel-redirect', PROTECTED_MEDIA_ACCEL_PREFIX='/protected/')
+    def test_offloads_to_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + self.lesson.document.name)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(PROTECTED_MEDIA_SERVER='x-sendfile')
+    def test_offloads_to_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.lesson.document.path)
+
+    @override_settings(PROTECTED_MEDIA_SERVER='lighttpd')
+    def test_unknown_server_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.client.get(self.url)
+
+    def test_permissions(self):
+        self.client.login(username='docoutsider', password='testpass123')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.client.login(username='docinstructor', password='testpass123')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class LessonReorderTestCase(TestCase):
+    def setUp(self):
+        self.instructor_user = User.objects.create_user(
+            username='orderinstructor', password='testpass123', role='instructor'
+        )
+        self.other_instructor = User.objects.create_user(
+            username='orderother', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Ordered', description='d', instructor=self.instructor_user, published=True
+        )
+        self.lessons = [
+            Lesson.objects.create(
+                title=f'L{i}', description='d', course=self.course, order=(i + 1) * ORDER_GAP
+            )
+            for i in range(6)
+        ]
+        self.url = reverse('reorder_course_lessons', args=[self.course.pk])
+        self.client.login(username='orderinstructor', password='testpass123')
+
+    def current_order(self):
+        return list(
+            Lesson.objects.filter(course=self.course).order_by('order', 'created_at', 'pk')
+            .values_list('pk', flat=True)
+        )
+
+    def post(self, payload):
+        return self.client.post(self.url, data=json.dumps(payload), content_type='application/json')
+
+    def count_updates(self, payload):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(payload)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sum(1 for query in queries if query['sql'].startswith('UPDATE "lessons_lesson"')), response.json()
+
+    def test_single_move_updates_one_row(self):
+        ids = [lesson.pk for lesson in self.lessons]
+        updates, data = self.count_updates({'lesson': ids[1], 'position': 6})
+        self.assertEqual((updates, data['updated'], data['renormalized']), (1, 1, False))
+        expected = ids[:1] + ids[2:] + ids[1:2]
+        self.assertEqual(data['lessons'], expected)
+        self.assertEqual(self.current_order(), expected)
+
+        updates, data = self.count_updates({'lesson': ids[1], 'position': 1})
+        self.assertEqual(data['updated'], 1)
+        self.assertEqual(self.current_order()[0], ids[1])
+
+    def test_full_sequence_only_rewrites_moved_lessons(self):
+        ids = [lesson.pk for lesson in self.lessons]
+        new_order = [ids[3], ids[0], ids[1], ids[2], ids[5], ids[4]]
+        updates, data = self.count_updates({'lessons': new_order})
+        self.assertEqual(updates, 1)
+        self.assertEqual(data['updated'], 2)
+        self.assertEqual(self.current_order(), new_order)
+
+        response = self.post({'lessons': new_order[:-1]})
+        self.assertEqual(response.status_code, 400)
+        response = self.post({'lessons': new_order + [new_order[0]]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_crowded_keys_are_renormalized(self):
+        ids = [lesson.pk for lesson in self.lessons]
+        Lesson.objects.filter(pk=ids[0]).update(order=1)
+        Lesson.objects.filter(pk=ids[1]).update(order=2)
+        self.assertEqual(crowded_course_ids(), [self.course.pk])
+
+        # No key fits between 1 and 2, so the whole course is renumbered at once
+        updates, data = self.count_updates({'lesson': ids[5], 'position': 2})
+        self.assertEqual((updates, data['renormalized']), (1, True))
+        self.assertEqual(self.current_order(), [ids[0], ids[5]] + ids[1:5])
+        self.assertEqual(
+            list(Lesson.objects.filter(course=self.course).order_by('order').values_list('order', flat=True)),
+            [(i + 1) * ORDER_GAP for i in range(6)],
+        )
+        self.assertEqual(crowded_course_ids(), [])
+
+    def test_renormalize_lesson_order_command(self):
+        Lesson.objects.filter(pk=self.lessons[0].pk).update(order=self.lessons[1].order - 1)
+        out = StringIO()
+        call_command('renormalize_lesson_order', stdout=out)
+        self.assertIn('Successfully renormalized 1 courses (1 lessons updated)', out.getvalue())
+
+    def test_lesson_form_positions(self):
+        response = self.client.post(reverse('create_lesson', args=[self.course.pk]), {
+            'title': 'Intro', 'description': 'd', 'video_url': 'https://example.com/v', 'position': 1,
+        })
+        self.assertEqual(response.status_code, 302)
+        intro = Lesson.objects.get(title='Intro')
+        self.assertEqual(self.current_order()[0], intro.pk)
+
+        response = self.client.get(reverse('lesson_detail', args=[self.course.pk, self.lessons[2].pk]))
+        self.assertContains(response, 'Lesson #4')
+
+        move_lesson(intro, 100)
+        self.assertEqual(lesson_position(intro), 7)
+
+    def test_permissions(self):
+        self.client.login(username='orderother', password='testpass123')
+        response = self.post({'lessons': [lesson.pk for lesson in self.lessons]})
+        self.assertEqual(response.status_code, 403)
+
+
+class CourseModuleTestCase(TestCase):
+    def setUp(self):
+        self.instructor_user = User.objects.create_user(
+            username='moduleinstructor', password='testpass123', role='instructor'
+        )
+        self.student_user = User.objects.create_user(
+            username='modulestudent', password='testpass123', role='student'
+        )
+        self.other_student = User.objects.create_user(
+            username='moduleother', password='testpass123', role='student'
+        )
+        self.course = Course.objects.create(
+            title='Sectioned', description='d', instructor=self.instructor_user, published=True
+        )
+        self.modules = [
+            Module.objects.create(course=self.course, title=f'Module {i}', order=(i + 1) * ORDER_GAP)
+            for i in range(2)
+        ]
+        self.lessons = [
+            Lesson.objects.create(
+                title=f'Lesson {i}', description='d', course=self.course,
+                module=self.modules[0] if i < 3 else self.modules[1] if i < 5 else None,
+                order=(i + 1) * ORDER_GAP,
+            )
+            for i in range(6)
+        ]
+        self.enrollment = Enrollment.objects.create(student=self.student_user, course=self.course)
+        self.other_enrollment = Enrollment.objects.create(student=self.other_student, course=self.course)
+
+    def counts(self):
+        return [
+            (module.lesson_count, module.completion_count)
+            for module in Module.objects.filter(course=self.course).order_by('order')
+        ]
+
+    def test_counts_follow_lessons_and_completions(self):
+        self.assertEqual(self.counts(), [(3, 0), (2, 0)])
+        self.assertEqual(Module.objects.get(pk=self.modules[0].pk).lesson_bitmap, b'\x07')
+
+        record_lesson_completions(self.enrollment, self.lessons[:4])
+        record_lesson_completions(self.other_enrollment, self.lessons[:1] + self.lessons[5:])
+        self.assertEqual(self.counts(), [(3, 4), (2, 1)])
+
+        # Moving a lesson carries its completions to the new module
+        self.lessons[0].module = self.modules[1]
+        self.lessons[0].save()
+        self.assertEqual(self.counts(), [(2, 2), (3, 3)])
+
+        self.lessons[3].delete()
+        self.assertEqual(self.counts(), [(2, 2), (2, 2)])
+
+        self.other_enrollment.delete()
+        self.assertEqual(self.counts(), [(2, 2), (2, 1)])
+
+        Module.objects.filter(pk=self.modules[0].pk).update(lesson_count=0, completion_count=0)
+        out = StringIO()
+        call_command('rebuild_module_counts', stdout=out)
+        self.assertIn('Successfully recounted 2 modules', out.getvalue())
+        self.assertEqual(self.counts(), [(2, 2), (2, 1)])
+
+    def test_deleting_module_keeps_lessons(self):
+        self.client.login(username='moduleinstructor', password='testpass123')
+        response = self.client.post(reverse('delete_module', args=[self.course.pk, self.modules[1].pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Lesson.objects.filter(course=self.course, module__isnull=True).count(), 3)
+
+    def test_course_lessons_renders_collapsed_sections(self):
+        record_lesson_completions(self.enrollment, self.lessons[:2] + self.lessons[5:])
+        self.client.login(username='modulestudent', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('course_lessons', args=[self.course.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('"lessons_lesson"' in query['sql'] for query in queries))
+        self.assertContains(response, 'Module 0')
+        self.assertContains(response, '2/3 completed')
+        self.assertContains(response, '0/2 completed')
+        # The one lesson outside any module forms its own section
+        self.assertContains(response, '1/1 completed')
+        self.assertNotContains(response, 'Lesson 0')
+        self.assertContains(response, reverse('course_module_lessons', args=[self.course.pk, self.modules[1].pk]))
+
+    def test_section_lessons_fragment(self):
+        self.client.login(username='modulestudent', password='testpass123')
+        response = self.client.get(reverse('course_module_lessons', args=[self.course.pk, self.modules[1].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Lesson 3')
+        self.assertContains(response, 'Lesson 4')
+        self.assertNotContains(response, 'Lesson 0')
+        self.assertNotContains(response, '<html')
+
+        response = self.client.get(reverse('course_other_lessons', args=[self.course.pk]))
+        self.assertContains(response, 'Lesson 5')
+        self.assertNotContains(response, 'Lesson 4')
+
+        self.enrollment.delete()
+        response = self.client.get(reverse('course_module_lessons', args=[self.course.pk, self.modules[1].pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_module_and_lesson_forms(self):
+        self.client.login(username='moduleinstructor', password='testpass123')
+        response = self.client.post(reverse('create_module', args=[self.course.pk]), {
+            'title': 'Welcome', 'description': '', 'position': 1,
+        })
+        self.assertEqual(response.status_code, 302)
+        welcome = Module.objects.get(title='Welcome')
+        self.assertEqual(
+            list(Module.objects.filter(course=self.course).order_by('order').values_list('pk', flat=True))[0],
+            welcome.pk,
+        )
+
+        other_course = Course.objects.create(title='Other', description='d', instructor=self.instructor_user)
+        foreign = Module.objects.create(course=other_course, title='Foreign')
+        data = {'title': 'New', 'description': 'd', 'video_url': 'https://example.com/v'}
+        response = self.client.post(reverse('create_lesson', args=[self.course.pk]), {**data, 'module': foreign.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('module', response.context['form'].errors)
+        response = self.client.post(reverse('create_lesson', args=[self.course.pk]), {**data, 'module': welcome.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Module.objects.get(pk=welcome.pk).lesson_count, 1)
+
+        response = self.client.get(reverse('lesson_list', args=[self.course.pk]), {'module': welcome.pk})
+        self.assertContains(response, 'New')
+        self.assertNotContains(response, 'Lesson 0')
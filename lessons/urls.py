@@ -4,7 +4,13 @@ from . import views
 urlpatterns = [
     path('course/<int:course_pk>/lessons/', views.lesson_list, name='lesson_list'),
     path('course/<int:course_pk>/lesson/<int:lesson_pk>/', views.lesson_detail, name='lesson_detail'),
+    path('course/<int:course_pk>/lesson/<int:lesson_pk>/video/', views.lesson_video, name='lesson_video'),
+    path('course/<int:course_pk>/lesson/<int:lesson_pk>/document/', views.lesson_document, name='lesson_document'),
+    path('course/<int:course_pk>/lessons/reorder/', views.reorder_course_lessons, name='reorder_course_lessons'),
     path('course/<int:course_pk>/lesson/create/', views.create_lesson, name='create_lesson'),
     path('course/<int:course_pk>/lesson/<int:lesson_pk>/edit/', views.edit_lesson, name='edit_lesson'),
     path('course/<int:course_pk>/lesson/<int:lesson_pk>/delete/', views.delete_lesson, name='delete_lesson'),
+    path('course/<int:course_pk>/module/create/', views.create_module, name='create_module'),
+    path('course/<int:course_pk>/module/<int:module_pk>/edit/', views.edit_module, name='edit_module'),
+    path('course/<int:course_pk>/module/<int:module_pk>/delete/', views.delete_module, name='delete_module'),
 ]
\ No newline at end of file
@@ -2,9 +2,29 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from .models import Lesson
-from .forms import LessonForm
-from courses.models import Course, Enrollment, LessonCompletion
+from django.http import Http404, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_POST, require_safe
+from online_learning_system.streaming import send_protected_file, serve_file
+from .models import Lesson, Module
+from .forms import LessonForm, ModuleForm
+from .ordering import ReorderError, lesson_position, move_lesson, move_module, next_order_key, reorder_lessons
+import json
+from courses.models import Course, Enrollment
+
+
+ENROLLMENT_REQUIRED = 'You must be enrolled in this course to view this lesson.'
+
+
+def _can_view_lesson(user, course):
+    """
+    Return whether user may view the lessons of course: students enrolled
+    in it, its instructor and employees.
+    """
+    if user.role == 'student':
+        return Enrollment.objects.filter(student=user, course=course).exists()
+    if user.role == 'instructor':
+        return course.instructor_id == user.pk
+    return user.role == 'employee'
 
 
 @login_required
@@ -22,7 +42,17 @@ def lesson_list(request, course_pk):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
-    lessons = Lesson.objects.filter(course=course).order_by('order', 'created_at')
+    modules = list(Module.objects.filter(course=course).order_by('order', 'created_at', 'pk'))
+    lessons = Lesson.objects.filter(course=course).select_related('module').order_by('order', 'created_at', 'pk')
+    
+    # Optionally show one module's lessons ("none" for lessons outside any module)
+    module_filter = request.GET.get('module', '')
+    if module_filter == 'none':
+        lessons = lessons.filter(module__isnull=True)
+    elif module_filter.isdigit():
+        lessons = lessons.filter(module_id=int(module_filter))
+    else:
+        module_filter = ''
     
     # Pagination
     paginator = Paginator(lessons, 10)  # Show 10 lessons per page
@@ -31,6 +61,8 @@ def lesson_list(request, course_pk):
     
     return render(request, 'lessons/lesson_list.html', {
         'course': course,
+        'modules': modules,
+        'module_filter': module_filter,
         'page_obj': page_obj
     })
 
@@ -43,19 +75,10 @@ def lesson_detail(request, course_pk, lesson_pk):
     course = get_object_or_404(Course, pk=course_pk)
     lesson = get_object_or_404(Lesson, pk=lesson_pk, course=course)
     
-    # Check access based on user role
-    if request.user.role == 'student':
-        # Students must be enrolled in the course
-        if not Enrollment.objects.filter(student=request.user, course=course).exists():
-            messages.error(request, 'You must be enrolled in this course to view this lesson.')
+    if not _can_view_lesson(request.user, course):
+        if request.user.role == 'student':
+            messages.error(request, ENROLLMENT_REQUIRED)
             return redirect('course_detail', pk=course.pk)
-    elif request.user.role == 'instructor':
-        # Instructors must be the course instructor
-        if course.instructor != request.user:
-            messages.error(request, 'Access denied.')
-            return redirect('home')
-    elif request.user.role != 'employee':
-        # Other roles are denied
         messages.error(request, 'Access denied.')
         return redirect('home')
     
@@ -64,17 +87,115 @@ def lesson_detail(request, course_pk, lesson_pk):
     if request.user.role == 'student':
         try:
             enrollment = Enrollment.objects.get(student=request.user, course=course)
-            completed_lessons = set(LessonCompletion.objects.filter(enrollment=enrollment).values_list('lesson_id', flat=True))
+            completed_lessons = enrollment.get_completed_lesson_ids([lesson])
         except Enrollment.DoesNotExist:
             pass
     
     return render(request, 'lessons/lesson_detail.html', {
         'course': course,
         'lesson': lesson,
+        'lesson_number': lesson_position(lesson),
         'completed_lessons': completed_lessons
     })
 
 
+@login_required
+@require_safe
+def lesson_video(request, course_pk, lesson_pk):
+    """
+    Stream a lesson's uploaded video to users who may view the lesson,
+    with Range and conditional GET support so players can seek.
+    """
+    lesson = get_object_or_404(Lesson.objects.select_related('course'), pk=lesson_pk, course_id=course_pk)
+    course = lesson.course
+    
+    if not _can_view_lesson(request.user, course):
+        return HttpResponseForbidden(ENROLLMENT_REQUIRED if request.user.role == 'student' else 'Access denied.')
+    
+    if not lesson.video_file:
+        raise Http404('This lesson has no uploaded video.')
+    try:
+        return serve_file(request, lesson.video_file.path)
+    except FileNotFoundError:
+        raise Http404('Video file not found.')
+
+
+@login_required
+@require_safe
+def lesson_document(request, course_pk, lesson_pk):
+    """
+    Download a lesson's document for users who may view the lesson.
+    """
+    lesson = get_object_or_404(Lesson.objects.select_related('course'), pk=lesson_pk, course_id=course_pk)
+    course = lesson.course
+    
+    if not _can_view_lesson(request.user, course):
+        return HttpResponseForbidden(ENROLLMENT_REQUIRED if request.user.role == 'student' else 'Access denied.')
+    
+    if not lesson.document:
+        raise Http404('This lesson has no document.')
+    try:
+        return send_protected_file(request, lesson.document)
+    except FileNotFoundError:
+        raise Http404('Document not found.')
+
+
+# Largest course the reorder endpoint accepts a full sequence for
+MAX_REORDER_LESSONS = 5000
+
+
+@login_required
+@require_POST
+def reorder_course_lessons(request, course_pk):
+    """
+    Reorder a course's lessons from a JSON body, either the full new
+    sequence {"lessons": [id, ...]} or a single move
+    {"lesson": id, "position": n} with a 1-based position.
+    """
+    course = get_object_or_404(Course, pk=course_pk)
+    
+    # Check if the user is the instructor of this course or an employee
+    if request.user.role == 'instructor' and course.instructor_id != request.user.pk:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    elif request.user.role not in ['instructor', 'employee']:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Request body must be JSON.'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Request body must be a JSON object.'}, status=400)
+    
+    try:
+        if 'lessons' in payload:
+            lesson_ids = payload['lessons']
+            if not isinstance(lesson_ids, list) or not all(isinstance(pk, int) for pk in lesson_ids):
+                return JsonResponse({'error': '"lessons" must be a list of lesson ids.'}, status=400)
+            if len(lesson_ids) > MAX_REORDER_LESSONS:
+                return JsonResponse(
+                    {'error': f'At most {MAX_REORDER_LESSONS} lessons can be reordered at once.'}, status=400
+                )
+            updated, renormalized = reorder_lessons(course, lesson_ids)
+        elif isinstance(payload.get('lesson'), int) and isinstance(payload.get('position'), int):
+            lesson = get_object_or_404(Lesson, pk=payload['lesson'], course=course)
+            updated, renormalized = move_lesson(lesson, payload['position'])
+        else:
+            return JsonResponse(
+                {'error': 'Send "lessons" with the new order, or "lesson" and "position".'}, status=400
+            )
+    except ReorderError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'updated': updated,
+        'renormalized': renormalized,
+        'lessons': list(
+            Lesson.objects.filter(course=course).order_by('order', 'created_at', 'pk').values_list('pk', flat=True)
+        ),
+    })
+
+
 @login_required
 def create_lesson(request, course_pk):
     """
@@ -91,15 +212,18 @@ def create_lesson(request, course_pk):
         return redirect('home')
     
     if request.method == 'POST':
-        form = LessonForm(request.POST, request.FILES)
+        form = LessonForm(request.POST, request.FILES, course=course)
         if form.is_valid():
             lesson = form.save(commit=False)
             lesson.course = course
+            lesson.order = next_order_key(course.pk)
             lesson.save()
+            if form.cleaned_data.get('position'):
+                move_lesson(lesson, form.cleaned_data['position'])
             messages.success(request, 'Lesson created successfully!')
             return redirect('lesson_list', course_pk=course.pk)
     else:
-        form = LessonForm()
+        form = LessonForm(course=course)
     
     return render(request, 'lessons/lesson_form.html', {
         'form': form,
@@ -125,13 +249,15 @@ def edit_lesson(request, course_pk, lesson_pk):
         return redirect('home')
     
     if request.method == 'POST':
-        form = LessonForm(request.POST, request.FILES, instance=lesson)
+        form = LessonForm(request.POST, request.FILES, instance=lesson, course=course)
         if form.is_valid():
             lesson = form.save()
+            if form.cleaned_data.get('position'):
+                move_lesson(lesson, form.cleaned_data['position'])
             messages.success(request, 'Lesson updated successfully!')
             return redirect('lesson_detail', course_pk=course.pk, lesson_pk=lesson.pk)
     else:
-        form = LessonForm(instance=lesson)
+        form = LessonForm(instance=lesson, initial={'position': lesson_position(lesson)}, course=course)
     
     return render(request, 'lessons/lesson_form.html', {
         'form': form,
@@ -165,4 +291,106 @@ def delete_lesson(request, course_pk, lesson_pk):
     return render(request, 'lessons/lesson_confirm_delete.html', {
         'course': course,
         'lesson': lesson
+    })
+
+
+@login_required
+def create_module(request, course_pk):
+    """
+    Allow instructors to add a module to their course.
+    """
+    course = get_object_or_404(Course, pk=course_pk)
+    
+    # Check if the user is the instructor of this course or an employee
+    if request.user.role == 'instructor' and course.instructor != request.user:
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+    elif request.user.role not in ['instructor', 'employee']:
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+    
+    if request.method == 'POST':
+        form = ModuleForm(request.POST)
+        if form.is_valid():
+            module = form.save(commit=False)
+            module.course = course
+            module.order = next_order_key(course.pk, Module)
+            module.save()
+            if form.cleaned_data.get('position'):
+                move_module(module, form.cleaned_data['position'])
+            messages.success(request, 'Module created successfully!')
+            return redirect('lesson_list', course_pk=course.pk)
+    else:
+        form = ModuleForm()
+    
+    return render(request, 'lessons/module_form.html', {
+        'form': form,
+        'course': course,
+        'title': 'Create Module'
+    })
+
+
+@login_required
+def edit_module(request, course_pk, module_pk):
+    """
+    Allow instructors to rename or move a module of their course.
+    """
+    course = get_object_or_404(Course, pk=course_pk)
+    module = get_object_or_404(Module, pk=module_pk, course=course)
+    
+    # Check if the user is the instructor of this course or an employee
+    if request.user.role == 'instructor' and course.instructor != request.user:
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+    elif request.user.role not in ['instructor', 'employee']:
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+    
+    if request.method == 'POST':
+        form = ModuleForm(request.POST, instance=module)
+        if form.is_valid():
+            module = form.save()
+            if form.cleaned_data.get('position'):
+                move_module(module, form.cleaned_data['position'])
+            messages.success(request, 'Module updated successfully!')
+            return redirect('lesson_list', course_pk=course.pk)
+    else:
+        module_ids = list(
+            Module.objects.filter(course=course).order_by('order', 'created_at', 'pk').values_list('pk', flat=True)
+        )
+        form = ModuleForm(instance=module, initial={'position': module_ids.index(module.pk) + 1})
+    
+    return render(request, 'lessons/module_form.html', {
+        'form': form,
+        'course': course,
+        'module': module,
+        'title': 'Edit Module'
+    })
+
+
+@login_required
+def delete_module(request, course_pk, module_pk):
+    """
+    Allow instructors to delete a module. Its lessons are kept and
+    no longer belong to any module.
+    """
+    course = get_object_or_404(Course, pk=course_pk)
+    module = get_object_or_404(Module, pk=module_pk, course=course)
+    
+    # Check if the user is the instructor of this course or an employee
+    if request.user.role == 'instructor' and course.instructor != request.user:
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+    elif request.user.role not in ['instructor', 'employee']:
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+    
+    if request.method == 'POST':
+        module.delete()
+        messages.success(request, 'Module deleted successfully!')
+        return redirect('lesson_list', course_pk=course.pk)
+    
+    return render(request, 'lessons/module_confirm_delete.html', {
+        'course': course,
+        'module': module
     })
\ No newline at end of file
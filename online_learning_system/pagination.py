@@ -0,0 +1,175 @@
+"""
+Keyset (cursor) pagination.
+
+Unlike django.core.paginator.Paginator, which runs COUNT(*) and an
+OFFSET scan that grows with the page number, CursorPaginator seeks
+directly to the row after the last one shown using the queryset's
+ordering columns. Pages are addressed by opaque cursor tokens instead of
+page numbers, and the total count is only computed when asked for.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """
+    A page of results from CursorPaginator.
+
+    Supports the parts of django.core.paginator.Page used by templates
+    (iteration, len, has_next, has_previous, has_other_pages) and exposes
+    next_cursor/previous_cursor tokens instead of page numbers.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset by seeking on its ordering columns.
+
+    The ordering defaults to the queryset's (or model's) ordering, and the
+    primary key is appended as a tie-breaker so every cursor is unique.
+    Ordering columns must not be nullable.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = int(per_page)
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+    @cached_property
+    def count(self):
+        """Exact number of rows; only evaluated when a template asks for it."""
+        return self.queryset.count()
+
+    def get_page(self, cursor=None):
+        """
+        Return the page identified by cursor, falling back to the first
+        page when the cursor is missing or invalid.
+        """
+        try:
+            position, backwards = self.decode_cursor(cursor) if cursor else (None, False)
+        except InvalidCursor:
+            position, backwards = None, False
+
+        queryset = self.queryset
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(position, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            if not rows:
+                return self.get_page()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        return CursorPage(
+            rows,
+            self,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0], backwards=True) if has_previous and rows else None,
+        )
+
+    def _seek_filter(self, position, backwards):
+        """
+        Build (a < x) OR (a = x AND b < y) ... for the ordering columns,
+        flipping the comparisons when paging backwards.
+        """
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, position):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def _get_value(self, obj, field):
+        for attr in field.split('__'):
+            obj = getattr(obj, attr)
+        return obj
+
+    def _get_model_field(self, name):
+        if name == 'pk':
+            return self.queryset.model._meta.pk
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def encode_cursor(self, obj, backwards=False):
+        values = [self._get_value(obj, field) for field, _ in self.ordering]
+        # isoformat() keeps microseconds, which DjangoJSONEncoder would truncate
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        payload = json.dumps({'v': values, 'b': backwards}, default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            raw_values = payload['v']
+            backwards = bool(payload.get('b'))
+        except (ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+
+        if not isinstance(raw_values, list) or len(raw_values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+
+        values = []
+        for (field, _), value in zip(self.ordering, raw_values):
+            model_field = self._get_model_field(field)
+            if model_field is not None:
+                try:
+                    value = model_field.to_python(value)
+                except (ValidationError, TypeError, ValueError):
+                    raise InvalidCursor(cursor)
+            # Ordering columns are not nullable, so None only comes from a forged cursor
+            if value is None:
+                raise InvalidCursor(cursor)
+            values.append(value)
+        return values, backwards
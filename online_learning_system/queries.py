@@ -0,0 +1,203 @@
+"""
+Recording the SQL a request runs, to find N+1 query patterns.
+
+QueryRecorder hooks connection.execute_wrapper and keeps every statement
+with its duration and call site: the innermost stack frame in this
+project's code, such as the model method or view line that caused it.
+
+Statements are grouped by shape, i.e. their SQL with literals and
+IN (...) lists collapsed. Many statements with one shape in a single
+request usually mean a query per row: a template calling a method that
+queries, or a loop missing select_related/prefetch_related.
+
+QueryInspectorMiddleware records each request during development. It
+logs repeated shapes and their call sites to the
+online_learning_system.queries logger and adds an X-Query-Count header.
+Tests use the same recorder through
+online_learning_system.testing.QueryBudgetClient.
+
+explain_query_plan() and full_scans() check the recorded statements
+against SQLite's query planner, so tests can assert that the hot
+filters are served by an index rather than a table scan.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+# A shape seen this many times in one request is reported as a likely N+1
+DEFAULT_REPEAT_THRESHOLD = 5
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(THIS_FILE))
+LIBRARY_DIRS = tuple(
+    os.path.abspath(path) for path in sys.path if 'site-packages' in path or 'dist-packages' in path
+)
+
+IN_LIST_RE = re.compile(r'\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)')
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+# Transaction bookkeeping is repeated by design and never an N+1
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT')
+
+# Statements explain_query_plan() asks SQLite to plan
+PLANNED_PREFIXES = ('SELECT', 'UPDATE', 'DELETE')
+
+# A plan step reading a whole table; "SCAN t USING INDEX i" walks an index
+# instead and subqueries, CTEs and virtual tables have no table name here
+FULL_SCAN_RE = re.compile(r'^SCAN (?P<table>\w+)(?: AS \w+)?$')
+
+
+def sql_shape(sql):
+    """Return sql with literals and IN lists collapsed, so per-row variants compare equal."""
+    shape = STRING_RE.sub('?', sql)
+    shape = NUMBER_RE.sub('?', shape)
+    return IN_LIST_RE.sub('(...)', shape)
+
+
+def _call_site():
+    # Walk frames directly; traceback.extract_stack would read source lines for every query
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PROJECT_ROOT) and filename != THIS_FILE and not filename.startswith(LIBRARY_DIRS):
+            return f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+@dataclass
+class RecordedQuery:
+    sql: str
+    params: tuple
+    shape: str
+    duration: float
+    call_site: str
+
+
+@dataclass
+class RepeatedQuery:
+    shape: str
+    count: int
+    call_sites: Counter = field(default_factory=Counter)
+
+
+class QueryRecorder:
+    """
+    Context manager collecting the statements run on every database
+    connection of the current thread.
+    """
+    def __init__(self):
+        self.queries = []
+
+    def __enter__(self):
+        self._wrappers = [connection.execute_wrapper(self) for connection in connections.all()]
+        for wrapper in self._wrappers:
+            wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for wrapper in reversed(self._wrappers):
+            wrapper.__exit__(*exc_info)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                RecordedQuery(sql, params, sql_shape(sql), time.perf_counter() - started, _call_site())
+            )
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=DEFAULT_REPEAT_THRESHOLD):
+        """Return the shapes run at least threshold times, most frequent first."""
+        groups = {}
+        for query in self.queries:
+            if query.shape.lstrip().upper().startswith(IGNORED_PREFIXES):
+                continue
+            group = groups.setdefault(query.shape, RepeatedQuery(query.shape, 0))
+            group.count += 1
+            group.call_sites[query.call_site] += 1
+        return sorted(
+            (group for group in groups.values() if group.count >= threshold),
+            key=lambda group: -group.count,
+        )
+
+
+def format_repeated(repeated):
+    """Return a readable description of repeated shapes and where they come from."""
+    lines = []
+    for group in repeated:
+        lines.append(f'{group.count}x {group.shape}')
+        lines.extend(f'    {count}x from {site}' for site, count in group.call_sites.most_common())
+    return '\n'.join(lines)
+
+
+def explain_query_plan(query, using='default'):
+    """
+    Return SQLite's EXPLAIN QUERY PLAN detail lines for a recorded
+    statement, or an empty list for statements that have no plan worth
+    checking (anything but SELECT, UPDATE and DELETE).
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not query.sql.lstrip().upper().startswith(PLANNED_PREFIXES):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + query.sql, query.params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan, tables):
+    """Return the tables among tables that plan reads row by row without an index."""
+    scanned = []
+    for detail in plan:
+        match = FULL_SCAN_RE.match(detail)
+        if match and match['table'] in tables:
+            scanned.append(match['table'])
+    return scanned
+
+
+class QueryInspectorMiddleware:
+    """
+    Development middleware logging likely N+1 patterns per request.
+
+    Enabled by QUERY_INSPECTOR_ENABLED, which defaults to DEBUG.
+    Queries run while a streaming response is consumed happen after the
+    middleware returns and are not counted.
+    """
+    def __init__(self, get_response):
+        enabled = getattr(settings, 'QUERY_INSPECTOR_ENABLED', None)
+        if not (settings.DEBUG if enabled is None else enabled):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_INSPECTOR_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        total = sum(query.duration for query in recorder.queries)
+        response['X-Query-Count'] = str(len(recorder))
+        repeated = recorder.repeated(self.threshold)
+        if repeated:
+            logger.warning(
+                '%s %s ran %d queries (%.1f ms) with repeated statements:\n%s',
+                request.method, request.path, len(recorder), total * 1000, format_repeated(repeated),
+            )
+        else:
+            logger.debug('%s %s ran %d queries (%.1f ms)', request.method, request.path, len(recorder), total * 1000)
+        return response
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'courses',   # Courses app
     'lessons',   # Lessons app
     'assignments',  # Assignments app
+    'uploads',   # Chunked uploads app
 ]
 
 # Custom user model
@@ -55,6 +56,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Logs N+1 query patterns; switches itself off unless enabled below
+    'online_learning_system.queries.QueryInspectorMiddleware',
 ]
 
 ROOT_URLCONF = 'online_learning_system.urls'
@@ -80,13 +83,56 @@ WSGI_APPLICATION = 'online_learning_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite is tuned for several worker processes writing at once:
+# - WAL lets readers carry on while one connection writes
+# - synchronous=NORMAL syncs the WAL at checkpoints only (durable across
+#   crashes of the process, not necessarily of the machine)
+# - mmap_size reads the first 256 MB of the file through memory mapping
+# - "timeout" is the busy timeout: seconds to wait for the write lock
+#   before failing with "database is locked"
+# - IMMEDIATE takes the write lock at BEGIN. A deferred transaction that
+#   reads and then writes fails at once when another writer got in first,
+#   without waiting out the busy timeout
+# Connections are kept for CONN_MAX_AGE seconds, so the pragmas run once per
+# connection instead of once per request. WAL needs the database on a
+# local filesystem. Compare with `manage.py benchmark_sqlite_writes`.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Course catalog search backend (dotted path). Leave unset to use SQLite FTS5
+# when available and fall back to icontains lookups on other databases.
+COURSE_SEARCH_BACKEND = None
+
+# Seconds to cache catalog facet counts per filter combination. Facets are
+# also invalidated when a matching course is published or edited.
+COURSE_FACETS_CACHE_TIMEOUT = 300
+
+# Seconds to cache an instructor's per-course analytics. Writes to their
+# courses, enrollments, reviews and submissions invalidate it sooner.
+INSTRUCTOR_ANALYTICS_CACHE_TIMEOUT = 300
+
+# Seconds to cache course gradebook statistics. The cache key already
+# changes whenever a submission is added, graded or removed.
+GRADEBOOK_STATS_CACHE_TIMEOUT = 3600
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +178,47 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploaded files are stored once per distinct content (SHA-256) and
+# hardlinked under their upload_to names; run gc_media_blobs periodically.
+STORAGES = {
+    "default": {
+        "BACKEND": "uploads.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
+# Lesson documents and submission files are downloaded through
+# permission-checked views. None streams them from Django (fine for
+# local runs); "x-accel-redirect" hands the transfer to nginx through an
+# internal location at PROTECTED_MEDIA_ACCEL_PREFIX aliased to
+# MEDIA_ROOT, and "x-sendfile" to Apache (mod_xsendfile) or lighttpd.
+PROTECTED_MEDIA_SERVER = None
+PROTECTED_MEDIA_ACCEL_PREFIX = "/protected-media/"
+
+# Chunked uploads are assembled here. Keep it on the same filesystem as
+# MEDIA_ROOT so finished files are renamed into place, not copied.
+CHUNKED_UPLOAD_TEMP_DIR = MEDIA_ROOT / "chunked_uploads"
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = 4 * 1024 * 1024 * 1024
+# Unfinished uploads idle for longer than this are purged
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24
+
+# Autograder worker: pool processes (None = one per CPU), the seconds
+# one submission may take before it is marked failed, and the bytes a
+# pool process may allocate beyond its starting size (None = no limit)
+AUTOGRADE_WORKERS = None
+AUTOGRADE_TASK_TIMEOUT = 5
+AUTOGRADE_MEMORY_LIMIT = 512 * 1024 * 1024
+
+# Query inspector middleware: None follows DEBUG. Statements with the
+# same shape run this many times in one request are logged, with their
+# call sites, to the online_learning_system.queries logger.
+QUERY_INSPECTOR_ENABLED = None
+QUERY_INSPECTOR_REPEAT_THRESHOLD = 5
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
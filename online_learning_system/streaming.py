@@ -0,0 +1,180 @@
+"""
+Serving files from disk with HTTP range and conditional request support.
+
+serve_file() answers GET and HEAD for one file:
+
+- ETag and Last-Modified come from the file's size and mtime, and
+  If-None-Match / If-Modified-Since (plus If-Match and
+  If-Unmodified-Since) are evaluated by Django's
+  get_conditional_response, so unchanged files cost a 304.
+- A single "Range: bytes=..." range gets a 206 with only those bytes,
+  unless an If-Range validator no longer matches. Players seek this
+  way without downloading the file again. Multi-range requests get the
+  whole file, which RFC 9110 allows.
+- Full responses use FileResponse, which hands the open file to the
+  server's wsgi.file_wrapper (sendfile(2) under gunicorn and uWSGI).
+  Ranges are streamed in STREAM_CHUNK_SIZE blocks. Either way memory
+  use per viewer stays flat.
+
+send_protected_file() is for downloads that have already passed a
+permission check. With PROTECTED_MEDIA_SERVER set, it returns an empty
+response carrying X-Accel-Redirect (nginx) or X-Sendfile (Apache,
+lighttpd), and the proxy sends the file without holding a Django
+worker. Otherwise it falls back to serve_file().
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+
+# Bytes read from disk per block when streaming a range
+STREAM_CHUNK_SIZE = 256 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Return the (start, end) byte positions, inclusive, asked for by a
+    Range header, or None to send the whole file (no header, several
+    ranges, or a header that cannot be parsed). Raises
+    RangeNotSatisfiable if the range lies beyond the end of the file.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if not length or not size:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        # Strong comparison: weak validators never match
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def iter_file_range(path, start, length, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield length bytes of the file at path starting at start."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(chunk_size, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def serve_file(request, path, content_type=None, filename=None, as_attachment=False):
+    """
+    Return a response for the file at path, honouring conditional and
+    Range headers. Raises FileNotFoundError if the file is missing.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, path, size, content_type, etag, last_modified)
+
+    if filename or as_attachment:
+        response['Content-Disposition'] = content_disposition_header(
+            as_attachment, filename or os.path.basename(path)
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    # Files behind permission checks must not be kept by shared caches
+    response['Cache-Control'] = 'private'
+    return response
+
+
+def _file_response(request, path, size, content_type, etag, last_modified):
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        if request.method == 'HEAD':
+            response = HttpResponse(status=206, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                iter_file_range(path, start, length), status=206, content_type=content_type
+            )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = str(size)
+        return response
+    return FileResponse(open(path, 'rb'), content_type=content_type)
+
+
+def send_protected_file(request, field_file, as_attachment=True):
+    """
+    Return a download response for a FieldFile the user may access,
+    offloaded to the front proxy when PROTECTED_MEDIA_SERVER is set.
+    Raises FileNotFoundError if the file is missing.
+    """
+    filename = os.path.basename(field_file.name)
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', None)
+    if not server:
+        return serve_file(request, field_file.path, filename=filename, as_attachment=as_attachment)
+
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = HttpResponse(content_type=content_type)
+    if server == 'x-accel-redirect':
+        prefix = getattr(settings, 'PROTECTED_MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + field_file.name)
+    elif server == 'x-sendfile':
+        response['X-Sendfile'] = field_file.path
+    else:
+        raise ImproperlyConfigured(
+            f'PROTECTED_MEDIA_SERVER must be None, "x-accel-redirect" or "x-sendfile", not "{server}".'
+        )
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['Cache-Control'] = 'private'
+    return response
@@ -0,0 +1,99 @@
+"""
+Query budgets for view tests.
+
+A budget is the most queries one request to a URL name may run. Tests
+using QueryBudgetTestCase get a client that records every request with
+QueryRecorder. It fails the test when a budgeted view goes over its
+budget, or when any view repeats a statement shape repeat_threshold
+times (an N+1 pattern, regardless of budget). Budgets come from the
+query_budgets class attribute, or from the @query_budget decorator on
+single test methods.
+
+    class CatalogTestCase(QueryBudgetTestCase):
+        query_budgets = {'course_list': 8}
+
+        @query_budget('course_detail', 6)
+        def test_detail(self):
+            self.client.get(reverse('course_detail', args=[course.pk]))
+"""
+from functools import wraps
+
+from django.test import Client, TestCase
+from django.urls import Resolver404
+from .queries import DEFAULT_REPEAT_THRESHOLD, QueryRecorder, format_repeated
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _url_name(response):
+    try:
+        return response.resolver_match.url_name
+    except Resolver404:
+        return None
+
+
+class QueryBudgetClient(Client):
+    """
+    Test client that checks each response against the budget for its
+    URL name. The queries are attached to the response as .queries.
+    """
+    def __init__(self, *args, budgets=None, repeat_threshold=DEFAULT_REPEAT_THRESHOLD, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.budgets = dict(budgets or {})
+        self.repeat_threshold = repeat_threshold
+
+    def request(self, **request):
+        with QueryRecorder() as recorder:
+            response = super().request(**request)
+            if response.streaming:
+                # Streamed bodies run their queries while being consumed
+                response.streaming_content = [b''.join(response.streaming_content)]
+        response.queries = recorder.queries
+        self.check(_url_name(response), request.get('PATH_INFO', ''), recorder)
+        return response
+
+    def check(self, url_name, path, recorder):
+        problems = []
+        budget = self.budgets.get(url_name)
+        if budget is not None and len(recorder) > budget:
+            problems.append(f'{len(recorder)} queries, over the budget of {budget}.')
+        repeated = recorder.repeated(self.repeat_threshold)
+        if repeated:
+            problems.append(f'Repeated statements (likely N+1):\n{format_repeated(repeated)}')
+        if problems:
+            listing = '\n'.join(
+                f'{index}. {query.sql}  [{query.call_site}]' for index, query in enumerate(recorder.queries, 1)
+            )
+            raise QueryBudgetExceeded(f'{path} ({url_name}): ' + '\n'.join(problems) + f'\nQueries:\n{listing}')
+
+
+class QueryBudgetTestCase(TestCase):
+    """TestCase whose client enforces query_budgets ({url name: max queries})."""
+    client_class = QueryBudgetClient
+    query_budgets = {}
+
+    @classmethod
+    def _pre_setup(cls):
+        super()._pre_setup()
+        cls.client.budgets.update(cls.query_budgets)
+
+
+def query_budget(url_name, max_queries):
+    """Give url_name a budget of max_queries for one QueryBudgetTestCase test method."""
+    def decorator(test_method):
+        @wraps(test_method)
+        def wrapper(self, *args, **kwargs):
+            budgets = self.client.budgets
+            previous = budgets.get(url_name)
+            budgets[url_name] = max_queries
+            try:
+                return test_method(self, *args, **kwargs)
+            finally:
+                if previous is None:
+                    budgets.pop(url_name, None)
+                else:
+                    budgets[url_name] = previous
+        return wrapper
+    return decorator
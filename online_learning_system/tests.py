@@ -0,0 +1,459 @@
+import json
+import logging
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from accounts import urls as accounts_urls
+from assignments import urls as assignments_urls
+from assignments.models import Assignment, Submission
+from courses import urls as courses_urls
+from courses.models import Category, Course, Enrollment, Review, Tag
+from courses.progress import record_lesson_completions
+from lessons import urls as lessons_urls
+from lessons.models import Lesson, Module
+from online_learning_system.queries import (
+    QueryInspectorMiddleware, QueryRecorder, explain_query_plan, full_scans, sql_shape,
+)
+from online_learning_system.testing import QueryBudgetExceeded, QueryBudgetTestCase, query_budget
+
+User = get_user_model()
+
+# Most queries one request to each view may run with the data below, with
+# cold caches. Raise a budget only together with the change that needs it.
+# Per-row queries are caught separately by the repeated-statement check.
+QUERY_BUDGETS = {
+    # accounts
+    'home': 9,
+    'login': 9,
+    'logout': 4,
+    'register': 0,
+    'student_dashboard': 6,
+    'instructor_dashboard': 3,
+    'employee_dashboard': 6,
+    'employee_stats_trend': 3,
+    'employee_user_management': 3,
+    'employee_user_detail': 4,
+    # courses
+    'course_list': 7,
+    'course_detail': 7,
+    'instructor_courses': 4,
+    'create_course': 4,
+    'edit_course': 7,
+    'delete_course': 4,
+    'enroll_in_course': 9,
+    'course_lessons': 6,
+    'course_module_lessons': 5,
+    'course_other_lessons': 4,
+    'mark_lesson_complete': 13,
+    'mark_lessons_complete_batch': 13,
+    'employee_enrollments': 3,
+    'submit_review': 9,
+    'approve_review': 7,
+    'delete_review': 5,
+    'review_list': 3,
+    # lessons
+    'lesson_list': 7,
+    'lesson_detail': 7,
+    'lesson_video': 4,
+    'lesson_document': 4,
+    'reorder_course_lessons': 9,
+    'create_lesson': 5,
+    'edit_lesson': 7,
+    'delete_lesson': 5,
+    'create_module': 4,
+    'edit_module': 6,
+    'delete_module': 5,
+    # assignments
+    'assignment_list': 8,
+    'assignment_detail': 5,
+    'create_assignment': 5,
+    'edit_assignment': 6,
+    'delete_assignment': 6,
+    'submit_assignment': 7,
+    'grade_submission': 8,
+    'submission_detail': 12,
+    'submission_file': 3,
+    'assignment_submissions': 7,
+    'bulk_grade_submissions': 7,
+    'import_grades': 3,
+    'course_gradebook': 9,
+    'course_gradebook_stats': 6,
+    'export_gradebook': 6,
+}
+
+# Whole-table reads the views make on purpose: unfiltered listings and
+# totals. Any other table scan in a view's query plan fails the tests.
+ALLOWED_SCANS = {
+    ('home', 'courses_category'),  # every category with its course count
+    ('employee_dashboard', 'accounts_dailystats'),  # all-time totals
+    ('employee_dashboard', 'courses_course'),  # newest courses of all
+    ('employee_dashboard', 'courses_enrollment'),  # newest enrollments of all
+    ('employee_user_management', 'accounts_user'),  # every user, when no role is picked
+    ('review_list', 'courses_review'),  # every review, for moderation
+}
+
+# Indexes for hot filters and the views whose plans must use them
+EXPECTED_INDEXES = {
+    'accounts_user_role_idx': {'home', 'employee_user_management'},
+    'courses_course_published_idx': {'home', 'course_list'},
+    'courses_enroll_completed_idx': {'student_dashboard'},
+    'courses_review_approved_idx': {'course_detail'},
+    'lessons_lesson_order_idx': {'lesson_list', 'course_lessons', 'course_other_lessons'},
+    'assignments_sub_score_idx': {'assignment_list', 'course_gradebook'},
+}
+
+URL_MODULES = [accounts_urls, courses_urls, lessons_urls, assignments_urls]
+
+
+class ViewRequestsMixin:
+    """
+    Data and requests exercising every view of the accounts, courses,
+    lessons and assignments apps, shared by the query budget and query
+    plan tests. Each case is (url name, username, method, url, data).
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        cache.clear()
+
+        self.student = User.objects.create_user('budgetstudent', password='testpass123', role='student')
+        self.instructor = User.objects.create_user('budgetinstructor', password='testpass123', role='instructor')
+        self.employee = User.objects.create_user('budgetemployee', password='testpass123', role='employee')
+        other_instructor = User.objects.create_user('budgetother', password='testpass123', role='instructor')
+        classmates = [
+            User.objects.create_user(f'budgetclassmate{i}', password='testpass123', role='student')
+            for i in range(8)
+        ]
+
+        categories = [Category.objects.create(name=f'Category {i}', description='d') for i in range(3)]
+        tags = [Tag.objects.create(name=f'tag-{i}') for i in range(4)]
+        self.courses = []
+        for i in range(8):
+            course = Course.objects.create(
+                title=f'Course {i}', description='A course about things', price=10 + i,
+                instructor=self.instructor if i < 7 else other_instructor,
+                category=categories[i % 3], published=True,
+            )
+            course.tags.set(tags[:1 + i % 4])
+            self.courses.append(course)
+        self.course = self.courses[0]
+
+        self.modules = [
+            Module.objects.create(course=self.course, title=f'Module {i}', order=(i + 1) * 1024) for i in range(2)
+        ]
+        self.lessons = [
+            Lesson.objects.create(
+                title=f'Lesson {i}', description='d', course=self.course, order=(i + 1) * 1024,
+                module=self.modules[i // 5] if i < 10 else None, video_url='https://example.com/v',
+            )
+            for i in range(12)
+        ]
+        self.lessons[0].video_file.save('intro.mp4', ContentFile(b'0123456789' * 100))
+        self.lessons[0].document.save('notes.pdf', ContentFile(b'%PDF-1.4 notes'))
+        self.flat_lessons = [
+            Lesson.objects.create(title=f'Flat {i}', description='d', course=self.courses[1], order=(i + 1) * 1024)
+            for i in range(6)
+        ]
+
+        # The student takes every course but the last; classmates take the first
+        self.enrollments = [Enrollment.objects.create(student=self.student, course=course) for course in self.courses[:7]]
+        for index, classmate in enumerate(classmates):
+            enrollment = Enrollment.objects.create(student=classmate, course=self.course)
+            record_lesson_completions(enrollment, self.lessons[:index + 1])
+            Review.objects.create(
+                course=self.course, student=classmate, rating=1 + index % 5,
+                review_text='A thorough and useful course.', approved=index % 4 != 0,
+            )
+        record_lesson_completions(self.enrollments[0], self.lessons[:3])
+        self.review = Review.objects.get(student=classmates[0])
+
+        due = timezone.now() + timedelta(days=7)
+        self.assignments = [
+            Assignment.objects.create(title=f'Essay {i}', description='d', lesson=self.lessons[0], due_date=due)
+            for i in range(6)
+        ]
+        for index, classmate in enumerate(classmates):
+            Submission.objects.create(
+                assignment=self.assignments[0], student=classmate,
+                text=f'My essay argues that caching and indexing both matter, part {index % 3}.',
+                score=70 + index if index % 2 else None,
+            )
+        self.submission = Submission.objects.create(
+            assignment=self.assignments[0], student=self.student,
+            text='My essay argues that caching and indexing both matter, part 0.',
+        )
+        self.submission.file.save('essay.txt', ContentFile(b'essay'))
+
+    def request(self, username, method, url, data=None, **extra):
+        self.client.logout()
+        if username:
+            self.client.force_login(User.objects.get(username=username))
+        if method == 'post_json':
+            return self.client.post(url, data=json.dumps(data), content_type='application/json', **extra)
+        return getattr(self.client, method)(url, data, **extra)
+
+    def run_cases(self, cases):
+        responses = []
+        for name, username, method, url, data in cases:
+            with self.subTest(view=name, method=method, user=username):
+                response = self.request(username, method, url, data)
+                self.assertLess(response.status_code, 400, f'{method.upper()} {url} returned {response.status_code}')
+                self.assertEqual(response.resolver_match.url_name, name)
+                responses.append(response)
+        return responses
+
+    def accounts_cases(self):
+        return [
+            ('home', None, 'get', reverse('home'), None),
+            ('home', 'budgetstudent', 'get', reverse('home'), None),
+            ('login', None, 'get', reverse('login'), None),
+            ('login', None, 'post', reverse('login'), {'username': 'budgetstudent', 'password': 'testpass123'}),
+            ('register', None, 'get', reverse('register'), None),
+            ('student_dashboard', 'budgetstudent', 'get', '/student/dashboard/', None),
+            ('instructor_dashboard', 'budgetinstructor', 'get', reverse('instructor_dashboard'), None),
+            ('employee_dashboard', 'budgetemployee', 'get', reverse('employee_dashboard'), None),
+            ('employee_stats_trend', 'budgetemployee', 'get', reverse('employee_stats_trend'), None),
+            ('employee_user_management', 'budgetemployee', 'get', reverse('employee_user_management'), None),
+            ('employee_user_management', 'budgetemployee', 'get', reverse('employee_user_management'),
+             {'role': 'instructor'}),
+            ('employee_user_detail', 'budgetemployee', 'get',
+             reverse('employee_user_detail', args=[self.student.pk]), None),
+            ('employee_user_detail', 'budgetemployee', 'get',
+             reverse('employee_user_detail', args=[self.instructor.pk]), None),
+            ('logout', 'budgetstudent', 'get', reverse('logout'), None),
+        ]
+
+    def courses_cases(self):
+        course, lesson = self.course, self.lessons[5]
+        return [
+            ('course_list', None, 'get', reverse('course_list'), None),
+            ('course_list', 'budgetstudent', 'get', reverse('course_list'), {'q': 'course', 'tag': self.courses[3].tags.first().pk}),
+            ('course_detail', 'budgetstudent', 'get', reverse('course_detail', args=[course.pk]), None),
+            ('course_detail', None, 'get', reverse('course_detail', args=[course.pk]), None),
+            ('instructor_courses', 'budgetinstructor', 'get', reverse('instructor_courses'), None),
+            ('create_course', 'budgetinstructor', 'get', reverse('create_course'), None),
+            ('edit_course', 'budgetinstructor', 'get', reverse('edit_course', args=[course.pk]), None),
+            ('delete_course', 'budgetinstructor', 'get', reverse('delete_course', args=[course.pk]), None),
+            ('student_dashboard', 'budgetstudent', 'get', '/courses/student/dashboard/', None),
+            ('course_lessons', 'budgetstudent', 'get', reverse('course_lessons', args=[course.pk]), None),
+            ('course_lessons', 'budgetstudent', 'get', reverse('course_lessons', args=[self.courses[1].pk]), None),
+            ('course_module_lessons', 'budgetstudent', 'get',
+             reverse('course_module_lessons', args=[course.pk, self.modules[0].pk]), None),
+            ('course_other_lessons', 'budgetstudent', 'get', reverse('course_other_lessons', args=[course.pk]), None),
+            ('mark_lesson_complete', 'budgetstudent', 'post',
+             reverse('mark_lesson_complete', args=[course.pk, lesson.pk]), None),
+            ('mark_lessons_complete_batch', 'budgetstudent', 'post_json',
+             reverse('mark_lessons_complete_batch', args=[course.pk]),
+             {'lesson_ids': [lesson.pk for lesson in self.lessons[6:]]}),
+            ('employee_enrollments', 'budgetemployee', 'get', reverse('employee_enrollments'), None),
+            ('submit_review', 'budgetstudent', 'get', reverse('submit_review', args=[course.pk]), None),
+            ('submit_review', 'budgetstudent', 'post', reverse('submit_review', args=[course.pk]),
+             {'rating': '5', 'review_text': 'Clear explanations throughout.'}),
+            ('review_list', 'budgetemployee', 'get', reverse('review_list'), None),
+            ('approve_review', 'budgetemployee', 'get', reverse('approve_review', args=[self.review.pk]), None),
+            ('approve_review', 'budgetemployee', 'post', reverse('approve_review', args=[self.review.pk]), None),
+            ('delete_review', 'budgetemployee', 'get', reverse('delete_review', args=[self.review.pk]), None),
+            ('enroll_in_course', 'budgetstudent', 'post', reverse('enroll_in_course', args=[self.courses[7].pk]), None),
+        ]
+
+    def lessons_cases(self):
+        course, lesson, module = self.course, self.lessons[0], self.modules[1]
+        return [
+            ('lesson_list', 'budgetinstructor', 'get', reverse('lesson_list', args=[course.pk]), None),
+            ('lesson_list', 'budgetemployee', 'get', reverse('lesson_list', args=[course.pk]), {'module': module.pk}),
+            ('lesson_detail', 'budgetstudent', 'get', reverse('lesson_detail', args=[course.pk, lesson.pk]), None),
+            ('lesson_detail', 'budgetinstructor', 'get', reverse('lesson_detail', args=[course.pk, lesson.pk]), None),
+            ('lesson_video', 'budgetstudent', 'get', reverse('lesson_video', args=[course.pk, lesson.pk]), None),
+            ('lesson_document', 'budgetstudent', 'get', reverse('lesson_document', args=[course.pk, lesson.pk]), None),
+            ('reorder_course_lessons', 'budgetinstructor', 'post_json',
+             reverse('reorder_course_lessons', args=[course.pk]), {'lesson': self.lessons[1].pk, 'position': 12}),
+            ('reorder_course_lessons', 'budgetinstructor', 'post_json',
+             reverse('reorder_course_lessons', args=[course.pk]), {'lessons': [l.pk for l in reversed(self.lessons)]}),
+            ('create_lesson', 'budgetinstructor', 'get', reverse('create_lesson', args=[course.pk]), None),
+            ('edit_lesson', 'budgetinstructor', 'get', reverse('edit_lesson', args=[course.pk, lesson.pk]), None),
+            ('delete_lesson', 'budgetinstructor', 'get', reverse('delete_lesson', args=[course.pk, lesson.pk]), None),
+            ('create_module', 'budgetinstructor', 'get', reverse('create_module', args=[course.pk]), None),
+            ('edit_module', 'budgetinstructor', 'get', reverse('edit_module', args=[course.pk, module.pk]), None),
+            ('delete_module', 'budgetinstructor', 'get', reverse('delete_module', args=[course.pk, module.pk]), None),
+        ]
+
+    def assignments_cases(self):
+        assignment, submission = self.assignments[0], self.submission
+        return [
+            ('assignment_list', 'budgetstudent', 'get', reverse('assignment_list'), {'lesson': self.lessons[0].pk}),
+            ('assignment_list', 'budgetinstructor', 'get', reverse('assignment_list'), {'lesson': self.lessons[0].pk}),
+            ('assignment_detail', 'budgetstudent', 'get', reverse('assignment_detail', args=[assignment.pk]), None),
+            ('assignment_detail', 'budgetinstructor', 'get', reverse('assignment_detail', args=[assignment.pk]), None),
+            ('create_assignment', 'budgetinstructor', 'get',
+             reverse('create_assignment', args=[self.lessons[0].pk]), None),
+            ('edit_assignment', 'budgetinstructor', 'get', reverse('edit_assignment', args=[assignment.pk]), None),
+            ('delete_assignment', 'budgetinstructor', 'get', reverse('delete_assignment', args=[assignment.pk]), None),
+            ('submit_assignment', 'budgetstudent', 'get',
+             reverse('submit_assignment', args=[self.assignments[1].pk]), None),
+            ('grade_submission', 'budgetinstructor', 'get', reverse('grade_submission', args=[submission.pk]), None),
+            ('submission_detail', 'budgetinstructor', 'get', reverse('submission_detail', args=[submission.pk]), None),
+            ('submission_detail', 'budgetemployee', 'get', reverse('submission_detail', args=[submission.pk]), None),
+            ('submission_detail', 'budgetstudent', 'get', reverse('submission_detail', args=[submission.pk]), None),
+            ('submission_file', 'budgetstudent', 'get', reverse('submission_file', args=[submission.pk]), None),
+            ('assignment_submissions', 'budgetinstructor', 'get',
+             reverse('assignment_submissions', args=[assignment.pk]), None),
+            ('bulk_grade_submissions', 'budgetinstructor', 'post_json',
+             reverse('bulk_grade_submissions', args=[assignment.pk]),
+             {'grades': [{'student': f'budgetclassmate{i}', 'score': 80} for i in range(8)]}),
+            ('import_grades', 'budgetinstructor', 'get', reverse('import_grades', args=[assignment.pk]), None),
+            ('course_gradebook', 'budgetinstructor', 'get', reverse('course_gradebook', args=[self.course.pk]), None),
+            ('course_gradebook_stats', 'budgetinstructor', 'get',
+             reverse('course_gradebook_stats', args=[self.course.pk]), None),
+            ('export_gradebook', 'budgetinstructor', 'get', reverse('export_gradebook', args=[self.course.pk]), None),
+            ('export_gradebook', 'budgetemployee', 'get', reverse('export_gradebook', args=[self.course.pk]),
+             {'format': 'jsonl'}),
+        ]
+
+
+class QueryBudgetViewsTestCase(ViewRequestsMixin, QueryBudgetTestCase):
+    """Request every view of the accounts, courses, lessons and assignments apps within its budget."""
+    query_budgets = QUERY_BUDGETS
+
+    def test_accounts_views(self):
+        self.run_cases(self.accounts_cases())
+
+    def test_courses_views(self):
+        self.run_cases(self.courses_cases())
+
+    def test_lessons_views(self):
+        self.run_cases(self.lessons_cases())
+
+    def test_assignments_views(self):
+        self.run_cases(self.assignments_cases())
+
+    def test_every_view_has_a_budget(self):
+        names = {
+            pattern.name for module in URL_MODULES for pattern in module.urlpatterns
+            if isinstance(pattern, URLPattern)
+        }
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+        self.assertEqual(set(QUERY_BUDGETS) - names, set())
+
+
+class QueryPlanTestCase(ViewRequestsMixin, QueryBudgetTestCase):
+    """
+    Run EXPLAIN QUERY PLAN on every statement the views issue, so a model
+    or query change that turns an indexed lookup into a table scan fails.
+    """
+    def plans(self):
+        """Return (url name, sql, plan) for every planned statement of every case."""
+        plans = []
+        cases = self.accounts_cases() + self.courses_cases() + self.lessons_cases() + self.assignments_cases()
+        for response in self.run_cases(cases):
+            for query in response.queries:
+                plan = explain_query_plan(query)
+                if plan:
+                    plans.append((response.resolver_match.url_name, query.sql, plan))
+        return plans
+
+    def test_views_do_not_scan_tables(self):
+        tables = set(connection.introspection.table_names())
+        unexpected = [
+            f'{name} scans {table}:\n    {sql}\n    ' + '\n    '.join(plan)
+            for name, sql, plan in self.plans()
+            for table in full_scans(plan, tables)
+            if (name, table) not in ALLOWED_SCANS
+        ]
+        self.assertEqual(unexpected, [], '\n'.join(unexpected))
+
+    def test_hot_filters_use_their_indexes(self):
+        used = {}
+        for name, sql, plan in self.plans():
+            for detail in plan:
+                for index in EXPECTED_INDEXES:
+                    if f'INDEX {index} ' in f'{detail} ':
+                        used.setdefault(index, set()).add(name)
+        for index, names in EXPECTED_INDEXES.items():
+            with self.subTest(index=index):
+                self.assertEqual(names - used.get(index, set()), set(), f'{index} is not used by these views')
+
+    def test_full_scans(self):
+        plan = [
+            'SCAN courses_course',
+            'SCAN courses_enrollment USING COVERING INDEX courses_enrollment_student_id',
+            'SEARCH accounts_user USING INTEGER PRIMARY KEY (rowid=?)',
+            'SCAN subquery',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        tables = {'courses_course', 'courses_enrollment', 'accounts_user'}
+        self.assertEqual(full_scans(plan, tables), ['courses_course'])
+
+
+class QueryInspectorTestCase(QueryBudgetTestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(f'inspected{i}', password='testpass123') for i in range(6)]
+
+    def per_row_view(self, request):
+        names = []
+        for user in self.users:
+            names.append(User.objects.get(pk=user.pk).username)
+        return HttpResponse(', '.join(names))
+
+    def test_sql_shape(self):
+        self.assertEqual(
+            sql_shape("SELECT * FROM t WHERE a = 5 AND b IN (%s, %s, %s) AND c = 'x' LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ? LIMIT ?',
+        )
+
+    def test_recorder_reports_call_site_of_repeats(self):
+        with QueryRecorder() as recorder:
+            self.per_row_view(None)
+        repeated = recorder.repeated(threshold=5)
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0].count, 6)
+        site, count = repeated[0].call_sites.most_common(1)[0]
+        self.assertIn('online_learning_system/tests.py', site)
+        self.assertIn('per_row_view', site)
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True)
+    def test_middleware_logs_repeated_statements(self):
+        middleware = QueryInspectorMiddleware(self.per_row_view)
+        with self.assertLogs('online_learning_system.queries', logging.WARNING) as logs:
+            response = middleware(RequestFactory().get('/people/'))
+        self.assertEqual(response['X-Query-Count'], '6')
+        self.assertIn('GET /people/ ran 6 queries', logs.output[0])
+        self.assertIn('per_row_view', logs.output[0])
+
+    @query_budget('home', 1)
+    def test_budget_decorator_fails_requests_over_budget(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            self.client.get(reverse('home'))
+        self.assertIn('over the budget of 1', str(raised.exception))
+
+
+class SQLiteSettingsTestCase(TestCase):
+    def test_connection_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_file_databases_use_wal(self):
+        # The test database lives in memory, where journal_mode is always "memory"
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        default = connections['default']
+        wrapper = default.__class__({**default.settings_dict, 'NAME': f'{directory}/wal.sqlite3'}, 'wal')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
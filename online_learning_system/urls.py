@@ -25,6 +25,7 @@ urlpatterns = [
     path('courses/', include('courses.urls')),
     path('lessons/', include('lessons.urls')),
     path('assignments/', include('assignments.urls')),
+    path('uploads/', include('uploads.urls')),
 ]
 
 # Serve media files during development
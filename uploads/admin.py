@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import ChunkedUpload
+
+
+@admin.register(ChunkedUpload)
+class ChunkedUploadAdmin(admin.ModelAdmin):
+    """
+    Read-only admin for chunked upload sessions.
+    """
+    list_display = ('filename', 'user', 'target', 'object_id', 'size', 'status', 'created_at')
+    list_filter = ('target', 'status', 'created_at')
+    search_fields = ('filename', 'user__username', 'sha256')
+    readonly_fields = ('id', 'user', 'target', 'object_id', 'filename', 'size', 'chunk_size',
+                       'status', 'sha256', 'created_at', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,207 @@
+"""
+Chunked, resumable uploads.
+
+The protocol has three steps:
+
+1. start_upload() records the file name, size and target and creates a
+   sparse temp file of the final size under CHUNKED_UPLOAD_TEMP_DIR.
+2. write_chunk() streams chunk N from the request straight to its offset
+   in that file, hashing it on the way. Chunks may arrive in any order
+   and be re-sent; the list of received chunks lets a client resume
+   after a dropped connection.
+3. finish_upload() checks every chunk arrived and moves the temp file
+   into the target field's storage. The temp dir lives under
+   MEDIA_ROOT, so the move is a rename rather than a second copy.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from assignments.models import Assignment, Submission
+from courses.models import Enrollment
+from lessons.models import Lesson
+from .models import ChunkedUpload, UploadChunk
+
+
+# Bytes read from the request or temp file per loop iteration
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised when an upload request cannot be honoured."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class TemporaryFile(File):
+    """
+    File on local disk that storages may move into place instead of
+    copying (FileSystemStorage checks for temporary_file_path()).
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _check_lesson_video(user, lesson_id):
+    lesson = Lesson.objects.select_related('course').filter(pk=lesson_id).first()
+    if lesson is None:
+        raise UploadError('Lesson not found.', status=404)
+    if user.role == 'instructor' and lesson.course.instructor_id != user.pk:
+        raise UploadError('Access denied.', status=403)
+    elif user.role not in ['instructor', 'employee']:
+        raise UploadError('Access denied.', status=403)
+    return lesson
+
+
+def _check_submission_file(user, assignment_id):
+    assignment = Assignment.objects.select_related('lesson').filter(pk=assignment_id).first()
+    if assignment is None:
+        raise UploadError('Assignment not found.', status=404)
+    if user.role != 'student':
+        raise UploadError('Only students can submit assignments.', status=403)
+    if not Enrollment.objects.filter(student=user, course_id=assignment.lesson.course_id).exists():
+        raise UploadError('You are not enrolled in this course.', status=403)
+    if assignment.is_overdue():
+        raise UploadError('This assignment is overdue and cannot be submitted.')
+    if Submission.objects.filter(assignment=assignment, student=user).exists():
+        raise UploadError('You have already submitted this assignment.')
+    return assignment
+
+
+# Permission check per target; each returns the object the file is for
+TARGET_CHECKS = {
+    'lesson_video': _check_lesson_video,
+    'submission_file': _check_submission_file,
+}
+
+
+def start_upload(user, target, object_id, filename, size, chunk_size=None):
+    """Validate a new upload and create its session and temp file."""
+    if target not in TARGET_CHECKS:
+        raise UploadError(f'Unknown upload target "{target}".')
+    TARGET_CHECKS[target](user, object_id)
+
+    filename = os.path.basename(str(filename or '')).strip()
+    if not filename:
+        raise UploadError('A file name is required.')
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError('Size must be a positive number of bytes.')
+    if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError(f'Files may be at most {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes.')
+    chunk_size = chunk_size or settings.CHUNKED_UPLOAD_CHUNK_SIZE
+    if not isinstance(chunk_size, int) or not COPY_BLOCK_SIZE <= chunk_size <= settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(
+            f'Chunk size must be between {COPY_BLOCK_SIZE} and {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes.'
+        )
+
+    upload = ChunkedUpload.objects.create(
+        user=user, target=target, object_id=object_id,
+        filename=filename, size=size, chunk_size=chunk_size,
+    )
+    os.makedirs(settings.CHUNKED_UPLOAD_TEMP_DIR, exist_ok=True)
+    with open(upload.temp_path, 'wb') as temp:
+        # Sparse on most filesystems; chunks fill it in at their offsets
+        temp.truncate(size)
+    return upload
+
+
+def write_chunk(upload, index, stream, expected_sha256=None):
+    """
+    Copy chunk index from stream (e.g. the request) into the temp file and
+    record its SHA-256. Raises UploadError if the length or checksum is
+    wrong; the chunk can then simply be sent again.
+    """
+    if upload.status != 'uploading':
+        raise UploadError('This upload is already complete.')
+    if not 0 <= index < upload.chunk_count:
+        raise UploadError(f'Chunk index must be between 0 and {upload.chunk_count - 1}.')
+
+    expected = upload.chunk_length(index)
+    digest = hashlib.sha256()
+    written = 0
+    with open(upload.temp_path, 'r+b') as temp:
+        temp.seek(index * upload.chunk_size)
+        while True:
+            # Read one byte past the end so oversized chunks are detected
+            block = stream.read(min(COPY_BLOCK_SIZE, expected - written + 1))
+            if not block:
+                break
+            written += len(block)
+            if written > expected:
+                raise UploadError(f'Chunk {index} must be {expected} bytes.')
+            digest.update(block)
+            temp.write(block)
+    if written != expected:
+        raise UploadError(f'Chunk {index} must be {expected} bytes, received {written}.')
+
+    sha256 = digest.hexdigest()
+    if expected_sha256 and expected_sha256.lower() != sha256:
+        raise UploadError(f'Checksum mismatch for chunk {index}.')
+    UploadChunk.objects.update_or_create(
+        upload=upload, index=index, defaults={'size': written, 'sha256': sha256}
+    )
+    ChunkedUpload.objects.filter(pk=upload.pk).update(updated_at=timezone.now())
+    return sha256
+
+
+def missing_chunks(upload):
+    """Return the indexes of chunks that have not been received yet."""
+    received = set(upload.chunks.values_list('index', flat=True))
+    return [index for index in range(upload.chunk_count) if index not in received]
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as temp:
+        for block in iter(lambda: temp.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finish_upload(upload):
+    """
+    Attach a fully received upload to its target and return the saved
+    Lesson or Submission.
+    """
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status != 'uploading':
+            raise UploadError('This upload is already complete.')
+        missing = missing_chunks(upload)
+        if missing:
+            raise UploadError(f'{len(missing)} chunks are missing, starting with chunk {missing[0]}.')
+
+        # Re-check access: the lesson or assignment may have changed meanwhile
+        target = TARGET_CHECKS[upload.target](upload.user, upload.object_id)
+        upload.sha256 = _file_sha256(upload.temp_path)
+
+        with open(upload.temp_path, 'rb') as temp:
+            content = TemporaryFile(temp)
+            # Lets deduplicating storage skip hashing the file again
+            content.sha256 = upload.sha256
+            if upload.target == 'lesson_video':
+                instance = target
+                instance.video_file.save(upload.filename, content, save=False)
+                instance.save(update_fields=['video_file', 'updated_at'])
+            else:
+                instance = Submission(assignment=target, student=upload.user)
+                instance.file.save(upload.filename, content, save=False)
+                instance.save()
+
+        upload.status = 'complete'
+        upload.save(update_fields=['status', 'sha256', 'updated_at'])
+        upload.chunks.all().delete()
+    return instance
+
+
+def discard_upload(upload):
+    """Delete an upload session and its temp file."""
+    if os.path.exists(upload.temp_path):
+        os.remove(upload.temp_path)
+    upload.delete()
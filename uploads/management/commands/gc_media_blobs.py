@@ -0,0 +1,50 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from uploads.storage import ContentAddressedStorage, iter_managed_files, referenced_names
+
+
+class Command(BaseCommand):
+    help = 'Garbage-collect unreferenced blobs from the deduplicating media storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--adopt',
+            action='store_true',
+            help='First convert files saved before deduplication into links to shared blobs'
+        )
+        parser.add_argument(
+            '--prune-orphans',
+            action='store_true',
+            help='First delete uploaded files that no course, lesson or submission references'
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Only delete blobs unreferenced for at least this many seconds (default: 3600)'
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not uploads.storage.ContentAddressedStorage.')
+
+        if options['adopt']:
+            adopted = sum(storage.adopt(name) for name in iter_managed_files(storage))
+            self.stdout.write(f"Adopted {adopted} existing files")
+
+        if options['prune_orphans']:
+            referenced = referenced_names()
+            pruned = 0
+            for name in iter_managed_files(storage):
+                if name not in referenced:
+                    os.remove(storage.path(name))
+                    pruned += 1
+            self.stdout.write(f"Pruned {pruned} unreferenced files")
+
+        deleted, freed = storage.collect_garbage(min_age=options['min_age'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully deleted {deleted} blobs, freeing {freed} bytes')
+        )
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from uploads.chunked import discard_upload
+from uploads.models import ChunkedUpload
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished chunked uploads that have been idle too long'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.CHUNKED_UPLOAD_EXPIRY_HOURS,
+            help='Idle time after which an unfinished upload is purged '
+                 f'(default: {settings.CHUNKED_UPLOAD_EXPIRY_HOURS})'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        purged = 0
+        for upload in ChunkedUpload.objects.filter(status='uploading', updated_at__lt=cutoff).iterator():
+            discard_upload(upload)
+            purged += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully purged {purged} stale uploads')
+        )
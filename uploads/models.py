@@ -0,0 +1,73 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class ChunkedUpload(models.Model):
+    """
+    A resumable upload assembled from fixed-size chunks in a temp file.
+
+    target and object_id name what the finished file is attached to: a
+    lesson's video (object_id is the Lesson) or a new submission
+    (object_id is the Assignment).
+    """
+    TARGET_CHOICES = (
+        ('lesson_video', 'Lesson video'),
+        ('submission_file', 'Submission file'),
+    )
+    STATUS_CHOICES = (
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chunked_uploads')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    object_id = models.PositiveIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_target_display()}, {self.get_status_display()})"
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index):
+        """Return the number of bytes chunk index must contain."""
+        if index == self.chunk_count - 1:
+            return self.size - index * self.chunk_size
+        return self.chunk_size
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_TEMP_DIR, f'{self.pk}.part')
+
+
+class UploadChunk(models.Model):
+    """
+    A chunk received for a ChunkedUpload, with the SHA-256 of its bytes.
+    """
+    upload = models.ForeignKey(ChunkedUpload, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('upload', 'index')
+        ordering = ['index']
+
+    def __str__(self):
+        return f"Chunk {self.index} of {self.upload_id}"
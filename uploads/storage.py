@@ -0,0 +1,197 @@
+"""
+Content-addressed, deduplicating file storage.
+
+Every saved file is stored once as a blob named by its SHA-256 under
+MEDIA_ROOT/blobs/, and the name Django records (e.g.
+lessons/documents/notes.pdf) is a hardlink to that blob. Identical
+uploads therefore share one copy on disk, while URLs, open() and
+delete() keep working on the usual upload_to paths.
+
+The filesystem's link count is the reference count: deleting a file
+only unlinks its name, and a blob whose only remaining link is itself
+is garbage. collect_garbage() removes such blobs; the gc_media_blobs
+command runs it, optionally after pruning files no row references and
+after adopting files saved before this storage was enabled.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+
+BLOB_DIR = 'blobs'
+
+# Model file fields whose files live in the deduplicated storage
+MANAGED_FIELDS = (
+    ('courses.Course', 'image'),
+    ('lessons.Lesson', 'document'),
+    ('lessons.Lesson', 'video_file'),
+    ('assignments.Submission', 'file'),
+)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that keeps one blob per distinct content and
+    hardlinks saved names to it.
+    """
+
+    def blob_path(self, digest):
+        return self.path(os.path.join(BLOB_DIR, digest[:2], digest[2:4], digest))
+
+    def _makedirs(self, directory):
+        os.makedirs(directory, exist_ok=True)
+
+    def _store_blob(self, content):
+        """Write content to its blob if new and return the SHA-256."""
+        temp_dir = self.path(os.path.join(BLOB_DIR, 'tmp'))
+        self._makedirs(temp_dir)
+
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk (large or chunked upload): hash it, then move it
+            source = content.temporary_file_path()
+            digest = getattr(content, 'sha256', None) or file_sha256(source)
+            blob = self.blob_path(digest)
+            if os.path.exists(blob):
+                os.remove(source)
+            else:
+                self._makedirs(os.path.dirname(blob))
+                file_move_safe(source, blob, allow_overwrite=True)
+        else:
+            digest = hashlib.sha256()
+            with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temp.write(chunk)
+            digest = digest.hexdigest()
+            blob = self.blob_path(digest)
+            if os.path.exists(blob):
+                os.remove(temp.name)
+            else:
+                self._makedirs(os.path.dirname(blob))
+                os.replace(temp.name, blob)
+
+        if self.file_permissions_mode is not None:
+            os.chmod(blob, self.file_permissions_mode)
+        return digest
+
+    def _save(self, name, content):
+        digest = self._store_blob(content)
+        blob = self.blob_path(digest)
+        full_path = self.path(name)
+        self._makedirs(os.path.dirname(full_path))
+
+        while True:
+            try:
+                os.link(blob, full_path)
+            except FileExistsError:
+                # A new name is needed if the file exists.
+                name = self.get_available_name(name)
+                full_path = self.path(name)
+            except OSError:
+                # Filesystems without hardlinks get a plain copy
+                with open(blob, 'rb') as source, open(full_path, 'xb') as target:
+                    shutil.copyfileobj(source, target)
+                break
+            else:
+                break
+
+        name = os.path.relpath(full_path, self.location)
+        return str(name).replace('\\', '/')
+
+    def adopt(self, name):
+        """
+        Replace a plain file with a hardlink to its blob. Returns True if
+        the file was converted.
+        """
+        full_path = self.path(name)
+        if os.stat(full_path).st_nlink > 1:
+            return False
+        digest = file_sha256(full_path)
+        blob = self.blob_path(digest)
+        self._makedirs(os.path.dirname(blob))
+        try:
+            # First copy of this content: the file itself becomes the blob
+            os.link(full_path, blob)
+        except FileExistsError:
+            temp = f'{full_path}.cas-tmp'
+            os.link(blob, temp)
+            os.replace(temp, full_path)
+        return True
+
+    def iter_blobs(self):
+        """Yield the absolute path of every blob."""
+        root = self.path(BLOB_DIR)
+        for directory, subdirectories, files in os.walk(root):
+            if os.path.relpath(directory, root).split(os.sep)[0] == 'tmp':
+                continue
+            for filename in files:
+                yield os.path.join(directory, filename)
+
+    def collect_garbage(self, min_age=3600):
+        """
+        Delete blobs that no saved name links to any more, skipping blobs
+        whose link count changed in the last min_age seconds so a save in
+        progress is never raced. Returns (blobs deleted, bytes freed).
+        """
+        cutoff = time.time() - min_age
+        deleted = freed = 0
+        for blob in self.iter_blobs():
+            stat = os.stat(blob)
+            if stat.st_nlink == 1 and stat.st_ctime < cutoff:
+                os.remove(blob)
+                deleted += 1
+                freed += stat.st_size
+        return deleted, freed
+
+
+def referenced_names():
+    """Return the set of file names stored in every managed field."""
+    from courses.images import variant_names
+
+    names = set()
+    for model_label, field_name in MANAGED_FIELDS:
+        model = apps.get_model(model_label)
+        names.update(
+            model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            .values_list(field_name, flat=True).iterator()
+        )
+    # Generated course image variants live under courses/ too
+    for course in apps.get_model('courses.Course').objects.exclude(image_variants={}).only('image_variants'):
+        names.update(variant_names(course))
+    return names
+
+
+def managed_directories():
+    """Return the upload_to directories of the managed fields."""
+    directories = set()
+    for model_label, field_name in MANAGED_FIELDS:
+        upload_to = apps.get_model(model_label)._meta.get_field(field_name).upload_to
+        directories.add(str(upload_to).strip('/'))
+    return sorted(directories)
+
+
+def iter_managed_files(storage):
+    """Yield the storage name of every file under the managed directories."""
+    for directory in managed_directories():
+        root = storage.path(directory)
+        for path, _, files in os.walk(root):
+            for filename in files:
+                yield os.path.relpath(os.path.join(path, filename), storage.location).replace('\\', '/')
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from io import StringIO
+import json
+from courses.models import Course, Enrollment
+from lessons.models import Lesson
+from assignments.models import Assignment, Submission
+from uploads.models import ChunkedUpload
+
+User = get_user_model()
+
+CHUNK = 64 * 1024
+
+
+class ChunkedUploadTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            CHUNKED_UPLOAD_TEMP_DIR=os.path.join(self.media_root, 'chunked_uploads'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.instructor_user = User.objects.create_user(
+            username='uploadinstructor', password='testpass123', role='instructor'
+        )
+        self.student_user = User.objects.create_user(
+            username='uploadstudent', password='testpass123', role='student'
+        )
+        self.course = Course.objects.create(
+            title='Upload Course', description='d', instructor=self.instructor_user, published=True
+        )
+        self.lesson = Lesson.objects.create(title='L', description='d', course=self.course, order=1)
+        self.assignment = Assignment.objects.create(
+            title='A', description='d', lesson=self.lesson,
+            due_date=timezone.now() + timedelta(days=7)
+        )
+        Enrollment.objects.create(student=self.student_user, course=self.course)
+        self.data = os.urandom(CHUNK * 2 + 1000)
+
+    def start(self, target, object_id, size=None):
+        response = self.client.post(reverse('create_upload'), data=json.dumps({
+            'target': target, 'object_id': object_id, 'filename': 'lecture.mp4',
+            'size': size or len(self.data), 'chunk_size': CHUNK,
+        }), content_type='application/json')
+        return response
+
+    def put_chunk(self, upload_id, index, **headers):
+        body = self.data[index * CHUNK:(index + 1) * CHUNK]
+        return self.client.put(
+            reverse('upload_chunk', kwargs={'upload_id': upload_id, 'index': index}),
+            data=body, content_type='application/octet-stream', headers=headers
+        )
+
+    def test_resumable_lesson_video_upload(self):
+        """Test init, out-of-order chunks, resume status and completion"""
+        self.client.login(username='uploadinstructor', password='testpass123')
+        response = self.start('lesson_video', self.lesson.pk)
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['id']
+        self.assertEqual(response.json()['chunk_count'], 3)
+
+        self.assertEqual(self.put_chunk(upload_id, 2).status_code, 200)
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, 200)
+
+        # A dropped connection: ask which chunks are still missing
+        state = self.client.get(reverse('upload_detail', kwargs={'upload_id': upload_id})).json()
+        self.assertEqual(state['missing_chunks'], [1])
+        response = self.client.post(reverse('complete_upload', kwargs={'upload_id': upload_id}))
+        self.assertEqual(response.status_code, 400)
+
+        self.put_chunk(upload_id, 1)
+        response = self.client.post(reverse('complete_upload', kwargs={'upload_id': upload_id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sha256'], hashlib.sha256(self.data).hexdigest())
+
+        self.lesson.refresh_from_db()
+        with self.lesson.video_file.open('rb') as video:
+            self.assertEqual(video.read(), self.data)
+        self.assertFalse(os.path.exists(ChunkedUpload.objects.get(pk=upload_id).temp_path))
+
+    def test_chunk_validation(self):
+        """Test that wrong chunk sizes and checksums are rejected"""
+        self.client.login(username='uploadinstructor', password='testpass123')
+        upload_id = self.start('lesson_video', self.lesson.pk).json()['id']
+        response = self.client.put(
+            reverse('upload_chunk', kwargs={'upload_id': upload_id, 'index': 0}),
+            data=b'short', content_type='application/octet-stream'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.put_chunk(upload_id, 0, X_CHUNK_SHA256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        response = self.put_chunk(upload_id, 0, X_CHUNK_SHA256=hashlib.sha256(self.data[:CHUNK]).hexdigest())
+        self.assertEqual(response.status_code, 200)
+        response = self.put_chunk(upload_id, 5)
+        self.assertEqual(response.status_code, 400)
+
+    def test_submission_upload_creates_submission(self):
+        """Test that a completed student upload becomes their submission"""
+        self.client.login(username='uploadstudent', password='testpass123')
+        upload_id = self.start('submission_file', self.assignment.pk).json()['id']
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        response = self.client.post(reverse('complete_upload', kwargs={'upload_id': upload_id}))
+        self.assertEqual(response.status_code, 200)
+        submission = Submission.objects.get(assignment=self.assignment, student=self.student_user)
+        self.assertEqual(submission.file.size, len(self.data))
+
+        # A second upload for the same assignment is refused up front
+        self.assertEqual(self.start('submission_file', self.assignment.pk).status_code, 400)
+
+    def test_upload_permissions(self):
+        """Test that targets enforce the same access rules as the forms"""
+        self.client.login(username='uploadstudent', password='testpass123')
+        self.assertEqual(self.start('lesson_video', self.lesson.pk).status_code, 403)
+        self.client.login(username='uploadinstructor', password='testpass123')
+        self.assertEqual(self.start('submission_file', self.assignment.pk).status_code, 403)
+        upload_id = self.start('lesson_video', self.lesson.pk).json()['id']
+
+        # Other users cannot see or write to the upload
+        self.client.login(username='uploadstudent', password='testpass123')
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, 404)
+
+    def test_purge_stale_uploads(self):
+        """Test that idle unfinished uploads and their temp files are purged"""
+        self.client.login(username='uploadinstructor', password='testpass123')
+        upload_id = self.start('lesson_video', self.lesson.pk).json()['id']
+        upload = ChunkedUpload.objects.get(pk=upload_id)
+        ChunkedUpload.objects.filter(pk=upload_id).update(updated_at=timezone.now() - timedelta(days=2))
+
+        out = StringIO()
+        call_command('purge_stale_uploads', stdout=out)
+        self.assertIn('purged 1', out.getvalue())
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertFalse(os.path.exists(upload.temp_path))
+
+
+class ContentAddressedStorageTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.instructor_user = User.objects.create_user(
+            username='casinstructor', password='testpass123', role='instructor'
+        )
+        self.course = Course.objects.create(
+            title='CAS Course', description='d', instructor=self.instructor_user, published=True
+        )
+        self.storage = default_storage
+
+    def make_lesson(self, title, content):
+        lesson = Lesson.objects.create(title=title, description='d', course=self.course, order=1)
+        lesson.document.save('notes.pdf', ContentFile(content))
+        return lesson
+
+    def test_identical_files_share_one_blob(self):
+        first = self.make_lesson('One', b'same slides')
+        second = self.make_lesson('Two', b'same slides')
+        other = self.make_lesson('Three', b'different slides')
+
+        self.assertNotEqual(first.document.name, second.document.name)
+        first_stat = os.stat(first.document.path)
+        self.assertEqual(first_stat.st_ino, os.stat(second.document.path).st_ino)
+        self.assertNotEqual(first_stat.st_ino, os.stat(other.document.path).st_ino)
+        # Two names plus the blob itself
+        self.assertEqual(first_stat.st_nlink, 3)
+        self.assertEqual(len(list(self.storage.iter_blobs())), 2)
+        with first.document.open('rb') as document:
+            self.assertEqual(document.read(), b'same slides')
+
+    def test_collect_garbage_removes_unreferenced_blobs(self):
+        first = self.make_lesson('One', b'same slides')
+        second = self.make_lesson('Two', b'same slides')
+        digest = hashlib.sha256(b'same slides').hexdigest()
+
+        first.document.delete()
+        self.assertEqual(self.storage.collect_garbage(min_age=0), (0, 0))
+        self.assertTrue(os.path.exists(self.storage.blob_path(digest)))
+
+        second.document.delete()
+        # Recently unlinked blobs are kept for min_age seconds
+        self.assertEqual(self.storage.collect_garbage(), (0, 0))
+        self.assertEqual(self.storage.collect_garbage(min_age=0), (1, len(b'same slides')))
+        self.assertFalse(os.path.exists(self.storage.blob_path(digest)))
+
+    def test_gc_media_blobs_command_adopts_and_prunes(self):
+        lesson = Lesson.objects.create(title='Old', description='d', course=self.course, order=1)
+        # Files written before the storage was enabled are plain files
+        os.makedirs(os.path.join(self.media_root, 'lessons', 'documents'))
+        for name in ('old.pdf', 'copy.pdf', 'orphan.pdf'):
+            with open(os.path.join(self.media_root, 'lessons', 'documents', name), 'wb') as f:
+                f.write(b'legacy')
+        Lesson.objects.filter(pk=lesson.pk).update(document='lessons/documents/old.pdf')
+        Lesson.objects.create(
+            title='Copy', description='d', course=self.course, order=2, document='lessons/documents/copy.pdf'
+        )
+
+        out = StringIO()
+        call_command('gc_media_blobs', '--adopt', '--prune-orphans', '--min-age', '0', stdout=out)
+        self.assertIn('Adopted 3 existing files', out.getvalue())
+        self.assertIn('Pruned 1 unreferenced files', out.getvalue())
+        self.assertIn('Successfully deleted 0 blobs', out.getvalue())
+
+        old = os.path.join(self.media_root, 'lessons', 'documents', 'old.pdf')
+        copy = os.path.join(self.media_root, 'lessons', 'documents', 'copy.pdf')
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'lessons', 'documents', 'orphan.pdf')))
+        self.assertEqual(os.stat(old).st_ino, os.stat(copy).st_ino)
+        with open(copy, 'rb') as f:
+            self.assertEqual(f.read(), b'legacy')
@@ -0,0 +1,92 @@
+import json
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods, require_POST
+from .chunked import UploadError, discard_upload, finish_upload, missing_chunks, start_upload, write_chunk
+from .models import ChunkedUpload
+
+
+def upload_state(upload):
+    """Describe an upload session for JSON responses."""
+    missing = missing_chunks(upload) if upload.status == 'uploading' else []
+    return {
+        'id': str(upload.pk),
+        'target': upload.target,
+        'object_id': upload.object_id,
+        'filename': upload.filename,
+        'size': upload.size,
+        'chunk_size': upload.chunk_size,
+        'chunk_count': upload.chunk_count,
+        'missing_chunks': missing,
+        'status': upload.status,
+        'sha256': upload.sha256,
+    }
+
+
+@login_required
+@require_POST
+def create_upload(request):
+    """
+    Start a chunked upload.
+
+    Expects {"target", "object_id", "filename", "size"} and an optional
+    "chunk_size"; returns the upload id and the chunks to send.
+    """
+    try:
+        data = json.loads(request.body)
+        upload = start_upload(
+            request.user, data.get('target'), int(data.get('object_id')),
+            data.get('filename'), data.get('size'), data.get('chunk_size'),
+        )
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Expected a JSON body with target, object_id, filename and size.'}, status=400)
+    except UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    return JsonResponse(upload_state(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'DELETE'])
+def upload_detail(request, upload_id):
+    """
+    Report which chunks are still missing (GET), to resume an upload,
+    or abandon the upload (DELETE).
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    if request.method == 'DELETE':
+        discard_upload(upload)
+        return JsonResponse({'deleted': True})
+    return JsonResponse(upload_state(upload))
+
+
+@login_required
+@require_http_methods(['PUT'])
+def upload_chunk(request, upload_id, index):
+    """
+    Receive one chunk as the raw request body. An optional
+    X-Chunk-SHA256 header is checked against the received bytes.
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    try:
+        # Read the body as a stream so the chunk is never held in memory
+        sha256 = write_chunk(upload, index, request, request.headers.get('X-Chunk-SHA256'))
+    except UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    return JsonResponse({'index': index, 'sha256': sha256})
+
+
+@login_required
+@require_POST
+def complete_upload(request, upload_id):
+    """
+    Attach a fully received upload to its lesson or a new submission.
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    try:
+        instance = finish_upload(upload)
+    except UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    upload.refresh_from_db()
+    return JsonResponse({**upload_state(upload), 'url': instance.get_absolute_url()})